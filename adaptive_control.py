@@ -0,0 +1,141 @@
+import threading
+from config import ADAPTIVE_CONFIG
+
+OUTCOMES = ('ok', 'timeout', 'empty')
+
+
+def backoff_delay(delay, attempt):
+    """第attempt次重试前的等待秒数，随当前间隔和重试次数增长"""
+    base = max(delay, ADAPTIVE_CONFIG['MIN_BACKOFF'])
+    return min(ADAPTIVE_CONFIG['MAX_DELAY'], base * ADAPTIVE_CONFIG['BACKOFF'] ** attempt)
+
+
+class AdaptiveController:
+    """AIMD自适应控制：按各工作进程的页面耗时、超时率和空结果率调整并发数和操作间隔
+
+    一个统计窗口内正常时并发数加一、间隔减少一个步长；失败率或平均耗时超限时并发数按比例减少、间隔成倍增加
+    shared: 可选的(间隔, 并发数)共享变量，供工作进程读取
+    """
+
+    def __init__(self, max_workers=1, shared=None):
+        self.max_workers = max_workers
+        self.limit = max_workers
+        self.delay = ADAPTIVE_CONFIG['INITIAL_DELAY']
+        self.shared = shared
+        self.window = []
+        self.workers = {}
+        self.adjustments = {'increase': 0, 'decrease': 0}
+        self.retired = set()
+        self.lock = threading.Lock()
+        self.publish()
+
+    def publish(self):
+        if self.shared:
+            self.shared[0].value = self.delay
+            self.shared[1].value = self.allowed()
+
+    def allowed(self):
+        """允许工作的编号上限：仍在运行的工作进程中编号最小的limit个可以工作"""
+        live = [worker_id for worker_id in range(self.max_workers) if worker_id not in self.retired]
+        if len(live) <= self.limit:
+            return self.max_workers
+        return live[self.limit - 1] + 1
+
+    def retire(self, worker_id):
+        """工作进程退出后由后续编号的工作进程补上并发名额，避免暂停的进程无人唤醒"""
+        with self.lock:
+            self.retired.add(worker_id)
+            self.publish()
+
+    def record(self, worker_id, latency, outcome):
+        """记录一次页面操作，窗口满时调整并返回调整说明，否则返回None"""
+        with self.lock:
+            stat = self.workers.setdefault(worker_id, {outcome: 0 for outcome in OUTCOMES})
+            stat.setdefault('latency', 0.0)
+            stat[outcome] += 1
+            stat['latency'] += latency
+            self.window.append((latency, outcome))
+            if len(self.window) < ADAPTIVE_CONFIG['WINDOW']:
+                return None
+            window, self.window = self.window, []
+            return self.adjust(window)
+
+    def adjust(self, window):
+        failures = sum(1 for _, outcome in window if outcome != 'ok') / len(window)
+        latency = sum(latency for latency, _ in window) / len(window)
+        old_limit, old_delay = self.limit, self.delay
+        if failures > ADAPTIVE_CONFIG['FAILURE_RATE'] or latency > ADAPTIVE_CONFIG['LATENCY_LIMIT']:
+            self.limit = max(ADAPTIVE_CONFIG['MIN_WORKERS'], int(self.limit * ADAPTIVE_CONFIG['DECREASE']))
+            self.delay = min(ADAPTIVE_CONFIG['MAX_DELAY'],
+                             max(self.delay, ADAPTIVE_CONFIG['DELAY_STEP']) * ADAPTIVE_CONFIG['BACKOFF'])
+            self.adjustments['decrease'] += 1
+        else:
+            self.limit = min(self.max_workers, self.limit + 1)
+            self.delay = max(ADAPTIVE_CONFIG['MIN_DELAY'], self.delay - ADAPTIVE_CONFIG['DELAY_STEP'])
+            self.adjustments['increase'] += 1
+        self.publish()
+        if (self.limit, self.delay) == (old_limit, old_delay):
+            return None
+        return (f"自适应控制: 并发 {old_limit}→{self.limit}, 间隔 {old_delay:.1f}→{self.delay:.1f}s"
+                f"（失败率 {failures:.0%}, 平均耗时 {latency:.1f}s）")
+
+    def active(self, worker_id=None):
+        """编号超出允许上限的工作进程暂停领取新的操作"""
+        return worker_id is None or worker_id < self.allowed()
+
+    def current_delay(self):
+        return self.delay
+
+    def backoff(self, attempt):
+        return backoff_delay(self.delay, attempt)
+
+    def report(self):
+        lines = [f"自适应控制: 当前并发 {self.limit}/{self.max_workers}, 间隔 {self.delay:.1f}s, "
+                 f"加速 {self.adjustments['increase']} 次, 减速 {self.adjustments['decrease']} 次"]
+        for worker_id, stat in sorted(self.workers.items(), key=lambda x: str(x[0])):
+            count = sum(stat[outcome] for outcome in OUTCOMES) or 1
+            name = '本地' if worker_id is None else f"worker {worker_id}"
+            lines.append(f"  {name}: 操作 {count} 次, 平均耗时 {stat['latency'] / count:.2f}s, "
+                         f"超时率 {stat['timeout'] / count:.0%}, 空结果率 {stat['empty'] / count:.0%}")
+        return lines
+
+
+class ControllerClient:
+    """工作进程中的控制器代理：样本回传主进程，间隔和并发数从共享变量读取"""
+
+    def __init__(self, worker_id, result_queue, shared):
+        self.worker_id = worker_id
+        self.result_queue = result_queue
+        self.shared = shared
+
+    def record(self, worker_id, latency, outcome):
+        self.result_queue.put(('sample', self.worker_id, (latency, outcome)))
+
+    def active(self, worker_id=None):
+        return self.worker_id < self.shared[1].value
+
+    def current_delay(self):
+        return self.shared[0].value
+
+    def backoff(self, attempt):
+        return backoff_delay(self.current_delay(), attempt)
+
+    def report(self):
+        # 统计在主进程汇总
+        return []
+
+
+_controller = None
+
+
+def set_controller(controller):
+    global _controller
+    _controller = controller
+
+
+def get_controller():
+    """当前进程的控制器，未启用自适应控制时返回None"""
+    global _controller
+    if _controller is None and ADAPTIVE_CONFIG['ENABLED']:
+        _controller = AdaptiveController()
+    return _controller
@@ -0,0 +1,117 @@
+import time
+import queue
+import threading
+from config import BROWSER_POOL_CONFIG
+from scraper import create_scraper
+
+
+class BrowserPool:
+    """预热浏览器池：任务租用已启动的浏览器，归还时做健康检查，超过页面上限或崩溃则回收重建"""
+
+    def __init__(self, size=None, max_pages=None, log_callback=None):
+        self.size = size or BROWSER_POOL_CONFIG['POOL_SIZE']
+        self.max_pages = max_pages or BROWSER_POOL_CONFIG['MAX_PAGES']
+        self.log_callback = log_callback
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.warming = 0
+        self.closed = False
+        self.stats = {'leases': 0, 'warm_hits': 0, 'latency': 0.0, 'recycled': 0}
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def start(self):
+        """在后台预热浏览器"""
+        for _ in range(self.size):
+            self.warm_async()
+
+    def warm_async(self):
+        with self.lock:
+            self.warming += 1
+        threading.Thread(target=self.warm_one, daemon=True).start()
+
+    def create(self):
+        scraper = create_scraper()
+        if not scraper.initialize(self.log_callback):
+            return None
+        try:
+            # 预先加载Maps首页，建立连接并填充缓存
+            scraper.load_home()
+        except Exception:
+            pass
+        return scraper
+
+    def warm_one(self):
+        try:
+            scraper = self.create()
+            if scraper is not None:
+                if self.closed:
+                    scraper.close()
+                else:
+                    self.idle.put(scraper)
+        finally:
+            with self.lock:
+                self.warming -= 1
+
+    def lease(self, log_callback=None):
+        """租用一个浏览器，返回已初始化的爬虫实例"""
+        start = time.time()
+        scraper = None
+        warm = True
+        try:
+            # 没有正在预热的浏览器时不必等待
+            timeout = BROWSER_POOL_CONFIG['LEASE_TIMEOUT'] if self.warming else 0
+            scraper = self.idle.get(timeout=timeout) if timeout else self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        if scraper is not None and not scraper.healthy():
+            self.discard(scraper)
+            scraper = None
+        if scraper is None:
+            # 没有可用的预热浏览器，直接冷启动
+            warm = False
+            scraper = self.create()
+            if scraper is None:
+                raise RuntimeError("浏览器初始化失败")
+        latency = time.time() - start
+        self.stats['leases'] += 1
+        self.stats['latency'] += latency
+        if warm:
+            self.stats['warm_hits'] += 1
+        if log_callback:
+            log_callback(f"获取浏览器耗时 {latency:.2f}s（{'预热' if warm else '冷启动'}）")
+        return scraper
+
+    def release(self, scraper):
+        """归还浏览器，不健康或已达到页面上限时回收并补充新的预热浏览器"""
+        if self.closed:
+            scraper.close()
+            return
+        if scraper.healthy() and scraper.pages_loaded < self.max_pages:
+            scraper.is_running = False
+            scraper.is_paused = False
+            self.idle.put(scraper)
+            return
+        self.discard(scraper)
+
+    def discard(self, scraper):
+        self.stats['recycled'] += 1
+        self.log(f"回收浏览器（已加载 {scraper.pages_loaded} 个页面）")
+        scraper.close()
+        self.warm_async()
+
+    def report(self):
+        leases = self.stats['leases'] or 1
+        return (f"浏览器池: 租用 {self.stats['leases']} 次, 预热命中 {self.stats['warm_hits']} 次, "
+                f"平均获取耗时 {self.stats['latency'] / leases:.2f}s, 回收 {self.stats['recycled']} 次")
+
+    def shutdown(self):
+        self.closed = True
+        while True:
+            try:
+                scraper = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            scraper.close()
@@ -0,0 +1,242 @@
+import os
+import re
+import csv
+import json
+from config import CAMPAIGN_CONFIG
+from scraper import create_scraper
+from worker_pool import ScraperWorkerPool
+
+
+def make_item(country, business_type, target_count=None, priority=None, **extra):
+    """构造一个批量任务中的查询"""
+    item = {
+        'country': str(country).strip(),
+        'business_type': str(business_type).strip(),
+        'target_count': int(target_count or CAMPAIGN_CONFIG['DEFAULT_TARGET']),
+        'priority': int(priority or CAMPAIGN_CONFIG['DEFAULT_PRIORITY']),
+        'status': 'pending',
+        'collected': 0
+    }
+    item.update(extra)
+    return item
+
+
+def build_matrix(countries, business_types, target_count=None, priority=None):
+    """国家 × 行业组合成查询矩阵"""
+    return [make_item(c, b, target_count, priority) for c in countries for b in business_types]
+
+
+def load_campaign_file(path):
+    """读取任务文件
+
+    CSV: 列为 country, business_type, target_count(可选), priority(可选)
+    JSON: 查询列表，或 {"countries": [...], "business_types": [...], "target_count": n, "priority": n}
+    """
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            items = build_matrix(data.get('countries', []), data.get('business_types', []),
+                                 data.get('target_count'), data.get('priority'))
+            items.extend(make_item(**entry) for entry in data.get('items', []))
+            return items
+        return [make_item(**entry) for entry in data]
+
+    items = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            if not row.get('country') or not row.get('business_type'):
+                continue
+            items.append(make_item(row['country'], row['business_type'],
+                                   row.get('target_count') or None, row.get('priority') or None))
+    return items
+
+
+def campaign_path(name):
+    safe_name = re.sub(r'[\\/:*?"<>|]+', '_', name)
+    return os.path.join(CAMPAIGN_CONFIG['DIR'], f"{safe_name}.json")
+
+
+class Campaign:
+    """批量任务：按优先级将查询矩阵分配给可用的浏览器，记录每个查询的进度和状态，结果按查询分别保存"""
+
+    def __init__(self, name, items=None, resume=False):
+        self.name = name
+        self.path = campaign_path(name)
+        self.items = []
+        self.is_running = False
+        self.pool = None
+        self.scraper = None
+        if resume and os.path.exists(self.path):
+            self.load()
+        if items:
+            self.merge(items)
+        for index, item in enumerate(self.items):
+            item['id'] = index
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.items = json.load(f)['items']
+        # 上次中断时正在运行的查询重新排队，从其检查点日志继续
+        for item in self.items:
+            if item['status'] == 'running':
+                item['status'] = 'pending'
+
+    def merge(self, items):
+        """加入新的查询，已存在的查询保留原有进度"""
+        known = {(i['country'], i['business_type']): i for i in self.items}
+        for item in items:
+            existing = known.get((item['country'], item['business_type']))
+            if existing:
+                existing['priority'] = item['priority']
+                if item['target_count'] > existing['target_count'] and existing['status'] == 'done':
+                    existing['status'] = 'pending'
+                existing['target_count'] = item['target_count']
+            else:
+                self.items.append(item)
+
+    def save(self):
+        if not os.path.exists(CAMPAIGN_CONFIG['DIR']):
+            os.makedirs(CAMPAIGN_CONFIG['DIR'])
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'name': self.name, 'items': self.items}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def pending(self):
+        """待执行的查询，优先级高的在前，同优先级保持原有顺序"""
+        items = [item for item in self.items if item['status'] == 'pending']
+        return sorted(items, key=lambda item: -item['priority'])
+
+    def task(self, item):
+        """转换为工作进程的任务，结果按查询保存，已有结果的查询从检查点日志继续"""
+        return {
+            'id': item['id'],
+            'country': item['country'],
+            'business_type': item['business_type'],
+            'target_count': item['target_count'],
+            'resume': item['collected'] > 0,
+            'save_results': True
+        }
+
+    def progress(self):
+        total = sum(item['target_count'] for item in self.items) or 1
+        collected = sum(min(item['collected'], item['target_count']) for item in self.items)
+        return int(collected / total * 100)
+
+    def summary(self):
+        counts = {}
+        for item in self.items:
+            counts[item['status']] = counts.get(item['status'], 0) + 1
+        statuses = ', '.join(f"{status} {count}" for status, count in counts.items())
+        collected = sum(item['collected'] for item in self.items)
+        return f"批量任务 {self.name}: 共 {len(self.items)} 个查询（{statuses}），获取商户 {collected} 个"
+
+    def run(self, worker_count=1, progress_callback=None, log_callback=None, status_callback=None,
+            browser_pool=None, result_callback=None):
+        """执行所有待处理的查询
+
+        status_callback(item): 查询状态或进度变化时调用
+        browser_pool: 单浏览器模式下从预热浏览器池租用浏览器
+        result_callback(result): 每获取一个商户时调用
+        """
+        self.is_running = True
+        pending = self.pending()
+        if log_callback:
+            log_callback(f"批量任务 {self.name}: 待执行 {len(pending)} / {len(self.items)} 个查询")
+        self.save()
+
+        def update(item, status=None):
+            if status:
+                item['status'] = status
+                self.save()
+                if log_callback:
+                    log_callback(f"[{item['id'] + 1}/{len(self.items)}] {item['business_type']} in "
+                                 f"{item['country']}: {status}（{item['collected']}/{item['target_count']}）")
+            if status_callback:
+                status_callback(item)
+            if progress_callback:
+                progress_callback(self.progress())
+
+        try:
+            if worker_count > 1 and len(pending) > 1:
+                self.run_parallel(pending, worker_count, update, log_callback, result_callback)
+            else:
+                self.run_sequential(pending, update, log_callback, browser_pool, result_callback)
+        finally:
+            self.is_running = False
+            self.save()
+            if log_callback:
+                log_callback(self.summary())
+
+    def run_sequential(self, pending, update, log_callback, browser_pool, result_callback=None):
+        if browser_pool:
+            self.scraper = browser_pool.lease(log_callback)
+        else:
+            # 所有查询复用同一个浏览器
+            self.scraper = create_scraper()
+            if not self.scraper.initialize(log_callback):
+                if log_callback:
+                    log_callback("浏览器初始化失败")
+                return
+        try:
+            for item in pending:
+                if not self.is_running:
+                    break
+                update(item, 'running')
+
+                def on_result(result, item=item):
+                    item['collected'] += 1
+                    update(item)
+                    if result_callback:
+                        result_callback(result)
+                    return self.is_running
+
+                task = self.task(item)
+                self.scraper.scrape(
+                    task['business_type'],
+                    task['country'],
+                    task['target_count'],
+                    log_callback=log_callback,
+                    result_callback=on_result,
+                    resume=task['resume']
+                )
+                # 续爬时以检查点日志中的总数为准
+                item['collected'] = max(item['collected'], self.scraper.result_count)
+                update(item, 'done' if self.is_running else 'pending')
+        finally:
+            if browser_pool:
+                if self.scraper.driver:
+                    browser_pool.release(self.scraper)
+            else:
+                self.scraper.close()
+
+    def run_parallel(self, pending, worker_count, update, log_callback, result_callback=None):
+        items = {item['id']: item for item in self.items}
+        self.pool = ScraperWorkerPool(worker_count)
+
+        def on_started(item_id, worker_id):
+            update(items[item_id], 'running')
+
+        def on_result(item_id, worker_id, result):
+            items[item_id]['collected'] += 1
+            update(items[item_id])
+            if result_callback:
+                result_callback(result)
+
+        def on_done(item_id, worker_id):
+            update(items[item_id], 'done' if self.is_running else 'pending')
+
+        self.pool.run_tasks([self.task(item) for item in pending], on_started, on_result, on_done,
+                            log_callback)
+        # 停止时尚未领取的查询保持待执行状态
+        for item in pending:
+            if item['status'] == 'running':
+                update(item, 'pending')
+
+    def stop(self):
+        self.is_running = False
+        if self.pool:
+            self.pool.stop()
+        if self.scraper:
+            self.scraper.is_running = False
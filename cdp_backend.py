@@ -0,0 +1,715 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import threading
+import subprocess
+import urllib.request
+from config import CHROME_OPTIONS, SCRAPER_CONFIG, CDP_CONFIG, MEMORY_CONFIG
+from scraper import (GoogleMapsScraper, SELECTOR_PROBE_JS, CARD_BATCH_SCRIPT, PREFETCH_SCRIPT,
+                     EXPAND_BUTTONS_SCRIPT, DETAIL_BATCH_SCRIPT, VIEWPORT_PATTERN, build_search_url,
+                     parse_place_url, card_identity)
+from selector_registry import SelectorRegistry
+from field_extraction import get_extractor
+from adaptive_control import get_controller
+from memory_monitor import format_snapshot
+from place_index import place_key
+
+# 在页面中以Selenium的arguments约定执行脚本；{"__selector__": css} 形式的参数替换为对应元素
+SCRIPT_WRAPPER = """
+(function () {
+    var args = %s.map(function (arg) {
+        return arg && arg.__selector__ ? document.querySelector(arg.__selector__) : arg;
+    });
+    var result = (function () { %s }).apply(null, args);
+    if (result && result.cards) {
+        result.cards.forEach(function (card) { delete card.element; });
+    }
+    return result;
+})()
+"""
+
+# 点击提取没有详情链接的卡片：按列表位置定位，名称不一致时（列表已重新渲染）按名称查找，
+# 滚动到卡片并点击，在结果列表标签页中打开详情面板
+CLICK_CARD_SCRIPT = """
+    var container = arguments[0];
+    var sel = arguments[1];
+    var index = arguments[2];
+    var name = arguments[3];
+""" + SELECTOR_PROBE_JS + """
+    var cards = container ? probeAll(container, 'result_card') : [];
+    var nameOf = function (card) {
+        var el = probe(card, 'card_name');
+        return el ? el.textContent.trim() : '';
+    };
+    var card = cards[index] && nameOf(cards[index]) === name ? cards[index] : null;
+    for (var i = 0; !card && i < cards.length; i++) {
+        if (nameOf(cards[i]) === name) {
+            card = cards[i];
+        }
+    }
+    if (card) {
+        card.scrollIntoView({block: 'center'});
+        card.click();
+    }
+    return {clicked: !!card, matched: matched};
+"""
+
+# 关闭详情面板返回结果列表：点击返回按钮，没有返回按钮时发送Escape
+CLOSE_PANEL_SCRIPT = """
+    var button = document.querySelector(arguments[0]);
+    if (button) {
+        button.click();
+    } else {
+        document.dispatchEvent(new KeyboardEvent('keydown', {key: 'Escape', code: 'Escape', keyCode: 27,
+                                                             which: 27, bubbles: true}));
+    }
+"""
+
+CHROME_CANDIDATES = {
+    'win32': [r'C:\Program Files\Google\Chrome\Application\chrome.exe',
+              r'C:\Program Files (x86)\Google\Chrome\Application\chrome.exe'],
+    'darwin': ['/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'],
+    'linux': ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser']
+}
+
+
+class CDPError(Exception):
+    pass
+
+
+def element(selector):
+    """页面脚本参数：按选择器定位的元素"""
+    return {'__selector__': selector}
+
+
+def find_chrome():
+    if CDP_CONFIG['CHROME_BINARY']:
+        return CDP_CONFIG['CHROME_BINARY']
+    for candidate in CHROME_CANDIDATES.get(sys.platform, CHROME_CANDIDATES['linux']):
+        path = candidate if os.path.isabs(candidate) else shutil.which(candidate)
+        if path and os.path.exists(path):
+            return path
+    raise CDPError("未找到Chrome浏览器，请在CDP_CONFIG['CHROME_BINARY']中指定路径")
+
+
+def blocked_url_patterns():
+    return [pattern for name, on in CHROME_OPTIONS['block_resources'].items() if on
+            for pattern in CHROME_OPTIONS['block_patterns'][name]]
+
+
+class CDPConnection:
+    """DevTools协议的WebSocket连接：按id匹配命令响应，按会话和方法分发事件"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.next_id = 0
+        self.pending = {}
+        self.waiters = {}
+        self.reader = None
+
+    def start(self):
+        self.reader = asyncio.ensure_future(self.read_loop())
+
+    async def read_loop(self):
+        try:
+            async for raw in self.websocket:
+                message = json.loads(raw)
+                if 'id' in message:
+                    future = self.pending.pop(message['id'], None)
+                    if future is None or future.done():
+                        continue
+                    if 'error' in message:
+                        future.set_exception(CDPError(message['error'].get('message', '')))
+                    else:
+                        future.set_result(message.get('result', {}))
+                else:
+                    key = (message.get('sessionId'), message.get('method'))
+                    for future in self.waiters.pop(key, []):
+                        if not future.done():
+                            future.set_result(message.get('params', {}))
+        except Exception:
+            pass
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("DevTools连接已断开"))
+            self.pending.clear()
+
+    async def send(self, method, params=None, session_id=None):
+        self.next_id += 1
+        message = {'id': self.next_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        await self.websocket.send(json.dumps(message))
+        return await asyncio.wait_for(future, CDP_CONFIG['COMMAND_TIMEOUT'])
+
+    def wait_event(self, session_id, method):
+        """注册一次性事件等待，返回在事件到达时完成的future"""
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault((session_id, method), []).append(future)
+        return future
+
+    async def close(self):
+        await self.websocket.close()
+        if self.reader:
+            await self.reader
+
+
+class CDPTab:
+    """浏览器中的一个标签页会话"""
+
+    def __init__(self, connection, target_id, session_id):
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+
+    async def send(self, method, params=None):
+        return await self.connection.send(method, params, self.session_id)
+
+    async def setup(self):
+        await self.send('Page.enable')
+        if MEMORY_CONFIG['ENABLED']:
+            await self.send('Performance.enable')
+        await self.send('Page.addScriptToEvaluateOnNewDocument', {
+            'source': "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+        })
+        urls = blocked_url_patterns()
+        if urls:
+            await self.send('Network.enable')
+            await self.send('Network.setBlockedURLs', {'urls': urls})
+
+    async def navigate(self, url):
+        """打开链接并等待load事件；Maps为单页应用，超时后由调用方按元素继续等待"""
+        loaded = self.connection.wait_event(self.session_id, 'Page.loadEventFired')
+        await self.send('Page.navigate', {'url': url})
+        try:
+            await asyncio.wait_for(loaded, SCRAPER_CONFIG['PAGE_LOAD_TIMEOUT'])
+        except asyncio.TimeoutError:
+            pass
+
+    async def evaluate(self, expression):
+        response = await self.send('Runtime.evaluate', {
+            'expression': expression, 'returnByValue': True, 'awaitPromise': True
+        })
+        if 'exceptionDetails' in response:
+            raise CDPError(response['exceptionDetails'].get('text', '脚本执行错误'))
+        return response.get('result', {}).get('value')
+
+    async def call(self, script, *args):
+        """执行与Selenium execute_script相同写法的脚本"""
+        return await self.evaluate(SCRIPT_WRAPPER % (json.dumps(args), script))
+
+    async def wait_for(self, expression, timeout, poll=0.2):
+        """轮询表达式直至为真，超时返回False；等待期间事件循环可处理其他标签页"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                if await self.evaluate(expression):
+                    return True
+            except CDPError:
+                pass
+            await asyncio.sleep(poll)
+        return False
+
+    async def close(self):
+        try:
+            await self.connection.send('Target.closeTarget', {'targetId': self.target_id})
+        except Exception:
+            pass
+
+
+class CDPBrowser:
+    """通过远程调试端口直接控制的Chrome进程"""
+
+    def __init__(self, process, connection):
+        self.process = process
+        self.connection = connection
+
+    @classmethod
+    async def launch(cls, port, profile_dir, proxy_server=None):
+        try:
+            import websockets
+        except ImportError:
+            raise CDPError("CDP后端需要安装websockets: pip install websockets")
+        arguments = [a if a.startswith('--') else f"--{a}" for a in CHROME_OPTIONS['arguments']]
+        if proxy_server:
+            arguments.append(f'--proxy-server={proxy_server}')
+        process = subprocess.Popen(
+            [find_chrome(), *arguments, f'--remote-debugging-port={port}', f'--user-data-dir={profile_dir}',
+             '--no-first-run', '--no-default-browser-check', 'about:blank'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        loop = asyncio.get_running_loop()
+        deadline = time.time() + CDP_CONFIG['STARTUP_TIMEOUT']
+        while True:
+            try:
+                info = await loop.run_in_executor(None, cls.read_version, port)
+                break
+            except Exception:
+                if time.time() > deadline or process.poll() is not None:
+                    process.kill()
+                    raise CDPError("Chrome调试端口未就绪")
+                await asyncio.sleep(0.2)
+        websocket = await websockets.connect(info['webSocketDebuggerUrl'], max_size=None)
+        connection = CDPConnection(websocket)
+        connection.start()
+        return cls(process, connection)
+
+    @staticmethod
+    def read_version(port):
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=2) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    async def new_tab(self):
+        target = await self.connection.send('Target.createTarget', {'url': 'about:blank', 'background': True})
+        session = await self.connection.send('Target.attachToTarget', {
+            'targetId': target['targetId'], 'flatten': True
+        })
+        tab = CDPTab(self.connection, target['targetId'], session['sessionId'])
+        await tab.setup()
+        return tab
+
+    async def version(self):
+        return await self.connection.send('Browser.getVersion')
+
+    async def close(self):
+        try:
+            await self.connection.send('Browser.close')
+        except Exception:
+            pass
+        try:
+            await self.connection.close()
+        except Exception:
+            pass
+        try:
+            self.process.wait(timeout=10)
+        except Exception:
+            self.process.kill()
+
+
+class CDPScraper(GoogleMapsScraper):
+    """asyncio直连DevTools协议的爬虫后端：结果列表在一个标签页中持续预取，
+    商户详情在多个标签页中按链接并发打开提取，与Selenium后端使用相同的scrape回调约定
+    """
+
+    def __init__(self, worker_id=None):
+        super().__init__(worker_id)
+        self.loop = None
+        self.loop_thread = None
+        self.main_tab = None
+        self.tab_count = SCRAPER_CONFIG['DETAIL_TABS']
+
+    def run(self, coroutine):
+        """在后台事件循环中执行协程并等待结果"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def run_sync(self, func, *args):
+        """在事件循环线程中执行同步函数：商户索引和缓存的SQLite连接只能在创建它的线程中使用，
+        详情协程又在事件循环线程中读写它们，因此打开、使用和关闭都放在该线程
+        """
+        async def invoke():
+            return func(*args)
+        return self.run(invoke())
+
+    def initialize(self, log_callback=None):
+        try:
+            if log_callback:
+                log_callback("正在通过DevTools协议启动Chrome...")
+            self.loop = asyncio.new_event_loop()
+            self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+            self.loop_thread.start()
+            self.profile_dir = self.create_profile_dir()
+            proxy_server = self.assign_proxy(log_callback)
+            self.driver = self.run(CDPBrowser.launch(self.allocate_debug_port(), self.profile_dir, proxy_server))
+            self.main_tab = self.run(self.driver.new_tab())
+            self.selectors = SelectorRegistry(None)
+            if log_callback:
+                log_callback("Chrome浏览器初始化成功（CDP后端）")
+            return True
+        except Exception as e:
+            if log_callback:
+                log_callback(f"初始化错误: {str(e)}")
+            self.close()
+            return False
+
+    def close(self, log_callback=None):
+        try:
+            if self.driver:
+                if log_callback:
+                    log_callback("正在关闭浏览器...")
+                self.run(self.driver.close())
+                if log_callback:
+                    log_callback("浏览器已关闭")
+        except Exception as e:
+            if log_callback:
+                log_callback(f"关闭错误: {str(e)}")
+        finally:
+            self.driver = None
+            self.main_tab = None
+            if self.loop:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.loop_thread.join(timeout=5)
+                self.loop.close()
+                self.loop = None
+            if self.profile_dir:
+                shutil.rmtree(self.profile_dir, ignore_errors=True)
+                self.profile_dir = None
+            self.release_proxy()
+
+    def healthy(self):
+        if not self.proxy_healthy() or (self.memory and self.memory.restart_pending):
+            return False
+        try:
+            return self.driver is not None and bool(self.run(self.driver.version()))
+        except Exception:
+            return False
+
+    def load_home(self):
+        self.pace()
+        self.run(self.main_tab.navigate(SCRAPER_CONFIG['MAPS_BASE_URL']))
+        self.pages_loaded += 1
+
+    def locate_viewport(self, query):
+        async def locate():
+            await self.pace_async()
+            await self.main_tab.navigate(build_search_url(query))
+            self.pages_loaded += 1
+            await self.main_tab.wait_for(
+                f"new RegExp({json.dumps(VIEWPORT_PATTERN.pattern)}).test(location.href)",
+                SCRAPER_CONFIG['STEP_TIMEOUTS']['search_results']
+            )
+            return await self.main_tab.evaluate("location.href")
+
+        match = VIEWPORT_PATTERN.search(self.run(locate()) or '')
+        return tuple(float(v) for v in match.groups()) if match else None
+
+    def scrape(self, business_type, country, target_count, progress_callback=None, log_callback=None,
+               result_callback=None, save_results=True, viewport=None, resume=False):
+        """执行一次搜索任务，参数和回调与GoogleMapsScraper.scrape相同"""
+        owns_browser = self.driver is None
+        if not owns_browser and not self.proxy_healthy():
+            if log_callback:
+                log_callback("当前代理已暂停使用，更换代理重新启动浏览器")
+            self.close(log_callback)
+        elif not owns_browser and self.memory and self.memory.restart_pending:
+            # 上一个查询中内存持续超限，事件循环内无法重启浏览器，在本查询开始前重启
+            if log_callback:
+                log_callback("内存监控: 重启浏览器")
+            self.close(log_callback)
+            self.memory.recycled('browser')
+            self.pages_loaded = 0
+        try:
+            self.is_running = True
+            self.total_results = []
+            self.result_count = 0
+            self.cards_seen = 0
+            self.skipped_known = 0
+            self.current_query = business_type if viewport else self.create_search_query(business_type, country)
+            self.current_country = country
+            self.current_viewport = viewport
+
+            if self.driver is None and not self.initialize(log_callback):
+                if log_callback:
+                    log_callback("浏览器初始化失败")
+                return
+
+            if log_callback:
+                log_callback(f"开始搜索: {self.current_query}")
+                log_callback(f"目标获取商户数量: {target_count}")
+
+            processed = self.run_sync(self.open_stores, business_type, country, save_results, resume, log_callback)
+            from_cache = self.cache is not None and self.run_sync(
+                self.serve_cached_query, processed, target_count, progress_callback, result_callback, log_callback
+            )
+            if not from_cache:
+                self.run(self.scrape_async(processed, target_count, progress_callback, log_callback,
+                                           result_callback))
+
+            if self.result_count:
+                if self.journal:
+                    self.journal.close()
+                    self.journal.export_csv(log_callback)
+            else:
+                self.log_no_results(log_callback)
+
+        except Exception as e:
+            if log_callback:
+                log_callback(f"爬虫运行错误: {str(e)}")
+        finally:
+            if self.loop:
+                self.run_sync(self.close_stores, log_callback)
+            else:
+                self.close_stores(log_callback)
+            if log_callback:
+                log_callback(f"CDP后端: 详情标签页 {self.tab_count} 个, 已加载页面 {self.pages_loaded} 个")
+            if self.selectors and log_callback:
+                log_callback("选择器命中统计:")
+                for line in self.selectors.report():
+                    log_callback(line)
+            if self.memory and log_callback:
+                log_callback(f"浏览器内存: {format_snapshot(self.memory.snapshot())}")
+            if self.proxy_pool and log_callback:
+                for line in self.proxy_pool.report():
+                    log_callback(line)
+            if get_controller() and log_callback:
+                for line in get_controller().report():
+                    log_callback(line)
+            if owns_browser:
+                self.close(log_callback)
+            self.is_running = False
+            if progress_callback:
+                progress_callback(100)
+            if log_callback:
+                log_callback("爬虫任务结束")
+
+    async def pace_async(self):
+        """按自适应间隔和代理的令牌桶等待，返回操作开始时间；等待期间其他标签页继续工作"""
+        controller = get_controller()
+        if controller:
+            while not controller.active(self.worker_id) and self.is_running:
+                await asyncio.sleep(1)
+            await asyncio.sleep(controller.current_delay())
+        if self.proxy:
+            await asyncio.sleep(self.proxy_pool.reserve(self.proxy))
+        return time.time()
+
+    async def wait_while_paused(self):
+        while self.is_paused and self.is_running:
+            await asyncio.sleep(0.5)
+
+    async def open_results(self, list_tab, log_callback=None):
+        """在结果列表标签页打开当前查询并启动预取，返回是否成功"""
+        sel = self.selectors.script_selectors()
+        started = await self.pace_async()
+        await list_tab.navigate(build_search_url(self.current_query, self.current_viewport))
+        self.pages_loaded += 1
+        if log_callback:
+            log_callback(f"直接打开搜索链接: {build_search_url(self.current_query, self.current_viewport)}")
+        container_exists = f"!!document.querySelector({json.dumps(self.selectors.css('results_container'))})"
+        if not await list_tab.wait_for(container_exists, SCRAPER_CONFIG['STEP_TIMEOUTS']['search_results']):
+            self.record_outcome('timeout', started)
+            if log_callback:
+                log_callback("搜索失败")
+            return False
+        self.record_outcome('ok', started)
+        await list_tab.call(PREFETCH_SCRIPT, element(self.selectors.css('results_container')), sel,
+                            SCRAPER_CONFIG['PREFETCH_LOOKAHEAD'], SCRAPER_CONFIG['PREFETCH_INTERVAL_MS'],
+                            SCRAPER_CONFIG['PREFETCH_MAX_IDLE'])
+        return True
+
+    async def recycle_list_tab(self, list_tab, log_callback=None):
+        """采样结果列表标签页的内存指标，超过阈值时换用新的标签页，返回新标签页，否则返回None
+
+        需要重启浏览器时本查询先回收标签页，浏览器在下一个查询前重启
+        """
+        try:
+            action, reason = self.memory.check(await list_tab.send('Performance.getMetrics'))
+        except CDPError:
+            return None
+        if not action:
+            return None
+        if log_callback:
+            log_callback(f"内存监控: {reason}，回收标签页后从当前查询继续" +
+                         ("，下一个查询前重启浏览器" if action == 'browser' else ""))
+        tab = await self.driver.new_tab()
+        await list_tab.close()
+        self.main_tab = tab
+        self.memory.recycled('tab')
+        if action == 'browser':
+            self.memory.restart_pending = True
+        return tab
+
+    async def scrape_async(self, processed, target_count, progress_callback, log_callback, result_callback):
+        timeouts = SCRAPER_CONFIG['STEP_TIMEOUTS']
+        list_tab = self.main_tab
+        if not await self.open_results(list_tab, log_callback):
+            return
+
+        # 详情标签页从队列领取卡片并发提取，队列容量限制结果列表领先的程度
+        queue = asyncio.Queue(maxsize=self.tab_count * 2)
+        tabs = [await self.driver.new_tab() for _ in range(self.tab_count)]
+        workers = [asyncio.ensure_future(self.detail_worker(tab, queue, processed, target_count,
+                                                            progress_callback, log_callback, result_callback))
+                   for tab in tabs]
+        seen_cards = {}
+        list_ended = False
+        position = 0
+        clicks = []
+        try:
+            while self.is_running and self.result_count < target_count:
+                await self.wait_while_paused()
+                # 结果列表累积的DOM过多时换用新标签页重新打开查询，已获取的商户直接跳过
+                if self.memory and self.memory.due():
+                    tab = await self.recycle_list_tab(list_tab, log_callback)
+                    if tab:
+                        list_tab = tab
+                        if not await self.open_results(list_tab, log_callback):
+                            break
+                        position = 0
+                        continue
+                sel = self.selectors.script_selectors()
+                batch = await list_tab.call(CARD_BATCH_SCRIPT, element(self.selectors.css('results_container')), sel,
+                                            position) or {}
+                self.selectors.observe(batch.get('matched'))
+                if batch.get('total', 0) < position:
+                    # 列表重新渲染，从头读取
+                    position = 0
+                    continue
+                cards = batch.get('cards', [])
+                position = batch.get('total', position)
+                if log_callback and cards:
+                    log_callback(f"当前页面找到 {len(cards)} 个商户")
+                known = self.skipped_known
+                for card in cards:
+                    card.update(parse_place_url(card.get('href', '')))
+                    seen_cards[card_identity(card)] = card
+                    self.cards_seen = len(seen_cards)
+                    # 先查缓存：同一查询获取过的商户由缓存返回，其余已知商户按索引跳过
+                    if card.get('place_id') and place_key(card) in processed:
+                        continue
+                    cached = self.cache.get_detail(card) if self.cache and card.get('place_id') else None
+                    if cached:
+                        if not self.accept_result(cached, processed, target_count, progress_callback,
+                                                  result_callback):
+                            break
+                    elif card.get('place_id') and self.is_known(card):
+                        continue
+                    elif card.get('href'):
+                        await queue.put(card)
+                    else:
+                        clicks.append(card)
+                # 没有详情链接的卡片在结果列表标签页中逐个点击提取，详情标签页同时继续处理队列
+                while clicks and self.is_running and self.result_count < target_count:
+                    await self.wait_while_paused()
+                    card = clicks.pop(0)
+                    try:
+                        result = await self.extract_clicked(list_tab, card, log_callback)
+                    except Exception as e:
+                        if log_callback:
+                            log_callback(f"处理商户时出错: {str(e)}")
+                        continue
+                    if result:
+                        self.save_detail(result, processed, target_count, progress_callback, result_callback)
+                clicks = []
+                if self.skipped_known > known and log_callback:
+                    log_callback(f"跳过 {self.skipped_known - known} 个已由其他查询获取的商户"
+                                 f"（累计 {self.skipped_known} 个）")
+                await list_tab.evaluate(
+                    f"if (window.__scraperPrefetch) {{ window.__scraperPrefetch.consumed = {position}; }}"
+                )
+                if self.result_count >= target_count or not self.is_running:
+                    break
+                # 等待预取加载新的卡片或到达列表底部
+                ready = (f"(function () {{ var s = window.__scraperPrefetch || {{detached: true}}; "
+                         f"return s.total > {position} || s.ended || s.detached; }})()")
+                await list_tab.wait_for(ready, timeouts['scroll'])
+                state = await list_tab.evaluate("window.__scraperPrefetch || {detached: true}") or {}
+                self.selectors.observe(state.get('matched'))
+                if state.get('detached'):
+                    await list_tab.call(PREFETCH_SCRIPT, element(self.selectors.css('results_container')), sel,
+                                        SCRAPER_CONFIG['PREFETCH_LOOKAHEAD'],
+                                        SCRAPER_CONFIG['PREFETCH_INTERVAL_MS'], SCRAPER_CONFIG['PREFETCH_MAX_IDLE'])
+                elif state.get('ended') and state.get('total', 0) <= position:
+                    if log_callback:
+                        log_callback("已到达列表底部")
+                    list_ended = True
+                    break
+            for _ in tabs:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            for tab in tabs:
+                await tab.close()
+            if self.cache and seen_cards:
+                self.cache.put_query(self.current_query, self.current_viewport, list(seen_cards.values()), list_ended)
+
+    async def detail_worker(self, tab, queue, processed, target_count, progress_callback, log_callback,
+                            result_callback):
+        while True:
+            card = await queue.get()
+            if card is None:
+                break
+            if not self.is_running or self.result_count >= target_count:
+                continue
+            await self.wait_while_paused()
+            try:
+                result = await self.extract_detail(tab, card, log_callback)
+            except Exception as e:
+                if log_callback:
+                    log_callback(f"处理商户时出错: {str(e)}")
+                continue
+            if result:
+                self.save_detail(result, processed, target_count, progress_callback, result_callback)
+
+    def save_detail(self, result, processed, target_count, progress_callback, result_callback):
+        if self.cache:
+            self.cache.put_detail(result)
+        self.accept_result(result, processed, target_count, progress_callback, result_callback)
+
+    async def extract_detail(self, tab, card, log_callback=None):
+        """在详情标签页中按链接打开商户并提取信息，返回与extract_place_info相同的结果，详情超时返回None"""
+        started = await self.pace_async()
+        await tab.navigate(card['href'])
+        self.pages_loaded += 1
+        return await self.read_detail(tab, card, started, log_callback)
+
+    async def extract_clicked(self, list_tab, card, log_callback=None):
+        """在结果列表标签页中点击没有详情链接的卡片提取信息，读取后关闭详情面板返回列表；
+        商户标识从点击后的页面链接中解析，详情超时或找不到卡片时返回None
+        """
+        if not card.get('name'):
+            if log_callback:
+                log_callback("获取基本信息失败: 卡片缺少名称")
+            return None
+        started = await self.pace_async()
+        clicked = await list_tab.call(CLICK_CARD_SCRIPT, element(self.selectors.css('results_container')),
+                                      self.selectors.script_selectors(), card.get('index', 0), card['name']) or {}
+        self.selectors.observe(clicked.get('matched'))
+        if not clicked.get('clicked'):
+            if log_callback:
+                log_callback(f"无法点击商户详情: {card['name']}")
+            return None
+        self.pages_loaded += 1
+        try:
+            result = await self.read_detail(list_tab, card, started, log_callback)
+            if result and not result.get('place_id'):
+                location = parse_place_url(await list_tab.evaluate("location.href") or '')
+                result.update({key: value for key, value in location.items() if value})
+            return result
+        finally:
+            await self.close_detail_panel(list_tab)
+
+    async def close_detail_panel(self, list_tab):
+        """关闭详情面板，等待结果列表重新出现"""
+        await list_tab.call(CLOSE_PANEL_SCRIPT, self.selectors.css('back_button'))
+        closed = (f"!document.querySelector({json.dumps(self.selectors.css('detail_panel'))}) && "
+                  f"!!document.querySelector({json.dumps(self.selectors.css('results_container'))})")
+        await list_tab.wait_for(closed, SCRAPER_CONFIG['STEP_TIMEOUTS']['panel_close'])
+
+    async def read_detail(self, tab, card, started, log_callback=None):
+        """等待标签页中的详情面板并读取，详情超时返回None"""
+        sel = self.selectors.script_selectors()
+        panel_exists = f"!!document.querySelector({json.dumps(self.selectors.css('detail_panel'))})"
+        if not await tab.wait_for(panel_exists, SCRAPER_CONFIG['STEP_TIMEOUTS']['detail_panel']):
+            # 与Selenium后端一致，超时的商户不登记，避免空记录写入索引和缓存
+            self.record_outcome('timeout', started)
+            if log_callback:
+                log_callback(f"等待商户详情超时: {card['name']}")
+            return None
+        expand = await tab.call(EXPAND_BUTTONS_SCRIPT, sel) or {}
+        self.selectors.observe(expand.get('matched'))
+        if expand.get('clicked'):
+            await asyncio.sleep(SCRAPER_CONFIG['DOM_QUIET_MS'] / 1000)
+        panel_data = await tab.call(DETAIL_BATCH_SCRIPT, element(self.selectors.css('detail_panel')), sel) or {}
+        self.selectors.observe(panel_data.get('matched'))
+        fields = get_extractor(self.current_country).extract(panel_data.get('texts', []),
+                                                             panel_data.get('container_texts', []))
+        self.record_outcome('ok', started)
+        return self.build_result(card, fields, log_callback)
@@ -0,0 +1,379 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+
+# 命令行入口：无需图形界面，只导入采集路径需要的模块，适合在无显示器的服务器上运行
+#   python cli.py search --country Germany --business "coffee shop" --count 100
+#   python cli.py campaign tasks.csv --workers 4 --resume
+#   python cli.py daemon < jobs.jsonl
+#   python cli.py serve --port 8765 --engines 2
+#   python cli.py queue add shops --file tasks.csv --db /mnt/shared/queue.db   （在任意一台机器上）
+#   python cli.py queue work shops --workers 4 --db /mnt/shared/queue.db       （在每台机器上）
+# 结果以JSON Lines写入标准输出或--output指定的文件，日志和进度写入标准错误
+
+
+class EventWriter:
+    """将事件写为JSON Lines：结果写入结果输出，其余事件写入日志输出"""
+
+    def __init__(self, output=None, log_format='text', quiet=False):
+        self.results = open(output, 'a', encoding='utf-8') if output and output != '-' else sys.stdout
+        self.log_format = log_format
+        self.quiet = quiet
+        # 信号处理函数可能在主线程持有锁时写日志
+        self.lock = threading.RLock()
+
+    def write(self, stream, data):
+        stream.write(json.dumps(data, ensure_ascii=False, default=str) + '\n')
+        stream.flush()
+
+    def emit(self, kind, job_id, payload=None):
+        with self.lock:
+            if kind == 'result':
+                self.write(self.results, payload if self.results is not sys.stdout or job_id is None
+                           else {'job': job_id, **payload})
+                return
+            if self.quiet and kind in ('log', 'progress'):
+                return
+            if self.log_format == 'json':
+                self.write(sys.stderr, {'event': kind, 'job': job_id, 'time': time.time(), 'data': payload})
+            elif kind == 'log':
+                sys.stderr.write(f"{time.strftime('%H:%M:%S')} {payload}\n")
+            elif kind == 'done':
+                sys.stderr.write(f"任务 {job_id or ''} 结束: {payload['status']}, 获取商户 {payload['result_count']} 个\n")
+            elif kind == 'error':
+                sys.stderr.write(f"错误: {payload}\n")
+            sys.stderr.flush()
+
+    def close(self):
+        if self.results is not sys.stdout:
+            self.results.close()
+
+
+def proxy_list(args):
+    """命令行指定的代理，未指定时返回None表示使用配置中的代理"""
+    from proxy_pool import parse_proxy, load_proxy_file
+    servers = [proxy for proxy in (parse_proxy(p) for p in args.proxy or []) if proxy]
+    if args.proxy_file:
+        servers += load_proxy_file(args.proxy_file)
+    if args.no_proxy:
+        return []
+    return servers or None
+
+
+def search_spec(args):
+    if args.count <= 0:
+        raise ValueError("目标数量必须大于0")
+    spec = {
+        'type': 'search',
+        'country': args.country,
+        'business_type': args.business,
+        'target_count': args.count,
+        'resume': args.resume
+    }
+    if args.tiling:
+        spec['type'] = 'tiling'
+    elif args.per_query:
+        from campaign import build_matrix
+        countries = [c.strip() for c in args.country.split(',') if c.strip()]
+        business_types = [b.strip() for b in args.business.split(',') if b.strip()]
+        spec = {
+            'type': 'campaign',
+            'name': f"{args.country}_{args.business}".replace(',', '-'),
+            'items': build_matrix(countries, business_types, args.count),
+            'resume': args.resume
+        }
+    return spec
+
+
+def campaign_spec(args):
+    from campaign import load_campaign_file
+    items = load_campaign_file(args.file)
+    if not items:
+        raise ValueError("任务文件中没有有效的查询")
+    return {
+        'type': 'campaign',
+        'name': args.name or os.path.splitext(os.path.basename(args.file))[0],
+        'items': items,
+        'resume': args.resume
+    }
+
+
+def run_job(spec, writer):
+    """在当前进程中执行一个任务，收到SIGINT/SIGTERM时停止任务并保存进度，返回退出码"""
+    from engine import build_job
+    from proxy_pool import set_proxies, configured_proxies
+    from place_index import set_index_enabled
+
+    set_proxies(spec['proxies'] if spec.get('proxies') is not None else configured_proxies())
+    set_index_enabled(spec.get('skip_known'))
+    job = build_job(spec)
+    state = {'progress': -1, 'results': 0, 'stopped': False}
+
+    def progress(value):
+        if value != state['progress']:
+            state['progress'] = value
+            writer.emit('progress', None, value)
+
+    def result(record):
+        state['results'] += 1
+        writer.emit('result', None, record)
+
+    def on_signal(signum, frame):
+        if state['stopped']:
+            # 再次收到信号时直接退出
+            raise KeyboardInterrupt
+        state['stopped'] = True
+        writer.emit('log', None, "收到停止信号，正在停止并保存进度...")
+        job.stop()
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    status = 'done'
+    writer.emit('started', None, spec)
+    try:
+        job.run(spec.get('worker_count', 1), progress, lambda message: writer.emit('log', None, message),
+                result_callback=result)
+        if state['stopped']:
+            status = 'cancelled'
+    except Exception as e:
+        status = 'failed'
+        writer.emit('log', None, f"运行错误: {str(e)}")
+    writer.emit('done', None, {'status': status, 'result_count': state['results']})
+    return {'done': 0, 'failed': 1, 'cancelled': 130}[status]
+
+
+def run_daemon(args, writer):
+    """常驻模式：从标准输入或文件逐行读取JSON任务描述，提交给引擎进程依次执行，事件以JSON Lines输出
+
+    每行一个任务描述（同engine.build_job），或控制命令 {"command": "stop"|"pause"|"resume", "job": 编号}
+    输入结束后等待已提交的任务完成再退出
+    """
+    from engine import EngineProcess
+
+    proxies = proxy_list(args)
+    engine = EngineProcess()
+    engine.start()
+    pending = set()
+    state = {'eof': False}
+    lock = threading.Lock()
+    commands = {'stop': engine.stop_job, 'pause': engine.pause_job, 'resume': engine.resume_job}
+
+    def read_jobs():
+        source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+        try:
+            for line in source:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    message = json.loads(line)
+                    if 'command' in message:
+                        commands[message['command']](message['job'])
+                        continue
+                    message.setdefault('type', 'search')
+                    message.setdefault('worker_count', args.workers)
+                    message.setdefault('proxies', proxies)
+                    message.setdefault('skip_known', args.skip_known)
+                    with lock:
+                        job_id = engine.submit(message)
+                        pending.add(job_id)
+                    writer.emit('submitted', job_id, message)
+                except (ValueError, KeyError) as e:
+                    writer.emit('error', None, f"无效的任务描述: {line[:200]} ({str(e)})")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            state['eof'] = True
+
+    def on_signal(signum, frame):
+        # 信号处理函数在主线程中执行，不能等待主线程可能持有的锁
+        state['eof'] = True
+        for job_id in list(pending):
+            engine.stop_job(job_id)
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    threading.Thread(target=read_jobs, daemon=True).start()
+    try:
+        while True:
+            with lock:
+                if state['eof'] and not pending:
+                    break
+            event = engine.get(timeout=1)
+            if event is None:
+                if not engine.alive():
+                    writer.emit('error', None, "引擎进程已退出")
+                    return 1
+                continue
+            kind, job_id, payload = event
+            writer.emit(kind, job_id, payload)
+            if kind == 'done':
+                with lock:
+                    pending.discard(job_id)
+    finally:
+        engine.shutdown()
+    return 0
+
+
+def run_server(args):
+    """本地任务接口，见job_server.py"""
+    from job_server import serve
+
+    def on_signal(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, on_signal)
+    serve(args.host, args.port, args.engines, args.verbose,
+          log=lambda message: print(message, file=sys.stderr, flush=True))
+    return 0
+
+
+def queue_items(args):
+    """queue add 要加入的条目：任务文件、国家 × 行业组合，或地理范围的初始分块"""
+    if args.file:
+        from campaign import load_campaign_file
+        return load_campaign_file(args.file)
+    if not args.business:
+        raise ValueError("需要--file，或--business配合--country/--tiles")
+    if args.tiles:
+        from tiling import BOUNDS_PATTERN
+        from work_queue import tile_items
+        from config import TILING_CONFIG
+        match = BOUNDS_PATTERN.match(args.tiles)
+        if match:
+            bounds = tuple(float(v) for v in match.groups())
+        elif args.tiles in TILING_CONFIG['REGIONS']:
+            bounds = tuple(TILING_CONFIG['REGIONS'][args.tiles])
+        else:
+            raise ValueError("分块范围需写作 south,west,north,east，或在TILING_CONFIG['REGIONS']中配置")
+        return tile_items(args.business, bounds, args.count)
+    if not args.country or not args.count:
+        raise ValueError("需要--country和--count")
+    from campaign import build_matrix
+    return build_matrix([c.strip() for c in args.country.split(',') if c.strip()],
+                        [b.strip() for b in args.business.split(',') if b.strip()], args.count)
+
+
+def run_queue(args, writer):
+    """共享工作队列：add 加入条目，work 在本机领取并执行，status 查看进度，export 导出合并结果，retry 重试失败条目"""
+    if args.action == 'work':
+        spec = {'type': 'queue', 'name': args.name, 'path': args.db, 'worker_count': args.workers,
+                'proxies': proxy_list(args), 'skip_known': args.skip_known}
+        return run_job(spec, writer)
+
+    from work_queue import WorkQueue
+    queue = WorkQueue(args.db)
+    try:
+        if args.action == 'add':
+            items = queue_items(args)
+            added = queue.add(args.name, items)
+            writer.emit('log', None, f"加入 {added} 个条目（{len(items) - added} 个已存在）")
+        elif args.action == 'retry':
+            writer.emit('log', None, f"重新排队 {queue.retry(args.name)} 个失败的条目")
+        elif args.action == 'export':
+            count = 0
+            journal = None
+            if args.csv:
+                from journal import ResultJournal
+                journal = ResultJournal(f"queue_{args.name}")
+            for result in queue.results(args.name):
+                count += 1
+                if journal:
+                    journal.append(result)
+                else:
+                    writer.emit('result', None, result)
+            if journal:
+                journal.close()
+                journal.export_csv(lambda message: writer.emit('log', None, message))
+            writer.emit('log', None, f"导出 {count} 条结果")
+        stats = queue.stats(args.name)
+        stats['owners'] = queue.owners(args.name)
+        writer.emit('status', None, stats)
+        if args.log_format == 'text' and not args.quiet:
+            owners = ', '.join(f"{owner} {count}" for owner, count in stats['owners'].items()) or '无'
+            writer.emit('log', None, f"队列 {args.name}: 待领取 {stats['pending']}, 处理中 {stats['leased']}"
+                                     f"（{owners}）, 已完成 {stats['done']}, 失败 {stats['failed']}, "
+                                     f"已合并商户 {stats['results']} 个")
+    finally:
+        queue.close()
+    return 0
+
+
+def add_common_arguments(parser):
+    parser.add_argument('--workers', type=int, default=1, help="浏览器数量，多个查询时并行执行")
+    parser.add_argument('--resume', action='store_true', help="从上次中断处继续")
+    parser.add_argument('--proxy', action='append', help="代理地址，可多次指定")
+    parser.add_argument('--proxy-file', help="代理列表文件，每行一个代理")
+    parser.add_argument('--no-proxy', action='store_true', help="忽略配置中的代理")
+    parser.add_argument('--skip-known', action='store_true', default=None,
+                        help="跳过之前由其他查询获取过的商户，默认按配置")
+    parser.add_argument('--output', '-o', default='-', help="结果输出文件（JSON Lines），默认标准输出")
+    parser.add_argument('--log-format', choices=('text', 'json'), default='text', help="日志和进度的输出格式")
+    parser.add_argument('--quiet', '-q', action='store_true', help="不输出日志和进度")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="外贸获客助手命令行")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    search = subparsers.add_parser('search', help="按国家和行业搜索，均支持逗号分隔")
+    search.add_argument('--country', required=True)
+    search.add_argument('--business', required=True)
+    search.add_argument('--count', type=int, required=True, help="目标数量")
+    mode = search.add_mutually_exclusive_group()
+    mode.add_argument('--tiling', action='store_true', help="地理分块模式，仅支持单个地区和行业")
+    mode.add_argument('--per-query', action='store_true', help="每个查询单独达到目标数量并单独保存结果")
+    add_common_arguments(search)
+
+    campaign = subparsers.add_parser('campaign', help="执行CSV或JSON批量任务文件")
+    campaign.add_argument('file')
+    campaign.add_argument('--name', help="任务名称，默认为文件名，用于断点续爬")
+    add_common_arguments(campaign)
+
+    daemon = subparsers.add_parser('daemon', help="常驻模式，逐行读取JSON任务描述")
+    daemon.add_argument('--input', '-i', default='-', help="任务描述文件，默认标准输入")
+    add_common_arguments(daemon)
+
+    server = subparsers.add_parser('serve', help="启动本地HTTP任务接口")
+    server.add_argument('--host', help="监听地址，默认只监听本机")
+    server.add_argument('--port', type=int)
+    server.add_argument('--engines', type=int, help="引擎进程数量，即可同时运行的任务数")
+    server.add_argument('--verbose', '-v', action='store_true', help="输出请求日志")
+
+    work_queue = subparsers.add_parser('queue', help="多台机器共同执行的共享工作队列")
+    work_queue.add_argument('action', choices=('add', 'work', 'status', 'export', 'retry'))
+    work_queue.add_argument('name', help="队列名称，同一个队列文件可包含多个队列")
+    work_queue.add_argument('--db', help="队列文件，多台机器共用时放在共享存储上")
+    work_queue.add_argument('--file', help="add: CSV或JSON任务文件")
+    work_queue.add_argument('--country', help="add: 国家，支持逗号分隔")
+    work_queue.add_argument('--business', help="add: 行业，支持逗号分隔；--tiles时为单个行业")
+    work_queue.add_argument('--count', type=int, help="add: 每个条目的目标数量")
+    work_queue.add_argument('--tiles', help="add: 将范围 south,west,north,east 划分为分块条目")
+    work_queue.add_argument('--csv', action='store_true', help="export: 导出为output目录下的CSV文件")
+    add_common_arguments(work_queue)
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        return run_server(args)
+    writer = EventWriter(args.output, args.log_format, args.quiet)
+    try:
+        if args.command == 'daemon':
+            return run_daemon(args, writer)
+        if args.command == 'queue':
+            return run_queue(args, writer)
+        spec = search_spec(args) if args.command == 'search' else campaign_spec(args)
+        spec.update({'worker_count': args.workers, 'proxies': proxy_list(args), 'skip_known': args.skip_known})
+        return run_job(spec, writer)
+    except (OSError, ValueError) as e:
+        writer.emit('error', None, str(e))
+        return 2
+    finally:
+        writer.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,16 +6,48 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Chrome配置
 CHROME_OPTIONS = {
     'arguments': [
+        '--headless=new',
         '--disable-gpu',
         '--no-sandbox',
         '--disable-dev-shm-usage',
         '--window-size=1920,1080',
         '--start-maximized',
+        '--hide-scrollbars',
+        '--enable-javascript',
         '--disable-extensions',
         '--disable-popup-blocking',
         '--disable-blink-features=AutomationControlled',
-        '--lang=zh-CN'
-    ]
+        '--lang=zh-CN',
+        'user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+    ],
+    # 资源拦截：按类别在浏览器层面拦截不需要的资源
+    'block_resources': {
+        'images': True,
+        'fonts': True,
+        'media': True,
+        'map_tiles': True,
+        'telemetry': True
+    },
+    # 各类资源的URL匹配规则（DevTools Network.setBlockedURLs通配符）
+    'block_patterns': {
+        'images': ['*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.ico*',
+                   '*googleusercontent.com/p/*', '*ggpht.com*', '*gstatic.com/images*'],
+        'fonts': ['*.woff*', '*.ttf*', '*.otf*', '*fonts.gstatic.com*', '*fonts.googleapis.com*'],
+        'media': ['*.mp4*', '*.webm*', '*.mp3*', '*.m4a*'],
+        'map_tiles': ['*/maps/vt*', '*/kh/v=*', '*khms*.google.com*', '*/maps/rpc/vt*', '*streetviewpixels*'],
+        'telemetry': ['*/gen_204*', '*/log?*', '*/csi?*', '*google-analytics.com*', '*doubleclick.net*',
+                      '*googletagmanager.com*']
+    },
+    # 被拦截的请求数始终从控制台日志统计；实际加载的请求数和流量需要开启浏览器性能日志，有额外开销，默认关闭
+    'block_byte_stats': False,
+    # 各类资源的平均大小估计（字节）：被拦截的请求没有实际流量，节省的流量只能按此估算
+    'block_estimated_bytes': {
+        'images': 30000,
+        'fonts': 40000,
+        'media': 500000,
+        'map_tiles': 25000,
+        'telemetry': 500
+    }
 }
 
 # 爬虫配置
@@ -23,8 +55,233 @@ SCRAPER_CONFIG = {
     'MAX_RETRIES': 3,
     'WAIT_TIMEOUT': 10,
     'SCROLL_PAUSE_TIME': 5,
-    'PAGE_LOAD_TIMEOUT': 30
+    'PAGE_LOAD_TIMEOUT': 30,
+    # Maps入口地址，可指向回放录制响应的本地服务
+    'MAPS_BASE_URL': 'https://www.google.com/maps',
+    # 捕获模式：从网络响应中直接解析商户，仅对未覆盖的卡片点击详情；仅支持selenium后端
+    'CAPTURE_MODE': False,
+    # 保存捕获的原始响应的目录，None表示不保存
+    'CAPTURE_SAVE_DIR': None,
+    # 搜索方式：direct 直接打开搜索链接，typed 在搜索框中输入
+    'SEARCH_MODE': 'direct',
+    # 各步骤就绪等待的超时（秒）
+    'STEP_TIMEOUTS': {
+        'search_box': 10,
+        'search_results': 20,
+        'results_settle': 5,
+        'scroll': 5,
+        'detail_panel': 10,
+        'detail_settle': 5,
+        'panel_close': 5
+    },
+    # DOM在该毫秒数内无变化即视为加载完成
+    'DOM_QUIET_MS': 300,
+    # 结果列表预取：保持领先的未处理卡片数、检查间隔（毫秒）、判定到底前的无增长次数
+    'PREFETCH_LOOKAHEAD': 20,
+    'PREFETCH_INTERVAL_MS': 500,
+    'PREFETCH_MAX_IDLE': 10,
+    # 详情提取方式：click 在结果列表中点击卡片后返回，tabs 在后台标签页中按链接并发加载详情
+    'DETAIL_MODE': 'click',
+    # tabs模式和cdp后端中同时加载详情的标签页数量
+    'DETAIL_TABS': 4,
+    # 浏览器后端：selenium 或 cdp（asyncio直连DevTools协议，一个浏览器并发驱动多个标签页；
+    # 没有详情链接的卡片在结果列表标签页中点击提取，不支持捕获模式）
+    'BACKEND': 'selenium'
+}
+
+# 页面元素选择器：每个名称对应一条备选链，按顺序探测，第一个有结果的备选项生效并移到链首；
+# 详情信息、详情容器和展开按钮的各备选项匹配不同元素，合并匹配
+SELECTORS = {
+    'results_container': ['div.m6QErb.DxyBCb.kA9KIf.dS8AEf', "div[role='feed']"],
+    'result_card': ['div.Nv2PK.THOPZb.CpccDe', 'div.Nv2PK'],
+    'card_name': ['div.qBF1Pd.fontHeadlineSmall', 'div.qBF1Pd'],
+    'card_rating': ['span.MW4etd'],
+    'card_reviews': ['span.UY7F9'],
+    'card_link': ['a.hfpxzc', "a[href*='/maps/place/']"],
+    'card_info_row': ['div.W4Efsd'],
+    'search_box': ['input#searchboxinput'],
+    'search_button': ['button#searchbox-searchbutton'],
+    'load_more': ['button.HlvSq'],
+    'list_end': ['span.HlvSq'],
+    'detail_panel': ['div.m6QErb.tLjsW.eKbjU'],
+    'expand_button': ['button.w8nwRe.kyuRq', "button[aria-label*='展开']", "button[aria-label*='更多']"],
+    'detail_info': ['button.CsEnBe', "div[role='button']", 'div.rogA2c', 'div.Io6YTe',
+                    'div.kR99db', 'span.fontBodyMedium', 'div.cXHGnc'],
+    'detail_container': ['div.RcCsl', 'div.Qe6Vdb', 'div.dbg0pd'],
+    'back_button': ["button[aria-label='返回搜索结果']"]
+}
+
+# 并行工作进程配置
+WORKER_POOL_CONFIG = {
+    'WORKER_COUNT': 4,
+    'DEBUG_PORT_BASE': 9300,
+    'PROFILE_DIR': os.path.join(BASE_DIR, 'profiles')
+}
+
+# 预热浏览器池配置
+BROWSER_POOL_CONFIG = {
+    'POOL_SIZE': 1,
+    # 单个浏览器加载页面数达到该值后回收重建
+    'MAX_PAGES': 500,
+    # 等待预热浏览器的最长时间（秒），超时则直接冷启动
+    'LEASE_TIMEOUT': 60
 }
 
 # 输出配置
-OUTPUT_DIR = os.path.join(BASE_DIR, 'output') 
\ No newline at end of file
+OUTPUT_DIR = os.path.join(BASE_DIR, 'output')
+
+# 检查点日志配置
+JOURNAL_CONFIG = {
+    'DIR': os.path.join(OUTPUT_DIR, 'journals'),
+    # 每写入多少条或间隔多少秒执行一次fsync
+    'FSYNC_EVERY': 20,
+    'FSYNC_INTERVAL': 5,
+    # 导出CSV时每批读取的记录数
+    'EXPORT_CHUNK_SIZE': 1000
+}
+
+# 批量任务配置
+CAMPAIGN_CONFIG = {
+    # 批量任务状态文件目录，记录每个查询的进度以便中断后继续
+    'DIR': os.path.join(OUTPUT_DIR, 'campaigns'),
+    # 任务文件未指定时使用的目标数量和优先级
+    'DEFAULT_TARGET': 100,
+    'DEFAULT_PRIORITY': 0
+}
+
+# 地理分块配置
+TILING_CONFIG = {
+    # 初始网格的行列数
+    'GRID': 4,
+    # 单个分块的目标数量；结果数达到饱和阈值时认为被列表上限截断，继续四等分
+    'TILE_TARGET': 120,
+    'SATURATION': 100,
+    'MAX_DEPTH': 4,
+    # 地图区域的像素尺寸（窗口宽度减去左侧结果列表），用于在视野与经纬度范围之间换算
+    'MAP_WIDTH_PX': 1500,
+    'MAP_HEIGHT_PX': 1080,
+    # 手动指定区域范围 (south, west, north, east)，未指定的区域通过Maps定位
+    'REGIONS': {}
+}
+
+# 跨任务商户索引配置
+PLACE_INDEX_CONFIG = {
+    # 启用后由其他查询获取过的商户不再提取详情，也不计入目标数量；重复同一查询（含视野）不跳过
+    # 默认关闭，界面勾选"跳过已获取的商户"或命令行 --skip-known 按任务开启
+    'ENABLED': False,
+    'PATH': os.path.join(OUTPUT_DIR, 'place_index.db'),
+    # 每新增多少条提交一次
+    'COMMIT_EVERY': 50
+}
+
+# 本地缓存配置
+CACHE_CONFIG = {
+    'ENABLED': True,
+    'PATH': os.path.join(OUTPUT_DIR, 'cache.db'),
+    # 商户详情（地址、电话、评分）和查询结果列表的有效期（秒）
+    'DETAIL_TTL': 7 * 24 * 3600,
+    'QUERY_TTL': 24 * 3600,
+    # 容量上限，超出后淘汰最早写入的条目
+    'MAX_DETAILS': 200000,
+    'MAX_QUERIES': 5000
+}
+
+# CDP后端配置
+CDP_CONFIG = {
+    # Chrome可执行文件路径，None表示自动查找
+    'CHROME_BINARY': None,
+    # 等待浏览器调试端口就绪的时间（秒）
+    'STARTUP_TIMEOUT': 20,
+    # 单条DevTools命令的超时（秒）
+    'COMMAND_TIMEOUT': 30
+}
+
+# 代理池配置
+PROXY_CONFIG = {
+    # 代理列表，格式 host:port 或 scheme://host:port；也可指定代理文件（每行一个，#开头为注释）
+    'PROXIES': [],
+    'FILE': None,
+    # 每个代理的请求速率（次/秒）和突发容量，多个工作进程共用一个代理时合计计算
+    'RATE': 0.5,
+    'BURST': 3,
+    # 健康评分按指数移动平均更新，超时和空结果计为失败；低于阈值的代理暂停使用一段时间（秒）
+    'SCORE_ALPHA': 0.2,
+    'MIN_SCORE': 0.4,
+    'COOLDOWN': 300
+}
+
+# 自适应并发控制配置（AIMD）
+ADAPTIVE_CONFIG = {
+    'ENABLED': True,
+    # 每累计多少次页面操作评估一次
+    'WINDOW': 20,
+    # 窗口内失败（超时、空结果）比例或平均耗时（秒）超过阈值时减速
+    'FAILURE_RATE': 0.2,
+    'LATENCY_LIMIT': 8.0,
+    # 减速时并发数乘以该系数，间隔乘以退避倍数；正常时并发数加一，间隔减少一个步长
+    'DECREASE': 0.5,
+    'BACKOFF': 2.0,
+    'DELAY_STEP': 0.2,
+    'MIN_WORKERS': 1,
+    # 操作间隔（秒）的初始值和范围
+    'INITIAL_DELAY': 0.5,
+    'MIN_DELAY': 0.0,
+    'MAX_DELAY': 30.0,
+    # 重试等待的最小基数（秒）
+    'MIN_BACKOFF': 1.0
+}
+
+# 爬虫引擎进程配置
+ENGINE_CONFIG = {
+    # 事件队列容量：界面处理不过来时引擎在回传日志和结果处等待
+    'QUEUE_SIZE': 1000,
+    # 界面每次最多合并处理的事件数
+    'BATCH': 200,
+    # 停止任务后等待引擎响应的时间（秒），超时则终止并重启引擎
+    'STOP_TIMEOUT': 30
+}
+
+# 本地任务接口配置
+SERVER_CONFIG = {
+    # 默认只监听本机
+    'HOST': '127.0.0.1',
+    'PORT': 8765,
+    # 引擎进程数量，每个引擎依次执行分配给它的任务，多个引擎可同时运行多个任务
+    'ENGINES': 1,
+    # 保留的已结束任务数量，超出时删除最早结束的任务及其结果
+    'KEEP_JOBS': 100,
+    # 流式输出无新事件时发送保活消息的间隔（秒）
+    'HEARTBEAT': 15,
+    # 每个任务保留的最近事件数量，更早的事件不再能通过from=或Last-Event-ID读取；结果写入任务的结果日志文件，不受影响
+    'MAX_EVENTS': 10000
+}
+
+# 共享工作队列配置：多台机器的工作进程从同一个队列文件领取查询或分块
+WORK_QUEUE_CONFIG = {
+    # 队列文件，多台机器共用时放在共享存储上
+    'PATH': os.path.join(OUTPUT_DIR, 'work_queue.db'),
+    # 共享存储（NFS/SMB）不支持WAL，使用回滚日志；仅本机使用时可改为WAL
+    'JOURNAL_MODE': 'DELETE',
+    # 租约时长（秒），到期未续约的条目重新排队
+    'LEASE': 180,
+    # 续约间隔（秒），应明显小于租约时长
+    'HEARTBEAT': 30,
+    # 同一条目最多被领取的次数，超过后标记为失败
+    'MAX_ATTEMPTS': 3,
+    # 暂无可领取的条目时再次查询的间隔（秒）
+    'POLL': 10,
+    # 结果累计多少条写入一次队列文件
+    'BATCH': 20
+}
+
+# 浏览器内存监控配置：通过DevTools协议Performance.getMetrics采样结果列表标签页
+MEMORY_CONFIG = {
+    'ENABLED': True,
+    # 采样间隔（秒）
+    'INTERVAL': 20,
+    # JS堆使用量（MB）或DOM节点数超过阈值时回收标签页
+    'MAX_JS_HEAP_MB': 768,
+    'MAX_DOM_NODES': 200000,
+    # 同一浏览器中回收标签页达到该次数后再次超限时重启整个浏览器
+    'TAB_RECYCLES_PER_BROWSER': 3
+}
@@ -0,0 +1,301 @@
+import time
+import queue
+import threading
+import multiprocessing as mp
+from config import ENGINE_CONFIG
+
+
+class SearchJob:
+    """普通搜索任务：国家和行业支持逗号分隔，多个组合且多个浏览器时使用工作进程池，否则使用单个浏览器"""
+
+    def __init__(self, country, business_type, target_count, resume=False):
+        self.country = country
+        self.business_type = business_type
+        self.target_count = target_count
+        self.resume = resume
+        self.scraper = None
+        self.pool = None
+        self.is_running = False
+
+    def build_work_items(self):
+        countries = [c.strip() for c in self.country.split(',') if c.strip()]
+        business_types = [b.strip() for b in self.business_type.split(',') if b.strip()]
+        return [{'business_type': b, 'country': c} for c in countries for b in business_types]
+
+    def run(self, worker_count=1, progress_callback=None, log_callback=None, browser_pool=None,
+            result_callback=None):
+        from scraper import create_scraper
+        from worker_pool import ScraperWorkerPool
+
+        self.is_running = True
+        work_items = self.build_work_items()
+        if worker_count > 1 and len(work_items) > 1:
+            self.pool = ScraperWorkerPool(worker_count)
+            return self.pool.run(
+                work_items,
+                self.target_count,
+                progress_callback,
+                log_callback,
+                label=f"{self.country}_{self.business_type}".replace(',', '-'),
+                resume=self.resume,
+                result_callback=result_callback
+            )
+        # 从预热浏览器池租用浏览器，任务结束后归还
+        self.scraper = browser_pool.lease(log_callback) if browser_pool else create_scraper()
+        try:
+            if not self.is_running:
+                return 0
+
+            def on_result(result):
+                if result_callback:
+                    result_callback(result)
+                return True
+
+            # 与工作进程池一致，逗号分隔的每个国家/行业组合单独搜索，目标数量为全局目标
+            # 单个组合搜索结束时会报告100%，整体进度按已获取的结果数计算
+            total = 0
+
+            def on_progress(percent):
+                if progress_callback:
+                    progress_callback(min(99, int((total + self.scraper.result_count) / self.target_count * 100)))
+
+            for item in work_items:
+                if not self.is_running or total >= self.target_count:
+                    break
+                self.scraper.scrape(
+                    item['business_type'],
+                    item['country'],
+                    self.target_count - total,
+                    on_progress,
+                    log_callback,
+                    result_callback=on_result,
+                    resume=self.resume
+                )
+                total += self.scraper.result_count
+            if progress_callback and self.is_running:
+                progress_callback(100)
+            return total
+        finally:
+            if browser_pool and self.scraper.driver:
+                browser_pool.release(self.scraper)
+                if log_callback:
+                    log_callback(browser_pool.report())
+
+    def pause(self):
+        """返回False表示当前模式不支持暂停"""
+        if self.pool or not self.scraper:
+            return False
+        self.scraper.is_paused = True
+        return True
+
+    def resume_scraping(self):
+        if self.scraper:
+            self.scraper.is_paused = False
+
+    def stop(self):
+        self.is_running = False
+        if self.pool:
+            self.pool.stop()
+        if self.scraper:
+            self.scraper.is_running = False
+
+
+def build_job(spec):
+    """按任务描述创建任务对象，任务描述只包含可序列化的数据以便跨进程传递
+
+    spec['type']: search（国家/行业）、campaign（批量任务）、tiling（地理分块）或 queue（共享工作队列）
+    """
+    from scraper import check_backend
+    check_backend()
+    if spec['type'] == 'queue':
+        from work_queue import QueueRunner
+        return QueueRunner(spec['name'], spec.get('path'))
+    if spec['type'] == 'campaign':
+        from campaign import Campaign, make_item
+        # 外部提交的查询只需国家和行业，其余字段按默认值补全
+        items = [item if 'status' in item else make_item(**item) for item in spec.get('items') or []]
+        return Campaign(spec['name'], items, spec.get('resume', False))
+    if spec['type'] == 'tiling':
+        from tiling import TiledSearch
+        return TiledSearch(spec['business_type'], spec['country'], spec['target_count'], spec.get('resume', False))
+    return SearchJob(spec['country'], spec['business_type'], spec['target_count'], spec.get('resume', False))
+
+
+def _engine_main(commands, events):
+    """引擎进程入口：持有预热浏览器池，按提交顺序执行任务，日志、进度和结果通过事件队列流式回传
+
+    事件队列有容量上限，消费方处理不过来时引擎在回传处阻塞，不会无限堆积
+    """
+    from browser_pool import BrowserPool
+    from proxy_pool import set_proxies, configured_proxies
+    from place_index import set_index_enabled
+
+    jobs = queue.Queue()
+    cancelled = set()
+    current = {'id': None, 'job': None}
+
+    def emit(kind, job_id, payload=None):
+        events.put((kind, job_id, payload))
+
+    def listen():
+        """控制命令在独立线程中处理，任务执行期间也能及时暂停或停止"""
+        while True:
+            kind, job_id, payload = commands.get()
+            if kind == 'submit':
+                jobs.put((job_id, payload))
+            elif kind == 'shutdown':
+                job = current['job']
+                if job:
+                    job.stop()
+                jobs.put(None)
+                break
+            elif kind == 'stop':
+                # 尚未开始的任务直接取消
+                cancelled.add(job_id)
+                if job_id == current['id'] and current['job']:
+                    current['job'].stop()
+            elif job_id != current['id']:
+                continue
+            elif kind == 'pause':
+                pause = getattr(current['job'], 'pause', None)
+                if pause and pause():
+                    emit('log', job_id, "爬虫已暂停")
+                else:
+                    emit('log', job_id, "当前模式暂不支持暂停")
+            elif kind == 'resume':
+                resume = getattr(current['job'], 'resume_scraping', None)
+                if resume:
+                    resume()
+                    emit('log', job_id, "爬虫继续运行")
+
+    threading.Thread(target=listen, daemon=True).start()
+    browser_pool = BrowserPool()
+    browser_pool.start()
+    emit('ready', None)
+
+    while True:
+        item = jobs.get()
+        if item is None:
+            break
+        job_id, spec = item
+        current['id'] = job_id
+        state = {'progress': -1, 'results': 0}
+
+        def log(message, job_id=job_id):
+            emit('log', job_id, message)
+
+        def progress(value, job_id=job_id, state=state):
+            # 进度未变化时不回传
+            if value != state['progress']:
+                state['progress'] = value
+                emit('progress', job_id, value)
+
+        def result(record, job_id=job_id, state=state):
+            state['results'] += 1
+            emit('result', job_id, record)
+
+        status = 'done'
+        try:
+            set_proxies(spec['proxies'] if spec.get('proxies') is not None else configured_proxies())
+            set_index_enabled(spec.get('skip_known'))
+            job = build_job(spec)
+            current['job'] = job
+            if job_id not in cancelled:
+                emit('started', job_id, spec)
+                job.run(spec.get('worker_count', 1), progress, log, browser_pool=browser_pool,
+                        result_callback=result)
+            if job_id in cancelled:
+                status = 'cancelled'
+        except Exception as e:
+            status = 'failed'
+            log(f"运行错误: {str(e)}")
+        finally:
+            current['id'], current['job'] = None, None
+        emit('done', job_id, {'status': status, 'result_count': state['results']})
+
+    browser_pool.shutdown()
+    emit('exit', None)
+
+
+class EngineProcess:
+    """在独立进程中运行爬虫引擎，调用方通过命令队列提交和控制任务、从事件队列读取日志、进度和结果
+
+    引擎卡死或崩溃时可单独终止并重启，不影响调用方进程
+    """
+
+    def __init__(self):
+        self.ctx = mp.get_context('spawn')
+        self.process = None
+        self.commands = None
+        self.events = None
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.commands = self.ctx.Queue()
+        self.events = self.ctx.Queue(maxsize=ENGINE_CONFIG['QUEUE_SIZE'])
+        # 引擎需要再启动工作进程，因此不能是守护进程
+        self.process = self.ctx.Process(target=_engine_main, args=(self.commands, self.events))
+        self.process.start()
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def submit(self, spec):
+        """提交任务，返回任务编号"""
+        with self.lock:
+            self.next_id += 1
+            job_id = self.next_id
+        self.commands.put(('submit', job_id, spec))
+        return job_id
+
+    def stop_job(self, job_id):
+        self.commands.put(('stop', job_id, None))
+
+    def pause_job(self, job_id):
+        self.commands.put(('pause', job_id, None))
+
+    def resume_job(self, job_id):
+        self.commands.put(('resume', job_id, None))
+
+    def get(self, timeout=None):
+        """读取一条事件 (类型, 任务编号, 内容)，超时返回None"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self, limit):
+        """读取已到达的事件，最多limit条，不等待"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def shutdown(self, timeout=None):
+        """通知引擎停止当前任务并退出，超时未退出时强制终止"""
+        if not self.process:
+            return
+        if self.alive():
+            self.commands.put(('shutdown', None, None))
+            deadline = time.time() + (timeout or ENGINE_CONFIG['STOP_TIMEOUT'])
+            while self.alive() and time.time() < deadline:
+                # 继续读取事件，避免引擎阻塞在已满的事件队列上
+                self.drain(ENGINE_CONFIG['BATCH'])
+                self.process.join(0.2)
+        self.kill()
+
+    def kill(self):
+        if self.alive():
+            self.process.terminate()
+            self.process.join(5)
+            if self.process.is_alive():
+                self.process.kill()
+        self.process = None
+
+    def restart(self):
+        self.kill()
+        self.start()
@@ -0,0 +1,116 @@
+"""电话/地址提取的准确率与吞吐量基准
+
+用法: python extraction_benchmark.py [--fixtures 文件 ...] [--repeat 次数]
+
+默认同时运行调试规则用的标注样本和未参与调试的留出样本，分别输出结果
+"""
+import os
+import re
+import json
+import time
+import argparse
+from field_extraction import get_extractor
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURES_PATH = os.path.join(FIXTURES_DIR, 'extraction_labeled.json')
+HELDOUT_PATH = os.path.join(FIXTURES_DIR, 'extraction_heldout.json')
+
+
+def legacy_extract(texts, container_texts):
+    """原有的逐行正则提取逻辑，作为对比基线"""
+    address = ""
+    phone = ""
+    for text in texts:
+        if not phone:
+            phone_matches = re.findall(r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', text)
+            if phone_matches:
+                phone = phone_matches[0]
+            elif '电话' in text or 'Phone' in text:
+                phone_text = re.sub(r'[^\d+\-() ]', '', text)
+                if phone_text:
+                    phone = phone_text
+        if not address:
+            if ('地址' in text or 'Address' in text or
+                    any(char in text for char in [',', '路', '街', 'Road', 'Street', 'Ave', 'Boulevard', 'Lane'])):
+                if len(text) > 10 and not re.match(r'^[+\d\s-]+$', text):
+                    address = text.replace('地址：', '').replace('Address:', '').strip()
+    if not (phone and address):
+        for text in container_texts:
+            for line in text.split('\n'):
+                if not phone:
+                    phone_matches = re.findall(r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', line)
+                    if phone_matches:
+                        phone = phone_matches[0]
+                if not address and len(line) > 10 and not re.match(r'^[+\d\s-]+$', line):
+                    if any(char in line for char in [',', '路', '街', 'Road', 'Street', 'Ave', 'Boulevard', 'Lane']):
+                        address = line
+    return {'phone': phone, 'address': address}
+
+
+def digits(phone):
+    return re.sub(r'\D', '', phone or '')
+
+
+def same_phone(extracted, expected):
+    """电话按数字比较：两边去掉国内长途前缀0后，一方是另一方的后缀即视为同一号码
+
+    基线不做规范化，国内格式（如 010-8580 1234）与国际格式（+86 10 8580 1234）也按同一号码计算
+    """
+    a, b = digits(extracted).lstrip('0'), digits(expected).lstrip('0')
+    return len(a) >= 7 and len(b) >= 7 and (a.endswith(b) or b.endswith(a))
+
+
+def score(cases, extract):
+    """电话按same_phone比较，地址按全文比较"""
+    phone_ok = address_ok = 0
+    failures = []
+    for case in cases:
+        fields = extract(case)
+        expected = case['expected']
+        phone_match = same_phone(fields['phone'], expected['phone']) if expected['phone'] else not fields['phone']
+        address_match = fields['address'] == expected['address']
+        phone_ok += phone_match
+        address_ok += address_match
+        if not (phone_match and address_match):
+            failures.append((case, fields))
+    return phone_ok / len(cases), address_ok / len(cases), failures
+
+
+def throughput(cases, extract, repeat):
+    """每秒处理的文本条数"""
+    text_count = sum(len(c['texts']) + sum(len(t.split('\n')) for t in c['container_texts']) for c in cases)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for case in cases:
+            extract(case)
+    elapsed = time.perf_counter() - start
+    return text_count * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="电话/地址提取基准")
+    parser.add_argument('--fixtures', nargs='+', default=[FIXTURES_PATH, HELDOUT_PATH])
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--verbose', action='store_true', help="输出识别错误的样本")
+    args = parser.parse_args()
+
+    engines = {
+        'legacy': lambda case: legacy_extract(case['texts'], case['container_texts']),
+        'field_extraction': lambda case: get_extractor(case.get('country')).extract(case['texts'],
+                                                                                     case['container_texts'])
+    }
+    for path in args.fixtures:
+        with open(path, 'r', encoding='utf-8') as f:
+            cases = json.load(f)
+        print(f"{os.path.basename(path)} 样本数: {len(cases)}, 重复 {args.repeat} 次")
+        for name, extract in engines.items():
+            phone_accuracy, address_accuracy, failures = score(cases, extract)
+            rate = throughput(cases, extract, args.repeat)
+            print(f"{name:<18} 电话准确率 {phone_accuracy:6.1%}  地址准确率 {address_accuracy:6.1%}  "
+                  f"吞吐量 {rate:,.0f} 条/秒")
+            if args.verbose:
+                for case, fields in failures:
+                    print(f"    预期 {case['expected']} 实际 {fields}")
+
+if __name__ == '__main__':
+    main()
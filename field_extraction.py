@@ -0,0 +1,187 @@
+import re
+from functools import lru_cache
+
+# 国家名称（中英文及常用缩写）到规则代码的映射
+COUNTRY_ALIASES = {
+    'us': 'US', 'usa': 'US', 'united states': 'US', 'america': 'US', '美国': 'US',
+    'canada': 'CA', 'ca': 'CA', '加拿大': 'CA',
+    'china': 'CN', 'cn': 'CN', '中国': 'CN',
+    'japan': 'JP', 'jp': 'JP', '日本': 'JP',
+    'uk': 'GB', 'gb': 'GB', 'united kingdom': 'GB', 'england': 'GB', 'britain': 'GB', '英国': 'GB',
+    'germany': 'DE', 'de': 'DE', 'deutschland': 'DE', '德国': 'DE'
+}
+
+# 各国电话规则：国际区号、国内长途前缀、号码格式（按置信度从高到低）
+PHONE_RULES = {
+    'US': {'code': '1', 'trunk': '', 'patterns': [
+        (r'(?:\+?1[\s.\-]?)?\(?[2-9]\d{2}\)?[\s.\-]?\d{3}[\s.\-]?\d{4}', 0.9)]},
+    'CA': {'code': '1', 'trunk': '', 'patterns': [
+        (r'(?:\+?1[\s.\-]?)?\(?[2-9]\d{2}\)?[\s.\-]?\d{3}[\s.\-]?\d{4}', 0.9)]},
+    'CN': {'code': '86', 'trunk': '0', 'patterns': [
+        (r'(?:\+?86[\s\-]?)?1[3-9]\d[\s\-]?\d{4}[\s\-]?\d{4}', 0.9),
+        (r'(?:\+?86[\s\-]?)?0\d{2,3}[\s\-]?\d{3,4}[\s\-]?\d{4}', 0.85)]},
+    'JP': {'code': '81', 'trunk': '0', 'patterns': [
+        (r'(?:\+81[\s\-]?|0)\d{1,4}[\s\-]\d{1,4}[\s\-]\d{4}', 0.9)]},
+    'GB': {'code': '44', 'trunk': '0', 'patterns': [
+        (r'(?:\+44\s?(?:\(0\))?\s?|0)\d{2,4}[\s\-]?\d{3,4}[\s\-]?\d{3,4}', 0.85)]},
+    'DE': {'code': '49', 'trunk': '0', 'patterns': [
+        (r'(?:\+49\s?(?:\(0\))?\s?|0)\d{2,5}[\s/\-]?\d{3,9}(?:[\s\-]\d{1,5})?', 0.85)]}
+}
+
+# 适用于所有国家的通用电话规则
+GENERIC_PHONE_PATTERNS = [
+    (r'\+\d{1,3}[\s.\-]?(?:\(?\d{1,5}\)?[\s.\-]?){1,5}\d{2,5}', 0.75),
+    (r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', 0.5)
+]
+
+# 各国地址规则：道路/行政区关键词和邮编格式
+ADDRESS_RULES = {
+    'US': {'keywords': r'\b(?:street|st|road|rd|avenue|ave|boulevard|blvd|lane|ln|drive|dr|way|suite|ste|'
+                       r'highway|hwy|court|ct|place|pl|parkway|pkwy|square|sq|floor|fl)\b\.?',
+           'postal': r'\b[A-Z]{2}\s+\d{5}(?:-\d{4})?\b'},
+    'CA': {'keywords': r'\b(?:street|st|road|rd|avenue|ave|boulevard|blvd|drive|dr|way|suite|unit|rue|chemin)\b\.?',
+           'postal': r'\b[A-Z]\d[A-Z]\s?\d[A-Z]\d\b'},
+    'CN': {'keywords': r'[省市区县路街道号巷弄镇村楼]',
+           'postal': r'(?<!\d)\d{6}(?!\d)'},
+    'JP': {'keywords': r'[都道府県市区町村丁目番地号]|\b(?:chome|ku|shi|machi)\b',
+           'postal': r'〒?\d{3}-\d{4}'},
+    'GB': {'keywords': r'\b(?:street|st|road|rd|avenue|ave|lane|ln|close|way|square|sq|place|hill|gardens|'
+                       r'terrace|crescent|court|house)\b\.?',
+           'postal': r'\b[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}\b'},
+    'DE': {'keywords': r'(?:straße|strasse|str\.|platz|weg|allee|gasse|ring|damm|ufer)',
+           'postal': r'(?<!\d)\d{5}(?!\d)'}
+}
+
+ADDRESS_LABEL = r'^\s*(?:地址|住所|address|adresse|dirección|indirizzo)\s*[:：]\s*'
+PHONE_LABEL = r'(?:电话|電話|phone|tel|telefon|teléfono)'
+# 电话号码至少包含7位数字，不满足的文本无需逐条尝试电话规则
+PHONE_CANDIDATE = r'\d(?:\D{0,3}\d){6}'
+NON_DIGIT = re.compile(r'\D')
+# 达到该置信度的字段不再继续寻找更好的候选
+CONFIDENT = 0.95
+# 不可能是地址的文本：纯号码、链接、Plus Code、营业时间
+NOT_ADDRESS = (r'^[+\d\s\-().]+$|https?://|www\.|\.(?:com|net|org)\b|'
+               r'^[23456789CFGHJMPQRVWX]{4,8}\+[23456789CFGHJMPQRVWX]{2,3}\b|'
+               r'营业|opens?\b|closed?\b|hours\b')
+
+
+class FieldExtractor:
+    """按国家预编译电话和地址规则，一次遍历详情面板文本，返回规范化的电话、地址及置信度"""
+
+    def __init__(self, country=None):
+        self.country = COUNTRY_ALIASES.get((country or '').strip().lower())
+        rule = PHONE_RULES.get(self.country)
+        self.calling_code = rule['code'] if rule else ''
+        self.trunk = rule['trunk'] if rule else ''
+        patterns = (rule['patterns'] if rule else []) + GENERIC_PHONE_PATTERNS
+        self.phone_patterns = [(re.compile(p), confidence) for p, confidence in patterns]
+
+        if self.country in ADDRESS_RULES:
+            address_rules = [ADDRESS_RULES[self.country]]
+        else:
+            # 国家未知时使用所有国家的规则
+            address_rules = list(ADDRESS_RULES.values())
+        # 关键词和电话标签匹配转为小写的文本，不使用忽略大小写的正则，每行的匹配耗时约减半
+        self.address_keywords = re.compile('|'.join(f"(?:{r['keywords']})" for r in address_rules))
+        self.postal = re.compile('|'.join(f"(?:{r['postal']})" for r in address_rules))
+        self.address_label = re.compile(ADDRESS_LABEL, re.I)
+        self.phone_label = re.compile(PHONE_LABEL)
+        self.phone_candidate = re.compile(PHONE_CANDIDATE)
+        self.not_address = re.compile(NOT_ADDRESS, re.I)
+
+    def normalize_phone(self, raw):
+        """规范化为国际格式 +区号号码，无法确定区号时只保留数字"""
+        digits = NON_DIGIT.sub('', raw)
+        if raw.strip().startswith('+'):
+            return '+' + digits
+        if self.calling_code:
+            if self.trunk and digits.startswith(self.trunk):
+                return f"+{self.calling_code}{digits[len(self.trunk):]}"
+            if digits.startswith(self.calling_code) and len(digits) > 10:
+                return '+' + digits
+            return f"+{self.calling_code}{digits}"
+        return digits
+
+    def match_phone(self, text, lowered=None):
+        """返回(原始号码, 置信度)，未匹配返回None；lowered为调用方已转为小写的文本"""
+        if not self.phone_candidate.search(text):
+            return None
+        labelled = bool(self.phone_label.search(lowered or text.lower()))
+        for pattern, confidence in self.phone_patterns:
+            match = pattern.search(text)
+            if not match:
+                continue
+            if not 7 <= len(NON_DIGIT.sub('', match.group(0))) <= 15:
+                continue
+            if labelled:
+                confidence = min(confidence + 0.1, 1.0)
+            return match.group(0), confidence
+        return None
+
+    def match_address(self, text, lowered=None):
+        """返回(地址, 置信度)，未匹配返回None；lowered含义同match_phone"""
+        label = self.address_label.match(text)
+        if label:
+            return text[label.end():].strip(), 0.95
+        if len(text) <= 10:
+            return None
+        # 先做开销小的判断，既没有关键词也没有逗号的文本（大多数行）无需再匹配邮编和排除规则
+        keyword = bool(self.address_keywords.search(lowered or text.lower()))
+        comma = ',' in text or '，' in text
+        if not (keyword or comma) or self.not_address.search(text):
+            return None
+        postal = bool(self.postal.search(text))
+        if keyword and postal:
+            confidence = 0.9
+        elif keyword and comma:
+            confidence = 0.8
+        elif keyword or postal:
+            confidence = 0.6
+        else:
+            confidence = 0.3
+        return text.strip(), confidence
+
+    def extract(self, texts, container_texts=()):
+        """从详情面板文本中提取电话和地址，同等置信度时取先出现的
+
+        texts: 信息按钮的文本和aria-label；container_texts: 更大容器的文本，按行拆分后参与识别
+        """
+        fields = {'phone': '', 'phone_confidence': 0.0, 'address': '', 'address_confidence': 0.0}
+        for text in self.iter_lines(texts, container_texts):
+            phone = None
+            lowered = text.lower()
+            if fields['phone_confidence'] < CONFIDENT:
+                phone = self.match_phone(text, lowered)
+                if phone and phone[1] > fields['phone_confidence']:
+                    fields['phone'], fields['phone_confidence'] = phone
+            if fields['address_confidence'] < CONFIDENT:
+                # 整行都是电话号码时不再判断地址
+                if not (phone and self.not_address.match(text)):
+                    address = self.match_address(text, lowered)
+                    if address and address[1] > fields['address_confidence']:
+                        fields['address'], fields['address_confidence'] = address
+            elif fields['phone_confidence'] >= CONFIDENT:
+                break
+        if fields['phone']:
+            fields['phone'] = self.normalize_phone(fields['phone'])
+        return fields
+
+    def iter_lines(self, texts, container_texts):
+        seen = set()
+        for text in texts:
+            text = text.strip()
+            if text and text not in seen:
+                seen.add(text)
+                yield text
+        for block in container_texts:
+            for line in block.split('\n'):
+                line = line.strip()
+                if line and line not in seen:
+                    seen.add(line)
+                    yield line
+
+
+@lru_cache(maxsize=None)
+def get_extractor(country=None):
+    """按国家缓存的提取器，规则只编译一次"""
+    return FieldExtractor(country)
@@ -0,0 +1,384 @@
+import os
+import json
+import time
+import uuid
+import threading
+from itertools import islice
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from config import SERVER_CONFIG, ENGINE_CONFIG
+from engine import EngineProcess
+from journal import ResultJournal, read_journal
+
+# 本地任务接口：
+#   POST /jobs                  提交任务，请求体为任务描述（同engine.build_job），返回任务编号
+#   GET  /jobs                  所有任务的状态
+#   GET  /jobs/<id>             任务状态
+#   GET  /jobs/<id>/events      流式输出事件，Accept为text/event-stream时使用SSE，否则为JSON Lines
+#                               参数 from=n 从第n个事件开始，types=result,progress 只输出指定类型
+#                               只保留最近的MAX_EVENTS个事件，更早的位置从最早保留的事件开始输出
+#   GET  /jobs/<id>/results     已获取的商户列表，从任务的结果日志文件读取
+#   POST /jobs/<id>/cancel      取消任务，另有 /pause 和 /resume
+#   GET  /health                引擎状态
+
+FINISHED = ('done', 'failed', 'cancelled')
+
+
+def parse_job(body):
+    """校验并补全提交的任务描述，格式错误时抛出ValueError"""
+    try:
+        spec = json.loads(body or b'{}')
+    except ValueError:
+        raise ValueError("请求体不是有效的JSON")
+    if not isinstance(spec, dict):
+        raise ValueError("任务描述必须是JSON对象")
+    spec.setdefault('type', 'search')
+    if spec['type'] not in ('search', 'tiling', 'campaign'):
+        raise ValueError(f"未知的任务类型: {spec['type']}")
+    if spec['type'] == 'campaign':
+        items = spec.get('items')
+        if not items or not all(isinstance(i, dict) and i.get('country') and i.get('business_type')
+                                for i in items):
+            raise ValueError("批量任务需要items，每个查询包含country和business_type")
+        spec.setdefault('name', f"api_{time.strftime('%Y%m%d_%H%M%S')}")
+    else:
+        if not spec.get('country') or not spec.get('business_type'):
+            raise ValueError("需要country和business_type")
+        try:
+            spec['target_count'] = int(spec.get('target_count', 0))
+        except (TypeError, ValueError):
+            raise ValueError("target_count必须是整数")
+        if spec['target_count'] <= 0:
+            raise ValueError("目标数量必须大于0")
+    try:
+        spec['worker_count'] = max(1, int(spec.get('worker_count', 1)))
+    except (TypeError, ValueError):
+        raise ValueError("worker_count必须是整数")
+    spec['resume'] = bool(spec.get('resume', False))
+    if spec.get('skip_known') is not None:
+        spec['skip_known'] = bool(spec['skip_known'])
+    return spec
+
+
+class JobRecord:
+    """服务端记录的任务：状态、最近的事件和结果日志，流式输出的客户端从保留的任意位置读取
+
+    事件编号从任务开始计数，丢弃早期事件后编号不变；商户逐条写入结果日志文件，不在内存中保留
+    """
+
+    def __init__(self, spec):
+        self.id = uuid.uuid4().hex[:12]
+        self.spec = spec
+        self.status = 'queued'
+        self.progress = 0
+        self.result_count = 0
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.engine = None
+        self.engine_job = None
+        self.events = deque(maxlen=SERVER_CONFIG['MAX_EVENTS'])
+        # 已丢弃的早期事件数量，即events中第一个事件的编号
+        self.dropped = 0
+        self.journal = ResultJournal(f"job_{self.id}")
+        self.condition = threading.Condition()
+
+    def add(self, kind, payload=None):
+        with self.condition:
+            if kind == 'started':
+                self.status, self.started = 'running', time.time()
+            elif kind == 'progress':
+                self.progress = payload
+            elif kind == 'result':
+                self.result_count += 1
+                self.journal.append(payload)
+            elif kind == 'done':
+                self.status, self.finished = payload['status'], time.time()
+                self.journal.close()
+                if self.status == 'done':
+                    self.progress = 100
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append({'event': kind, 'time': time.time(), 'data': payload})
+            self.condition.notify_all()
+
+    def finished_job(self):
+        return self.status in FINISHED
+
+    def wait(self, offset, timeout):
+        """等待第offset个及之后的事件，返回(第一个事件的编号, 新事件, 任务是否已结束)
+
+        offset对应的事件已丢弃时从最早保留的事件开始
+        """
+        with self.condition:
+            if self.dropped + len(self.events) <= offset and not self.finished_job():
+                self.condition.wait(timeout)
+            start = max(offset, self.dropped)
+            return start, list(islice(self.events, start - self.dropped, None)), self.finished_job()
+
+    def results(self):
+        # 每条结果写入后已flush，运行中的任务也可直接读取
+        return list(read_journal(self.journal.path))
+
+    def remove(self):
+        """删除任务的结果日志文件"""
+        with self.condition:
+            self.journal.close()
+            if os.path.exists(self.journal.path):
+                os.remove(self.journal.path)
+
+    def describe(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'result_count': self.result_count,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'spec': self.spec
+        }
+
+
+class JobServer:
+    """管理引擎进程和任务：新任务分配给未完成任务最少的引擎，每个引擎一个分发线程将事件转给对应任务"""
+
+    def __init__(self, engine_count=None):
+        self.engines = [EngineProcess() for _ in range(engine_count or SERVER_CONFIG['ENGINES'])]
+        self.jobs = {}
+        self.routes = {}
+        self.lock = threading.Lock()
+        self.running = False
+
+    def start(self):
+        self.running = True
+        for index, engine in enumerate(self.engines):
+            engine.start()
+            threading.Thread(target=self.dispatch, args=(index,), daemon=True).start()
+
+    def dispatch(self, index):
+        engine = self.engines[index]
+        while self.running:
+            event = engine.get(timeout=1)
+            if event is None:
+                if self.running and not engine.alive():
+                    self.engine_failed(index)
+                continue
+            kind, engine_job, payload = event
+            with self.lock:
+                job = self.routes.get((index, engine_job))
+                if kind == 'done':
+                    self.routes.pop((index, engine_job), None)
+            if job:
+                job.add(kind, payload)
+
+    def engine_failed(self, index):
+        """引擎进程意外退出：分配给它的任务标记为失败，然后重启引擎"""
+        with self.lock:
+            lost = [(key, job) for key, job in self.routes.items() if key[0] == index]
+            for key, job in lost:
+                del self.routes[key]
+        for _, job in lost:
+            job.add('log', "引擎进程意外退出，任务中止")
+            job.add('done', {'status': 'failed', 'result_count': job.result_count})
+        self.engines[index].restart()
+
+    def submit(self, spec):
+        job = JobRecord(spec)
+        with self.lock:
+            load = {index: 0 for index in range(len(self.engines))}
+            for index, _ in self.routes:
+                load[index] += 1
+            index = min(load, key=load.get)
+            job.engine = index
+            # 持有锁期间提交，分发线程收到该任务的事件时路由已经存在
+            job.engine_job = self.engines[index].submit(spec)
+            self.routes[(index, job.engine_job)] = job
+            self.jobs[job.id] = job
+            self.prune()
+        return job
+
+    def prune(self):
+        finished = sorted((job for job in self.jobs.values() if job.finished_job()), key=lambda job: job.finished)
+        for job in finished[:max(len(finished) - SERVER_CONFIG['KEEP_JOBS'], 0)]:
+            del self.jobs[job.id]
+            job.remove()
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return [job.describe() for job in sorted(jobs, key=lambda job: job.created)]
+
+    def control(self, job, action):
+        """取消、暂停或继续任务，任务已结束时返回False"""
+        if job.finished_job():
+            return False
+        engine = self.engines[job.engine]
+        {'cancel': engine.stop_job, 'pause': engine.pause_job, 'resume': engine.resume_job}[action](job.engine_job)
+        return True
+
+    def health(self):
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {'engines': [engine.alive() for engine in self.engines],
+                'jobs': {status: statuses.count(status) for status in ('queued', 'running') + FINISHED}}
+
+    def shutdown(self):
+        self.running = False
+        for engine in self.engines:
+            engine.shutdown()
+        # 任务记录不跨进程保留，其结果日志一并删除
+        with self.lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.remove()
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MapsScraper'
+
+    @property
+    def jobs(self):
+        return self.server.job_server
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {'error': message})
+
+    def route(self):
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split('/') if part]
+        return parts, parse_qs(parsed.query)
+
+    def find_job(self, parts):
+        job = self.jobs.get(parts[1]) if len(parts) > 1 else None
+        if not job:
+            self.send_error_json(404, "任务不存在")
+        return job
+
+    def do_GET(self):
+        parts, query = self.route()
+        if parts == ['health']:
+            return self.send_json(200, self.jobs.health())
+        if parts == ['jobs']:
+            return self.send_json(200, self.jobs.list())
+        if not parts or parts[0] != 'jobs' or len(parts) > 3:
+            return self.send_error_json(404, "未知的地址")
+        job = self.find_job(parts)
+        if not job:
+            return
+        if len(parts) == 2:
+            return self.send_json(200, job.describe())
+        if parts[2] == 'results':
+            return self.send_json(200, job.results())
+        if parts[2] == 'events':
+            return self.stream(job, query)
+        self.send_error_json(404, "未知的地址")
+
+    def do_POST(self):
+        parts, _ = self.route()
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if parts == ['jobs']:
+            try:
+                spec = parse_job(body)
+            except ValueError as e:
+                return self.send_error_json(400, str(e))
+            job = self.jobs.submit(spec)
+            return self.send_json(201, job.describe())
+        if len(parts) != 3 or parts[0] != 'jobs' or parts[2] not in ('cancel', 'pause', 'resume'):
+            return self.send_error_json(404, "未知的地址")
+        job = self.find_job(parts)
+        if not job:
+            return
+        if not self.jobs.control(job, parts[2]):
+            return self.send_error_json(409, f"任务已结束: {job.status}")
+        self.send_json(202, job.describe())
+
+    def do_DELETE(self):
+        parts, _ = self.route()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            return self.send_error_json(404, "未知的地址")
+        job = self.find_job(parts)
+        if not job:
+            return
+        if not self.jobs.control(job, 'cancel'):
+            return self.send_error_json(409, f"任务已结束: {job.status}")
+        self.send_json(202, job.describe())
+
+    def write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def stream(self, job, query):
+        """按分块传输持续输出任务事件，任务结束或客户端断开时返回"""
+        sse = 'text/event-stream' in (self.headers.get('Accept') or '')
+        try:
+            offset = int(query.get('from', [None])[0] or self.headers.get('Last-Event-ID') or 0)
+        except ValueError:
+            return self.send_error_json(400, "from必须是整数")
+        types = set(','.join(query.get('types', [])).split(',')) - {''}
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8' if sse
+                         else 'application/x-ndjson; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            while True:
+                offset, events, finished = job.wait(offset, SERVER_CONFIG['HEARTBEAT'])
+                lines = []
+                for event in events:
+                    offset += 1
+                    if types and event['event'] not in types:
+                        continue
+                    data = json.dumps(event, ensure_ascii=False, default=str)
+                    lines.append(f"id: {offset}\nevent: {event['event']}\ndata: {data}\n\n" if sse else data + '\n')
+                if lines:
+                    self.write_chunk(''.join(lines))
+                elif not finished:
+                    # 保活消息，也用于及时发现已断开的客户端
+                    self.write_chunk(': keepalive\n\n' if sse else '\n')
+                if finished and len(events) == 0:
+                    break
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+def serve(host=None, port=None, engine_count=None, verbose=False, log=print):
+    """启动任务接口，阻塞直到收到KeyboardInterrupt"""
+    jobs = JobServer(engine_count)
+    jobs.start()
+    httpd = ThreadingHTTPServer((host or SERVER_CONFIG['HOST'], port or SERVER_CONFIG['PORT']), JobRequestHandler)
+    httpd.daemon_threads = True
+    httpd.job_server = jobs
+    httpd.verbose = verbose
+    log(f"任务接口已启动: http://{httpd.server_address[0]}:{httpd.server_address[1]}，"
+        f"引擎 {len(jobs.engines)} 个")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        log(f"正在停止引擎（最多等待 {ENGINE_CONFIG['STOP_TIMEOUT']} 秒）...")
+        jobs.shutdown()
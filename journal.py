@@ -0,0 +1,121 @@
+import os
+import re
+import json
+import time
+from datetime import datetime
+from config import JOURNAL_CONFIG, OUTPUT_DIR
+
+
+def journal_path(label):
+    """任务对应的日志文件路径，同一查询始终使用同一个文件以便续爬"""
+    safe_label = re.sub(r'[\\/:*?"<>|]+', '_', label)
+    return os.path.join(JOURNAL_CONFIG['DIR'], f"{safe_label}.jsonl")
+
+
+def read_journal(path):
+    """逐条读取日志中的结果，跳过崩溃时写了一半的行"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class ResultJournal:
+    """结果流式写入磁盘的检查点日志：每条结果立即追加，按批次fsync，支持崩溃后续爬"""
+
+    def __init__(self, label, resume=False):
+        self.label = label
+        self.path = journal_path(label)
+        self.count = 0
+        self.columns = None
+        self.unsynced = 0
+        self.last_sync = time.time()
+        if not os.path.exists(JOURNAL_CONFIG['DIR']):
+            os.makedirs(JOURNAL_CONFIG['DIR'])
+        if os.path.exists(self.path):
+            if resume:
+                self.repair_tail()
+            else:
+                # 新任务不覆盖旧日志，改名归档
+                archived = self.path[:-len('.jsonl')] + f"_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+                os.replace(self.path, archived)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def repair_tail(self):
+        """上次崩溃可能留下不完整的最后一行，补上换行避免与新记录粘连"""
+        with open(self.path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    def load(self):
+        """读取已有结果（续爬时用于重建去重集合）"""
+        for record in read_journal(self.path):
+            self.count += 1
+            yield record
+
+    def append(self, result):
+        self.file.write(json.dumps(result, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.count += 1
+        self.unsynced += 1
+        if (self.unsynced >= JOURNAL_CONFIG['FSYNC_EVERY']
+                or time.time() - self.last_sync >= JOURNAL_CONFIG['FSYNC_INTERVAL']):
+            self.sync()
+
+    def sync(self):
+        if self.unsynced and not self.file.closed:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+        self.last_sync = time.time()
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def write_chunk(self, filename, records, first):
+        # pandas只在导出时需要，延迟导入以加快命令行启动
+        import pandas as pd
+        # 后续分块沿用第一块的列顺序，避免不同来源的记录字段不一致导致错位
+        df = pd.DataFrame(records, columns=None if first else self.columns)
+        if first:
+            self.columns = list(df.columns)
+        df.to_csv(filename, index=False, mode='w' if first else 'a', header=first,
+                  encoding='utf-8-sig' if first else 'utf-8')
+
+    def export_csv(self, log_callback=None):
+        """分块将日志转换为output目录下的CSV文件，内存占用与结果总数无关"""
+        try:
+            if not os.path.exists(OUTPUT_DIR):
+                os.makedirs(OUTPUT_DIR)
+            filename = os.path.join(OUTPUT_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.label}.csv")
+            self.sync()
+            first = True
+            buffer = []
+            for record in read_journal(self.path):
+                buffer.append(record)
+                if len(buffer) >= JOURNAL_CONFIG['EXPORT_CHUNK_SIZE']:
+                    self.write_chunk(filename, buffer, first)
+                    first = False
+                    buffer = []
+            if buffer or first:
+                self.write_chunk(filename, buffer, first)
+            if log_callback:
+                log_callback(f"数据已保存到文件: {filename}")
+            return filename
+        except Exception as e:
+            if log_callback:
+                log_callback(f"保存数据时出错: {str(e)}")
+            return None
@@ -1,56 +1,101 @@
+import os
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QLineEdit, QPushButton, QProgressBar, QTextEdit, QFileDialog,
                             QTabWidget, QGroupBox, QGridLayout,
-                            QStyle, QComboBox, QCheckBox)
+                            QStyle, QComboBox, QCheckBox, QSpinBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from datetime import datetime
-from scraper import GoogleMapsScraper
+from campaign import build_matrix, load_campaign_file
+from tiling import BOUNDS_PATTERN
+from engine import EngineProcess
 from data_manager import DataManager
+from proxy_pool import parse_proxy, load_proxy_file
+from config import WORKER_POOL_CONFIG, PROXY_CONFIG, ENGINE_CONFIG, PLACE_INDEX_CONFIG
 import time
 
 class ScraperThread(QThread):
+    """读取引擎进程回传的事件并转发给界面，爬虫本身在引擎进程中运行
+
+    已到达的事件合并处理，日志按批发送，避免频繁的信号占用界面事件循环
+    """
     progress_updated = pyqtSignal(int)
-    log_updated = pyqtSignal(str)
+    logs_updated = pyqtSignal(list)
     
-    def __init__(self, country, business_type, target_count):
+    def __init__(self, engine, spec):
         super().__init__()
-        self.country = country
-        self.business_type = business_type
-        self.target_count = target_count
-        self.scraper = GoogleMapsScraper()
+        self.engine = engine
+        self.spec = spec
+        self.job_id = None
         self.is_running = False
         self.is_paused = False
+        self.stop_requested = None
 
     def run(self):
         self.is_running = True
         try:
-            self.scraper.scrape(
-                self.business_type,
-                self.country,
-                self.target_count,
-                self.progress_updated.emit,
-                self.log_updated.emit
-            )
+            if not self.engine.alive():
+                self.logs_updated.emit(["引擎进程未运行，正在重新启动"])
+                self.engine.restart()
+            self.job_id = self.engine.submit(self.spec)
+            finished = False
+            while not finished:
+                event = self.engine.get(timeout=1)
+                if event is None:
+                    finished = self.check_engine()
+                    continue
+                logs = []
+                progress = None
+                for kind, job_id, payload in [event] + self.engine.drain(ENGINE_CONFIG['BATCH']):
+                    if job_id != self.job_id:
+                        continue
+                    if kind == 'log':
+                        logs.append(payload)
+                    elif kind == 'progress':
+                        progress = payload
+                    elif kind == 'done':
+                        logs.append(f"任务结束（{payload['status']}），获取商户 {payload['result_count']} 个")
+                        finished = True
+                if logs:
+                    self.logs_updated.emit(logs)
+                if progress is not None:
+                    self.progress_updated.emit(progress)
+                if not finished:
+                    finished = self.check_engine()
         except Exception as e:
-            self.log_updated.emit(f"运行错误: {str(e)}")
+            self.logs_updated.emit([f"运行错误: {str(e)}"])
         finally:
             self.is_running = False
 
+    def check_engine(self):
+        """引擎崩溃或停止后长时间无响应时重启引擎，返回True表示任务已结束"""
+        if not self.engine.alive():
+            self.logs_updated.emit(["引擎进程异常退出，正在重新启动"])
+            self.engine.restart()
+            return True
+        if self.stop_requested and time.time() - self.stop_requested > ENGINE_CONFIG['STOP_TIMEOUT']:
+            self.logs_updated.emit(["引擎未响应停止请求，正在重新启动"])
+            self.engine.restart()
+            return True
+        return False
+
     def pause(self):
-        self.scraper.is_paused = True
+        if self.job_id is None:
+            return
+        self.engine.pause_job(self.job_id)
         self.is_paused = True
-        self.log_updated.emit("爬虫已暂停")
 
     def resume(self):
-        self.scraper.is_paused = False
+        if self.job_id is None:
+            return
+        self.engine.resume_job(self.job_id)
         self.is_paused = False
-        self.log_updated.emit("爬虫继续运行")
 
     def stop(self):
-        self.scraper.is_running = False
-        self.is_running = False
-        self.log_updated.emit("爬虫已停止")
+        if self.job_id is not None:
+            self.engine.stop_job(self.job_id)
+            self.stop_requested = time.time()
+        self.logs_updated.emit(["爬虫已停止"])
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -58,6 +103,9 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("外贸获客助手")
         self.setMinimumSize(1000, 800)
         self.scraper_thread = None
+        # 爬虫引擎在独立进程中运行并持有预热浏览器池，多次任务复用已启动的浏览器
+        self.engine = EngineProcess()
+        self.engine.start()
         self.setup_ui()
 
     def setup_ui(self):
@@ -99,6 +147,25 @@ class MainWindow(QMainWindow):
         self.count_input.setPlaceholderText("请输入数字")
         search_group_layout.addWidget(self.count_input, 1, 1)
         
+        self.resume_checkbox = QCheckBox("断点续爬")
+        self.resume_checkbox.setToolTip("从上次中断的检查点日志继续，跳过已获取的商户")
+        search_group_layout.addWidget(self.resume_checkbox, 1, 2)
+        
+        self.campaign_checkbox = QCheckBox("按查询分别保存")
+        self.campaign_checkbox.setToolTip("国家和行业组合成批量任务，每个查询单独达到目标数量并单独保存结果")
+        search_group_layout.addWidget(self.campaign_checkbox, 1, 3)
+        
+        self.tiling_checkbox = QCheckBox("地理分块")
+        self.tiling_checkbox.setToolTip("将国家/地区划分为多个地图分块分别搜索，突破单次搜索的结果上限；"
+                                        "国家一栏也可填写经纬度范围 south,west,north,east")
+        search_group_layout.addWidget(self.tiling_checkbox, 2, 2)
+        
+        self.skip_known_checkbox = QCheckBox("跳过已获取的商户")
+        self.skip_known_checkbox.setToolTip("之前由其他查询获取过的商户不再提取详情，也不计入目标数量；"
+                                            "重复同一查询时仍返回上次的结果")
+        self.skip_known_checkbox.setChecked(PLACE_INDEX_CONFIG['ENABLED'])
+        search_group_layout.addWidget(self.skip_known_checkbox, 2, 3)
+        
         search_group.setLayout(search_group_layout)
         search_layout.addWidget(search_group)
         
@@ -112,6 +179,8 @@ class MainWindow(QMainWindow):
         self.pause_button.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPause))
         self.stop_button = QPushButton("停止")
         self.stop_button.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaStop))
+        self.campaign_button = QPushButton("导入批量任务")
+        self.campaign_button.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_DialogOpenButton))
         
         self.pause_button.setEnabled(False)
         self.stop_button.setEnabled(False)
@@ -119,6 +188,7 @@ class MainWindow(QMainWindow):
         button_layout.addWidget(self.start_button)
         button_layout.addWidget(self.pause_button)
         button_layout.addWidget(self.stop_button)
+        button_layout.addWidget(self.campaign_button)
         button_group.setLayout(button_layout)
         search_layout.addWidget(button_group)
         
@@ -185,9 +255,39 @@ class MainWindow(QMainWindow):
         self.proxy_port.setEnabled(False)
         proxy_layout.addWidget(self.proxy_port, 2, 1)
         
+        # 代理池：地址栏可填写多个逗号分隔的 host:port，也可从文件加载
+        proxy_layout.addWidget(QLabel("代理列表文件:"), 3, 0)
+        self.proxy_file = QLineEdit()
+        self.proxy_file.setEnabled(False)
+        self.proxy_file.setToolTip("每行一个代理（host:port 或 scheme://host:port），按代理分别限速并根据超时自动停用")
+        proxy_layout.addWidget(self.proxy_file, 3, 1)
+        
+        self.proxy_file_button = QPushButton("浏览...")
+        self.proxy_file_button.setEnabled(False)
+        proxy_layout.addWidget(self.proxy_file_button, 3, 2)
+        
+        if PROXY_CONFIG['PROXIES'] or PROXY_CONFIG['FILE']:
+            self.use_proxy.setChecked(True)
+            self.proxy_host.setText(', '.join(PROXY_CONFIG['PROXIES']))
+            self.proxy_file.setText(PROXY_CONFIG['FILE'] or '')
+        
         proxy_group.setLayout(proxy_layout)
         settings_layout.addWidget(proxy_group)
         
+        # 并行设置组
+        parallel_group = QGroupBox("并行设置")
+        parallel_layout = QGridLayout()
+        
+        parallel_layout.addWidget(QLabel("浏览器数量:"), 0, 0)
+        self.worker_count_input = QSpinBox()
+        self.worker_count_input.setRange(1, 32)
+        self.worker_count_input.setValue(1)
+        self.worker_count_input.setToolTip(f"多个国家/行业（逗号分隔）时并行运行，建议不超过 {WORKER_POOL_CONFIG['WORKER_COUNT']}")
+        parallel_layout.addWidget(self.worker_count_input, 0, 1)
+        
+        parallel_group.setLayout(parallel_layout)
+        settings_layout.addWidget(parallel_group)
+        
         # 添加选项卡到主布局
         layout.addWidget(tabs)
         
@@ -195,8 +295,11 @@ class MainWindow(QMainWindow):
         self.start_button.clicked.connect(self.start_scraping)
         self.pause_button.clicked.connect(self.pause_resume_scraping)
         self.stop_button.clicked.connect(self.stop_scraping)
+        self.campaign_button.clicked.connect(self.import_campaign)
         self.browse_button.clicked.connect(self.browse_save_path)
         self.use_proxy.toggled.connect(self.toggle_proxy_inputs)
+        self.proxy_file_button.clicked.connect(self.browse_proxy_file)
+        self.toggle_proxy_inputs(self.use_proxy.isChecked())
 
     def browse_save_path(self):
         path = QFileDialog.getExistingDirectory(self, "选择保存路径")
@@ -206,6 +309,37 @@ class MainWindow(QMainWindow):
     def toggle_proxy_inputs(self, checked):
         self.proxy_host.setEnabled(checked)
         self.proxy_port.setEnabled(checked)
+        self.proxy_file.setEnabled(checked)
+        self.proxy_file_button.setEnabled(checked)
+
+    def browse_proxy_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择代理列表文件", "", "文本文件 (*.txt);;所有文件 (*)")
+        if path:
+            self.proxy_file.setText(path)
+
+    def proxy_settings(self):
+        """设置页的代理列表，交给引擎进程使用；未启用代理时返回空列表，设置有误时返回None"""
+        if not self.use_proxy.isChecked():
+            return []
+        port = self.proxy_port.text().strip()
+        servers = []
+        for host in self.proxy_host.text().split(','):
+            host = host.strip()
+            if host:
+                # 未在地址中写明端口时使用端口栏的值
+                servers.append(f"{host}:{port}" if port and ':' not in host.split('://')[-1] else host)
+        if self.proxy_file.text().strip():
+            try:
+                servers += load_proxy_file(self.proxy_file.text().strip())
+            except OSError as e:
+                self.log_text.append(f"错误：读取代理列表文件失败 {str(e)}")
+                return None
+        servers = list(dict.fromkeys(proxy for proxy in (parse_proxy(s) for s in servers) if proxy))
+        if not servers:
+            self.log_text.append("错误：已启用代理但未填写代理地址")
+            return None
+        self.log_text.append(f"使用代理池，共 {len(servers)} 个代理")
+        return servers
 
     def start_scraping(self):
         try:
@@ -229,24 +363,85 @@ class MainWindow(QMainWindow):
                 self.log_text.append("错误：爬虫正在运行中")
                 return
 
+            proxies = self.proxy_settings()
+            if proxies is None:
+                return
+
             # 创建输出目录
             output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir)
 
-            self.scraper_thread = ScraperThread(country, business_type, target_count)
-            self.scraper_thread.progress_updated.connect(self.update_progress)
-            self.scraper_thread.log_updated.connect(self.update_log)
-            self.scraper_thread.finished.connect(self.on_scraping_finished)
-            self.scraper_thread.start()
+            spec = {
+                'type': 'search',
+                'country': country,
+                'business_type': business_type,
+                'target_count': target_count,
+                'resume': self.resume_checkbox.isChecked()
+            }
+            if self.tiling_checkbox.isChecked():
+                if ',' in business_type or (',' in country and not BOUNDS_PATTERN.match(country)):
+                    self.log_text.append("错误：地理分块模式仅支持单个地区和行业")
+                    return
+                spec['type'] = 'tiling'
+            elif self.campaign_checkbox.isChecked():
+                countries = [c.strip() for c in country.split(',') if c.strip()]
+                business_types = [b.strip() for b in business_type.split(',') if b.strip()]
+                spec = {
+                    'type': 'campaign',
+                    'name': f"{country}_{business_type}".replace(',', '-'),
+                    'items': build_matrix(countries, business_types, target_count),
+                    'resume': self.resume_checkbox.isChecked()
+                }
 
-            self.start_button.setEnabled(False)
-            self.pause_button.setEnabled(True)
-            self.stop_button.setEnabled(True)
+            spec.update({'worker_count': self.worker_count_input.value(), 'proxies': proxies,
+                         'skip_known': self.skip_known_checkbox.isChecked()})
+            self.start_thread(ScraperThread(self.engine, spec))
             
         except Exception as e:
             self.log_text.append(f"启动错误：{str(e)}")
 
+    def import_campaign(self):
+        """从CSV或JSON文件导入批量任务，勾选断点续爬时跳过已完成的查询"""
+        if self.scraper_thread and self.scraper_thread.isRunning():
+            self.log_text.append("错误：爬虫正在运行中")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "选择批量任务文件", "", "任务文件 (*.csv *.json)")
+        if not path:
+            return
+        proxies = self.proxy_settings()
+        if proxies is None:
+            return
+        try:
+            items = load_campaign_file(path)
+            if not items:
+                self.log_text.append("错误：任务文件中没有有效的查询")
+                return
+            name = os.path.splitext(os.path.basename(path))[0]
+            self.start_thread(ScraperThread(self.engine, {
+                'type': 'campaign',
+                'name': name,
+                'items': items,
+                'resume': self.resume_checkbox.isChecked(),
+                'worker_count': self.worker_count_input.value(),
+                'proxies': proxies,
+                'skip_known': self.skip_known_checkbox.isChecked()
+            }))
+        except Exception as e:
+            self.log_text.append(f"导入批量任务错误：{str(e)}")
+
+    def start_thread(self, thread):
+        self.scraper_thread = thread
+        self.scraper_thread.progress_updated.connect(self.update_progress)
+        self.scraper_thread.logs_updated.connect(self.update_logs)
+        self.scraper_thread.finished.connect(self.on_scraping_finished)
+        self.scraper_thread.start()
+
+        self.start_button.setEnabled(False)
+        self.campaign_button.setEnabled(False)
+        self.pause_button.setEnabled(True)
+        self.stop_button.setEnabled(True)
+
     def pause_resume_scraping(self):
         if not self.scraper_thread:
             return
@@ -264,6 +459,7 @@ class MainWindow(QMainWindow):
 
     def on_scraping_finished(self):
         self.start_button.setEnabled(True)
+        self.campaign_button.setEnabled(True)
         self.pause_button.setEnabled(False)
         self.stop_button.setEnabled(False)
         self.pause_button.setText("暂停")
@@ -272,11 +468,19 @@ class MainWindow(QMainWindow):
         if data_tab:
             data_tab.refresh_data_view()
 
+    def closeEvent(self, event):
+        if self.scraper_thread and self.scraper_thread.isRunning():
+            self.scraper_thread.stop()
+            self.scraper_thread.wait(10000)
+        self.engine.shutdown()
+        super().closeEvent(event)
+
     def update_progress(self, value):
         self.progress_bar.setValue(value)
 
-    def update_log(self, message):
-        self.log_text.append(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}")
+    def update_logs(self, messages):
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.log_text.append('\n'.join(f"{timestamp} - {message}" for message in messages))
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,83 @@
+import time
+from config import MEMORY_CONFIG
+
+MB = 1024 * 1024
+
+
+def parse_metrics(response):
+    """Performance.getMetrics的返回值转换为 {指标名: 数值}"""
+    return {metric['name']: metric['value'] for metric in (response or {}).get('metrics', [])}
+
+
+class MemoryMonitor:
+    """按间隔采样标签页的JS堆和DOM节点数，超过阈值时决定回收标签页还是重启浏览器
+
+    长时间运行的查询中结果列表和详情面板不断累积DOM，回收标签页后从当前查询继续；
+    同一浏览器回收标签页次数过多说明浏览器进程本身已膨胀，改为重启浏览器
+    """
+
+    def __init__(self):
+        self.last = {}
+        self.peak = {}
+        self.samples = 0
+        self.last_sample = 0.0
+        self.tab_recycles = 0
+        self.browser_restarts = 0
+        self.recycles_since_restart = 0
+        # 无法在任务中途重启浏览器时（CDP后端），标记为在下一个查询前重启
+        self.restart_pending = False
+
+    def due(self):
+        return MEMORY_CONFIG['ENABLED'] and time.time() - self.last_sample >= MEMORY_CONFIG['INTERVAL']
+
+    def check(self, response):
+        """记录一次采样，超过阈值时返回 (回收范围 tab/browser, 原因)，否则返回 (None, None)"""
+        self.last_sample = time.time()
+        metrics = parse_metrics(response)
+        if not metrics:
+            return None, None
+        self.samples += 1
+        sample = {'js_heap_mb': metrics.get('JSHeapUsedSize', 0) / MB, 'dom_nodes': int(metrics.get('Nodes', 0)),
+                  'documents': int(metrics.get('Documents', 0))}
+        self.last = sample
+        for name, value in sample.items():
+            self.peak[name] = max(self.peak.get(name, 0), value)
+
+        reasons = []
+        if sample['js_heap_mb'] > MEMORY_CONFIG['MAX_JS_HEAP_MB']:
+            reasons.append(f"JS堆 {sample['js_heap_mb']:.0f}MB 超过 {MEMORY_CONFIG['MAX_JS_HEAP_MB']}MB")
+        if sample['dom_nodes'] > MEMORY_CONFIG['MAX_DOM_NODES']:
+            reasons.append(f"DOM节点 {sample['dom_nodes']} 超过 {MEMORY_CONFIG['MAX_DOM_NODES']}")
+        if not reasons:
+            return None, None
+        action = 'browser' if self.recycles_since_restart >= MEMORY_CONFIG['TAB_RECYCLES_PER_BROWSER'] else 'tab'
+        return action, '，'.join(reasons)
+
+    def recycled(self, action):
+        if action == 'browser':
+            self.browser_restarts += 1
+            self.recycles_since_restart = 0
+            self.restart_pending = False
+        else:
+            self.tab_recycles += 1
+            self.recycles_since_restart += 1
+        # 回收后的新页面重新开始计时
+        self.last_sample = time.time()
+
+    def snapshot(self):
+        """当前指标，供工作进程回传主进程汇总"""
+        return {
+            'samples': self.samples,
+            'js_heap_mb': round(self.last.get('js_heap_mb', 0), 1),
+            'peak_js_heap_mb': round(self.peak.get('js_heap_mb', 0), 1),
+            'dom_nodes': self.last.get('dom_nodes', 0),
+            'peak_dom_nodes': self.peak.get('dom_nodes', 0),
+            'tab_recycles': self.tab_recycles,
+            'browser_restarts': self.browser_restarts
+        }
+
+
+def format_snapshot(snapshot):
+    return (f"采样 {snapshot['samples']} 次, JS堆 {snapshot['js_heap_mb']}MB（峰值 {snapshot['peak_js_heap_mb']}MB）, "
+            f"DOM节点 {snapshot['dom_nodes']}（峰值 {snapshot['peak_dom_nodes']}）, "
+            f"回收标签页 {snapshot['tab_recycles']} 次, 重启浏览器 {snapshot['browser_restarts']} 次")
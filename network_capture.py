@@ -0,0 +1,190 @@
+import os
+import re
+import json
+from datetime import datetime
+from urllib.parse import quote_plus
+
+# 包含商户数据的响应：搜索结果翻页、商户预览，以及首屏HTML中内嵌的初始化数据
+RESPONSE_URL_PATTERN = re.compile(r'/search\?tbm=map|/maps/preview/place|/maps/search/')
+XSSI_PREFIX = ")]}'"
+# 搜索翻页响应在JSON之后附带的注释尾
+JSON_TRAILER = '/*""*/'
+FEATURE_ID_PATTERN = re.compile(r'^0x[0-9a-fA-F]+:0x[0-9a-fA-F]+$')
+INIT_STATE_PATTERN = re.compile(r'window\.APP_INITIALIZATION_STATE=(.*?);window\.APP_', re.S)
+
+
+def read_performance_events(driver):
+    """读取并清空浏览器性能日志，逐条返回DevTools事件的(方法, 参数)"""
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        yield message.get('method'), message.get('params', {})
+
+
+def read_saved_response(path):
+    """读取save()保存的响应，返回(链接, 正文)，用于离线回放"""
+    with open(path, 'r', encoding='utf-8') as f:
+        url, _, body = f.read().partition('\n')
+    return url, body
+
+
+def safe_get(data, *path):
+    """按索引路径读取嵌套列表，任何一级缺失都返回None"""
+    for index in path:
+        try:
+            data = data[index]
+        except (IndexError, KeyError, TypeError):
+            return None
+    return data
+
+
+def load_payload(body):
+    """将响应正文解析为JSON，兼容XSSI前缀、{"d": ...}包装和HTML内嵌的初始化数据"""
+    if not body:
+        return None
+    text = body.strip()
+    if text.startswith('<'):
+        match = INIT_STATE_PATTERN.search(text)
+        if not match:
+            return None
+        text = match.group(1)
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):]
+    if text.endswith(JSON_TRAILER):
+        text = text[:-len(JSON_TRAILER)]
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if isinstance(data, dict) and isinstance(data.get('d'), str):
+        return load_payload(data['d'])
+    return data
+
+
+def is_place_entry(entry):
+    """商户记录数组：第10项为要素标识，第11项为名称"""
+    return (isinstance(entry, list) and len(entry) > 11
+            and isinstance(entry[10], str) and FEATURE_ID_PATTERN.match(entry[10])
+            and isinstance(entry[11], str))
+
+
+def iter_place_entries(data, depth=0):
+    """递归查找响应中的商户记录，内嵌的JSON字符串会继续展开"""
+    if depth > 12:
+        return
+    if isinstance(data, str):
+        if data.startswith(XSSI_PREFIX):
+            nested = load_payload(data)
+            if nested is not None:
+                yield from iter_place_entries(nested, depth + 1)
+        return
+    if not isinstance(data, list):
+        return
+    if is_place_entry(data):
+        yield data
+        return
+    for item in data:
+        yield from iter_place_entries(item, depth + 1)
+
+
+def parse_place_entry(entry):
+    """将商户记录数组转换为与详情提取一致的结果字典"""
+    name = entry[11]
+    address = safe_get(entry, 39)
+    if not isinstance(address, str):
+        parts = safe_get(entry, 2)
+        address = ', '.join(p for p in parts if isinstance(p, str)) if isinstance(parts, list) else ''
+    phone = safe_get(entry, 178, 0, 0) or safe_get(entry, 178, 0, 3) or ''
+    rating = safe_get(entry, 4, 7)
+    reviews = safe_get(entry, 4, 8)
+    latitude = safe_get(entry, 9, 2)
+    longitude = safe_get(entry, 9, 3)
+    google_place_id = safe_get(entry, 78)
+    url = ''
+    if isinstance(google_place_id, str):
+        url = (f"https://www.google.com/maps/search/?api=1&query={quote_plus(name)}"
+               f"&query_place_id={google_place_id}")
+    return {
+        "name": name,
+        "address": address or '',
+        "phone": phone if isinstance(phone, str) else '',
+        "rating": str(rating) if rating is not None else "N/A",
+        "reviews": str(reviews) if reviews is not None else '',
+        "place_id": entry[10],
+        "latitude": str(latitude) if latitude is not None else '',
+        "longitude": str(longitude) if longitude is not None else '',
+        "url": url,
+        # 结构化数据中的字段无需推断
+        "phone_confidence": 1.0 if phone else 0.0,
+        "address_confidence": 1.0 if address else 0.0
+    }
+
+
+def parse_places(body):
+    """从一个响应正文中解析出全部商户"""
+    data = load_payload(body)
+    if data is None:
+        return []
+    places = []
+    seen = set()
+    for entry in iter_place_entries(data):
+        if entry[10] in seen:
+            continue
+        seen.add(entry[10])
+        places.append(parse_place_entry(entry))
+    return places
+
+
+class NetworkCapture:
+    """通过DevTools Network域记录Maps的数据响应，直接解析商户记录而无需点击卡片"""
+
+    def __init__(self, driver, save_dir=None):
+        self.driver = driver
+        # 保存原始响应，便于离线回放和调试解析规则
+        self.save_dir = save_dir
+        self.pending = {}
+        self.stats = {'responses': 0, 'bytes': 0, 'places': 0, 'errors': 0}
+
+    def enable(self):
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        # 丢弃启用前积累的日志
+        self.driver.get_log('performance')
+
+    def handle_event(self, method, params):
+        """处理一条网络事件，响应完成时返回其中解析出的商户"""
+        if method == 'Network.responseReceived':
+            url = params.get('response', {}).get('url', '')
+            if RESPONSE_URL_PATTERN.search(url):
+                self.pending[params['requestId']] = url
+        elif method == 'Network.loadingFinished' and params.get('requestId') in self.pending:
+            url = self.pending.pop(params['requestId'])
+            return self.fetch(params['requestId'], url)
+        return []
+
+    def fetch(self, request_id, url):
+        try:
+            response = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            self.stats['errors'] += 1
+            return []
+        body = response.get('body', '')
+        self.stats['responses'] += 1
+        self.stats['bytes'] += len(body)
+        if self.save_dir:
+            self.save(body, url)
+        places = parse_places(body)
+        self.stats['places'] += len(places)
+        return places
+
+    def save(self, body, url):
+        if not os.path.exists(self.save_dir):
+            os.makedirs(self.save_dir)
+        filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{self.stats['responses']}.txt"
+        with open(os.path.join(self.save_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(f"{url}\n{body}")
+
+    def report(self):
+        return (f"捕获响应 {self.stats['responses']} 个, {self.stats['bytes'] / 1024:.0f} KB, "
+                f"解析商户 {self.stats['places']} 个, 读取失败 {self.stats['errors']} 次")
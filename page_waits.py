@@ -0,0 +1,113 @@
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from config import SCRAPER_CONFIG
+
+# DOM在quiet毫秒内无变化即视为就绪，超过timeout毫秒返回false
+DOM_STABLE_SCRIPT = """
+    var root = arguments[0] || document.body;
+    var quiet = arguments[1];
+    var timeout = arguments[2];
+    var done = arguments[arguments.length - 1];
+    var timer = null;
+    var limit = null;
+    var observer = null;
+    var finish = function (ok) {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(limit);
+        done(ok);
+    };
+    observer = new MutationObserver(function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () { finish(true); }, quiet);
+    });
+    observer.observe(root, {childList: true, subtree: true, attributes: true, characterData: true});
+    timer = setTimeout(function () { finish(true); }, quiet);
+    limit = setTimeout(function () { finish(false); }, timeout);
+"""
+
+class PageWaiter:
+    """事件驱动的页面就绪等待，并记录每个步骤的实际等待时间"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.timeouts = SCRAPER_CONFIG['STEP_TIMEOUTS']
+        self.quiet_ms = SCRAPER_CONFIG['DOM_QUIET_MS']
+        self.stats = {}
+        # 异步脚本的超时需大于所有步骤超时
+        self.driver.set_script_timeout(max(self.timeouts.values()) + 5)
+
+    def timeout(self, step):
+        return self.timeouts.get(step, SCRAPER_CONFIG['WAIT_TIMEOUT'])
+
+    def record(self, step, elapsed, baseline, ok=True):
+        """记录步骤耗时，baseline为改造前该步骤的等待秒数，None表示与改造前相同"""
+        if baseline is None:
+            baseline = elapsed
+        stat = self.stats.setdefault(step, {'count': 0, 'waited': 0.0, 'baseline': 0.0, 'timeouts': 0})
+        stat['count'] += 1
+        stat['waited'] += elapsed
+        stat['baseline'] += baseline
+        if not ok:
+            stat['timeouts'] += 1
+
+    def element(self, step, selector, baseline=None, condition=EC.presence_of_element_located, required=True):
+        """等待指定元素满足条件，required为False时超时返回None"""
+        start = time.time()
+        try:
+            element = WebDriverWait(self.driver, self.timeout(step)).until(
+                condition((By.CSS_SELECTOR, selector))
+            )
+            self.record(step, time.time() - start, baseline)
+            return element
+        except TimeoutException:
+            self.record(step, time.time() - start, baseline, ok=False)
+            if required:
+                raise
+            return None
+
+    def until(self, step, predicate, baseline=None, poll=0.1):
+        """轮询自定义条件直至为真，超时返回False"""
+        start = time.time()
+        deadline = start + self.timeout(step)
+        ok = False
+        while time.time() < deadline:
+            try:
+                if predicate():
+                    ok = True
+                    break
+            except Exception:
+                pass
+            time.sleep(poll)
+        self.record(step, time.time() - start, baseline, ok)
+        return ok
+
+    def dom_stable(self, step, root=None, baseline=None):
+        """等待DOM（或指定子树）停止变化"""
+        start = time.time()
+        try:
+            ok = bool(self.driver.execute_async_script(
+                DOM_STABLE_SCRIPT, root, self.quiet_ms, int(self.timeout(step) * 1000)
+            ))
+        except Exception:
+            ok = False
+        self.record(step, time.time() - start, baseline, ok)
+        return ok
+
+    def report(self):
+        """生成各步骤的等待耗时报告，对比改造前固定等待的时间"""
+        lines = []
+        total_waited = 0.0
+        total_baseline = 0.0
+        for step, stat in sorted(self.stats.items(), key=lambda x: -x[1]['waited']):
+            total_waited += stat['waited']
+            total_baseline += stat['baseline']
+            lines.append(
+                f"{step}: {stat['count']} 次, 实际等待 {stat['waited']:.1f}s, "
+                f"改造前 {stat['baseline']:.1f}s, 超时 {stat['timeouts']} 次"
+            )
+        lines.append(f"合计: 实际等待 {total_waited:.1f}s, 节省 {total_baseline - total_waited:.1f}s")
+        return lines
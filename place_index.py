@@ -0,0 +1,122 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import unicodedata
+from config import PLACE_INDEX_CONFIG
+
+PUNCTUATION_PATTERN = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize(text):
+    """统一全半角、大小写，去掉空白和标点"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return PUNCTUATION_PATTERN.sub('', text)
+
+
+def fingerprint(name, address):
+    """没有商户标识时，用规范化后的名称和地址生成指纹，同名连锁店地址不同不会被合并"""
+    digest = hashlib.sha1(f"{normalize(name)}|{normalize(address)}".encode('utf-8')).hexdigest()
+    return f"fp:{digest}"
+
+
+def place_key(result):
+    """商户去重键，优先使用稳定的商户标识"""
+    if result.get('place_id'):
+        return f"id:{result['place_id']}"
+    return fingerprint(result.get('name', ''), result.get('address', ''))
+
+
+def query_key(query, viewport=None):
+    """查询的标识：查询文本，指定视野时附带视野，索引和查询缓存共用"""
+    return f"{query}|{','.join(str(v) for v in viewport)}" if viewport else query
+
+
+def task_query_key(business_type, country, viewport=None):
+    """搜索任务的查询标识，与Scraper.query_key()一致：指定视野时查询只含行业，供汇总结果的调用方登记索引"""
+    query = business_type if viewport else f"{business_type} in {country}"
+    return query_key(query, viewport)
+
+
+_enabled = None
+
+
+def set_index_enabled(enabled):
+    """设置当前进程是否跳过之前任务已获取的商户，None表示按PLACE_INDEX_CONFIG['ENABLED']"""
+    global _enabled
+    _enabled = enabled
+
+
+def index_enabled():
+    return PLACE_INDEX_CONFIG['ENABLED'] if _enabled is None else bool(_enabled)
+
+
+def open_index():
+    """启用商户索引时打开索引，否则返回None"""
+    return PlaceIndex() if index_enabled() else None
+
+
+class PlaceIndex:
+    """跨任务持久化的商户索引：所有任务在提取详情前查询，由其他查询获取过的商户直接跳过
+
+    同一查询（含视野）获取过的商户不跳过：重复同一查询时由缓存或重新提取返回上次的结果，与缓存是否过期无关；
+    重叠的查询（如相邻的地理分块）按索引去重。商户在结果被保存后才登记，调用方丢弃的结果不会被后续任务跳过
+    使用SQLite主键索引，查询耗时不随索引规模明显增长；多进程可同时读写同一个索引文件
+    """
+
+    def __init__(self, path=None):
+        self.path = path or PLACE_INDEX_CONFIG['PATH']
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS places ("
+            "key TEXT PRIMARY KEY, name TEXT, address TEXT, query TEXT, first_seen REAL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+        self.uncommitted = 0
+        self.stats = {'lookups': 0, 'hits': 0, 'added': 0}
+
+    def contains(self, key, query=None):
+        """索引中是否有该商户；传入query时只计入由其他查询获取的商户"""
+        self.stats['lookups'] += 1
+        row = self.conn.execute("SELECT query FROM places WHERE key = ?", (key,)).fetchone()
+        found = row is not None and (query is None or row[0] != query)
+        if found:
+            self.stats['hits'] += 1
+        return found
+
+    def known(self, result, query=None):
+        """商户是否已在之前的任务中获取过，query含义同contains"""
+        return self.contains(place_key(result), query)
+
+    def add(self, result, query=''):
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO places (key, name, address, query, first_seen) VALUES (?, ?, ?, ?, ?)",
+            (place_key(result), result.get('name', ''), result.get('address', ''), query, time.time())
+        )
+        self.stats['added'] += cursor.rowcount
+        self.uncommitted += 1
+        if self.uncommitted >= PLACE_INDEX_CONFIG['COMMIT_EVERY']:
+            self.commit()
+
+    def commit(self):
+        if self.uncommitted:
+            self.conn.commit()
+            self.uncommitted = 0
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def report(self):
+        return (f"商户索引: 查询 {self.stats['lookups']} 次, 跳过已知商户 {self.stats['hits']} 个, "
+                f"新增 {self.stats['added']} 个")
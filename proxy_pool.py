@@ -0,0 +1,218 @@
+import time
+import threading
+from config import PROXY_CONFIG
+
+
+def parse_proxy(text):
+    """规范化代理地址，未指定协议时按http处理，空行和#开头的注释返回None
+
+    Chrome的--proxy-server不支持账号密码，需要认证的代理应在本地转发后使用
+    """
+    text = (text or '').strip()
+    if not text or text.startswith('#'):
+        return None
+    if '://' not in text:
+        text = f"http://{text}"
+    return text
+
+
+def load_proxy_file(path):
+    """读取代理列表文件，每行一个代理"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [proxy for proxy in (parse_proxy(line) for line in f) if proxy]
+
+
+# 每个代理的状态字段，按代理序号依次存放在一个数组中，多进程时使用共享内存数组
+SLOTS = ('score', 'cooldown_until', 'tokens', 'updated', 'successes', 'failures', 'in_use')
+
+
+def _slot(name):
+    offset = SLOTS.index(name)
+    return property(lambda self: self.values[self.base + offset],
+                    lambda self, value: self.values.__setitem__(self.base + offset, value))
+
+
+class TokenBucket:
+    """令牌桶：按固定速率补充令牌，允许短时突发
+
+    state: 存放tokens和updated的对象，默认为自身；代理池中为共享的代理状态，各进程的请求共用同一个桶
+    """
+
+    def __init__(self, rate, burst, state=None):
+        self.rate = rate
+        self.burst = burst
+        self.state = state or self
+        if state is None:
+            self.reset()
+
+    def reset(self):
+        self.state.tokens = self.burst
+        self.state.updated = time.time()
+
+    def reserve(self):
+        """预订一个令牌，返回需要等待的秒数；令牌不足时预支，后续请求依次顺延"""
+        state = self.state
+        now = time.time()
+        state.tokens = min(self.burst, state.tokens + max(now - state.updated, 0) * self.rate)
+        state.updated = now
+        state.tokens -= 1
+        return 0.0 if state.tokens >= 0 else -state.tokens / self.rate
+
+
+class ProxyState:
+    """一个代理的状态视图，字段存放在代理池的状态数组中"""
+
+    score = _slot('score')
+    cooldown_until = _slot('cooldown_until')
+    tokens = _slot('tokens')
+    updated = _slot('updated')
+    successes = _slot('successes')
+    failures = _slot('failures')
+    in_use = _slot('in_use')
+
+    def __init__(self, server, values, index, rate, burst):
+        self.server = server
+        self.values = values
+        self.base = index * len(SLOTS)
+        self.bucket = TokenBucket(rate, burst, self)
+
+    def reset(self):
+        for name in SLOTS:
+            setattr(self, name, 0.0)
+        self.score = 1.0
+        self.bucket.reset()
+
+
+def shared_state(ctx, count):
+    """在共享内存中为count个代理分配状态数组和锁，主进程创建后传给各工作进程"""
+    return ctx.Array('d', count * len(SLOTS), lock=False), ctx.Lock()
+
+
+class ProxyPool:
+    """代理池：按令牌桶限制每个代理的请求速率，根据超时和空结果更新健康评分，为浏览器分配代理
+
+    shared: 可选的shared_state()，各工作进程的代理池共用同一份评分、冷却和令牌桶，
+            一个进程的失败使代理对所有进程暂停，经同一代理的请求合计限速；由首先创建的进程（主进程）初始化
+    """
+
+    def __init__(self, servers, shared=None, initialize=True):
+        servers = list(dict.fromkeys(servers))
+        self.shared = shared
+        if shared:
+            values, self.lock = shared
+        else:
+            values, self.lock = [0.0] * (len(servers) * len(SLOTS)), threading.Lock()
+        self.proxies = [ProxyState(server, values, index, PROXY_CONFIG['RATE'], PROXY_CONFIG['BURST'])
+                        for index, server in enumerate(servers)]
+        if initialize:
+            for proxy in self.proxies:
+                proxy.reset()
+
+    def share(self, ctx):
+        """创建状态位于共享内存的同一组代理，保留当前的评分和冷却"""
+        pool = ProxyPool(self.servers(), shared_state(ctx, len(self.proxies)))
+        with self.lock:
+            for source, target in zip(self.proxies, pool.proxies):
+                for name in ('score', 'cooldown_until', 'successes', 'failures'):
+                    setattr(target, name, getattr(source, name))
+        return pool
+
+    def servers(self):
+        return [proxy.server for proxy in self.proxies]
+
+    def usable(self, proxy):
+        return time.time() >= proxy.cooldown_until
+
+    def assign(self, worker_id=None):
+        """分配一个健康的代理：优先使用中浏览器最少的，其次评分最高的
+
+        各工作进程的代理池互相独立，按工作进程编号错开起始位置，使各进程分散到不同代理
+        """
+        with self.lock:
+            candidates = [proxy for proxy in self.proxies if self.usable(proxy)]
+            if not candidates:
+                # 全部在冷却中时使用最早恢复的代理
+                candidates = [min(self.proxies, key=lambda p: p.cooldown_until)]
+            if worker_id is not None:
+                start = worker_id % len(candidates)
+                candidates = candidates[start:] + candidates[:start]
+            proxy = min(candidates, key=lambda p: (p.in_use, -p.score))
+            if proxy.cooldown_until:
+                # 冷却结束的代理以阈值评分重新试用，再次失败即重新冷却
+                proxy.cooldown_until = 0.0
+                proxy.score = max(proxy.score, PROXY_CONFIG['MIN_SCORE'])
+            proxy.in_use += 1
+            return proxy
+
+    def release(self, proxy):
+        with self.lock:
+            proxy.in_use = max(proxy.in_use - 1, 0)
+
+    def reserve(self, proxy):
+        """预订一次请求，返回需要等待的秒数"""
+        with self.lock:
+            return proxy.bucket.reserve()
+
+    def acquire(self, proxy):
+        """等待代理的令牌，控制经该代理发出的请求速率"""
+        delay = self.reserve(proxy)
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, proxy, ok):
+        """记录一次请求结果，返回False表示代理评分过低已暂停使用"""
+        alpha = PROXY_CONFIG['SCORE_ALPHA']
+        with self.lock:
+            proxy.score = (1 - alpha) * proxy.score + alpha * (1.0 if ok else 0.0)
+            if ok:
+                proxy.successes += 1
+                return True
+            proxy.failures += 1
+            if proxy.score < PROXY_CONFIG['MIN_SCORE'] and self.usable(proxy):
+                proxy.cooldown_until = time.time() + PROXY_CONFIG['COOLDOWN']
+                return False
+            return self.usable(proxy)
+
+    def healthy_count(self):
+        return sum(1 for proxy in self.proxies if self.usable(proxy))
+
+    def report(self):
+        lines = [f"代理池: 可用 {self.healthy_count()}/{len(self.proxies)} 个"]
+        for proxy in self.proxies:
+            state = '' if self.usable(proxy) else f", 冷却中（剩余 {proxy.cooldown_until - time.time():.0f}s）"
+            lines.append(f"  {proxy.server}: 评分 {proxy.score:.2f}, 成功 {proxy.successes:.0f}, "
+                         f"失败 {proxy.failures:.0f}{state}")
+        return lines
+
+
+_pool = None
+_configured = False
+
+
+def configured_proxies():
+    """配置中的代理列表和代理文件"""
+    servers = [proxy for proxy in (parse_proxy(p) for p in PROXY_CONFIG['PROXIES']) if proxy]
+    if PROXY_CONFIG['FILE']:
+        servers += load_proxy_file(PROXY_CONFIG['FILE'])
+    return servers
+
+
+def set_proxies(servers, shared=None):
+    """设置当前进程使用的代理列表，空列表表示不使用代理
+
+    shared: 工作进程中传入主进程的shared_state()，与主进程和其他工作进程共用代理状态
+    """
+    global _pool, _configured
+    servers = list(dict.fromkeys(proxy for proxy in (parse_proxy(s) for s in servers) if proxy))
+    # 代理列表未变化时保留原有的健康评分，已分配代理的浏览器仍可继续使用
+    if not (_pool and _pool.servers() == servers and _pool.shared is shared):
+        _pool = ProxyPool(servers, shared, initialize=shared is None) if servers else None
+    _configured = True
+    return _pool
+
+
+def get_proxy_pool():
+    """当前进程的代理池，首次调用时按配置创建，未配置代理时返回None"""
+    if not _configured:
+        set_proxies(configured_proxies())
+    return _pool
@@ -0,0 +1,69 @@
+import re
+from config import CHROME_OPTIONS
+
+# 被拦截的请求在浏览器控制台记录为该错误
+BLOCKED_ERROR = 'net::ERR_BLOCKED_BY_CLIENT'
+
+
+def wildcard_pattern(pattern):
+    """与Network.setBlockedURLs一致的匹配规则：只有*是通配符，其余字符（包括?和[]）按原样匹配整个URL"""
+    return re.compile('.*'.join(re.escape(part) for part in pattern.split('*')) + r'\Z', re.S)
+
+
+class ResourceBlocker:
+    """按类别拦截图片、字体、媒体、地图瓦片和统计请求
+
+    被拦截的请求数从浏览器控制台日志统计，开销很小，始终开启；节省的流量按各类平均大小估算。
+    开启block_byte_stats时另从性能日志统计实际加载的请求数和流量（encodedDataLength实测）
+    """
+
+    def __init__(self, driver, enabled=None):
+        self.driver = driver
+        enabled = enabled if enabled is not None else CHROME_OPTIONS['block_resources']
+        self.patterns = {
+            name: [wildcard_pattern(pattern) for pattern in CHROME_OPTIONS['block_patterns'][name]]
+            for name, on in enabled.items() if on
+        }
+        self.measure_bytes = CHROME_OPTIONS['block_byte_stats']
+        self.blocked = {name: 0 for name in self.patterns}
+        self.loaded_requests = 0
+        self.loaded_bytes = 0
+
+    def enable(self):
+        urls = [pattern for name in self.patterns for pattern in CHROME_OPTIONS['block_patterns'][name]]
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': urls})
+
+    def classify(self, url):
+        for name, patterns in self.patterns.items():
+            if any(pattern.match(url) for pattern in patterns):
+                return name
+        return None
+
+    def handle_console(self, entries):
+        """按控制台日志中的拦截错误统计被拦截的请求，日志格式为 '<URL> - Failed to load resource: <错误>'"""
+        for entry in entries:
+            message = entry.get('message', '')
+            if BLOCKED_ERROR not in message:
+                continue
+            name = self.classify(message.split(' ', 1)[0])
+            if name:
+                self.blocked[name] += 1
+
+    def handle_event(self, method, params):
+        """根据性能日志中的网络事件统计实际加载的请求和流量"""
+        if method == 'Network.loadingFinished':
+            self.loaded_requests += 1
+            self.loaded_bytes += params.get('encodedDataLength', 0)
+
+    def estimated_saved_bytes(self):
+        estimates = CHROME_OPTIONS['block_estimated_bytes']
+        return sum(count * estimates.get(name, 0) for name, count in self.blocked.items())
+
+    def report(self):
+        blocked = ', '.join(f"{name} {count}" for name, count in self.blocked.items())
+        text = (f"资源拦截: 拦截请求 {sum(self.blocked.values())} 个（{blocked}）, "
+                f"按平均大小估算节省 {self.estimated_saved_bytes() / 1024 / 1024:.1f} MB")
+        if self.measure_bytes:
+            text += f"; 实际加载 {self.loaded_requests} 个请求, 实测 {self.loaded_bytes / 1024 / 1024:.1f} MB"
+        return text
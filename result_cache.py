@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import sqlite3
+from config import CACHE_CONFIG
+from place_index import place_key, query_key
+
+# 写入多少次后检查一次容量
+EVICT_CHECK_EVERY = 100
+
+
+class ResultCache:
+    """两级本地缓存：商户详情缓存和查询结果列表缓存，按TTL过期、按容量淘汰最早写入的条目
+
+    重复或重叠的查询直接使用未过期的缓存，只有过期或缺失的条目才需要浏览器重新获取
+    """
+
+    def __init__(self, path=None):
+        self.path = path or CACHE_CONFIG['PATH']
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for table in ('details', 'queries'):
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                              f"(key TEXT PRIMARY KEY, data TEXT, updated REAL) WITHOUT ROWID")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_updated ON {table} (updated)")
+        self.conn.commit()
+        self.writes = 0
+        self.stats = {
+            'details': {'hits': 0, 'misses': 0, 'stale': 0},
+            'queries': {'hits': 0, 'misses': 0, 'stale': 0}
+        }
+
+    def get(self, table, key, ttl):
+        row = self.conn.execute(f"SELECT data, updated FROM {table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.stats[table]['misses'] += 1
+            return None
+        if time.time() - row[1] > ttl:
+            self.stats[table]['stale'] += 1
+            self.conn.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+            return None
+        self.stats[table]['hits'] += 1
+        return json.loads(row[0])
+
+    def put(self, table, key, data, limit):
+        self.conn.execute(f"INSERT OR REPLACE INTO {table} (key, data, updated) VALUES (?, ?, ?)",
+                          (key, json.dumps(data, ensure_ascii=False), time.time()))
+        self.conn.commit()
+        self.writes += 1
+        if self.writes % EVICT_CHECK_EVERY == 0:
+            self.evict(table, limit)
+
+    def evict(self, table, limit):
+        """超过容量时淘汰最早写入的条目"""
+        count = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if count > limit:
+            self.conn.execute(f"DELETE FROM {table} WHERE key IN "
+                              f"(SELECT key FROM {table} ORDER BY updated LIMIT ?)", (count - limit,))
+            self.conn.commit()
+
+    def get_detail(self, place):
+        """按商户键读取未过期的详情，place可以是结果卡片或详情结果"""
+        return self.get('details', place_key(place), CACHE_CONFIG['DETAIL_TTL'])
+
+    def put_detail(self, result):
+        self.put('details', place_key(result), result, CACHE_CONFIG['MAX_DETAILS'])
+
+    def get_query(self, query, viewport=None):
+        """读取查询的结果卡片列表，返回 {'cards': [...], 'complete': 是否已滚动到列表底部}"""
+        return self.get('queries', query_key(query, viewport), CACHE_CONFIG['QUERY_TTL'])
+
+    def put_query(self, query, viewport, cards, complete):
+        # 元素引用无法序列化，只保存卡片的文本信息
+        cards = [{k: v for k, v in card.items() if k != 'element'} for card in cards]
+        self.put('queries', query_key(query, viewport), {'cards': cards, 'complete': complete},
+                 CACHE_CONFIG['MAX_QUERIES'])
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def report(self):
+        parts = []
+        for table, label in (('details', '详情缓存'), ('queries', '查询缓存')):
+            stats = self.stats[table]
+            parts.append(f"{label} 命中 {stats['hits']} / 未命中 {stats['misses']} / 过期 {stats['stale']}")
+        return "缓存: " + ", ".join(parts)
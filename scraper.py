@@ -2,24 +2,358 @@ import time
 import re
 import os
 import sys
-import pandas as pd
-from datetime import datetime
+import socket
+import shutil
+import tempfile
+from collections import deque
+from urllib.parse import quote_plus
 from selenium import webdriver
-from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from config import CHROME_OPTIONS, SCRAPER_CONFIG, WORKER_POOL_CONFIG, CACHE_CONFIG, MEMORY_CONFIG
+from page_waits import PageWaiter
+from selector_registry import SelectorRegistry
+from network_capture import NetworkCapture, read_performance_events
+from resource_blocking import ResourceBlocker
+from journal import ResultJournal
+from place_index import open_index, place_key, query_key
+from result_cache import ResultCache
+from field_extraction import get_extractor
+from proxy_pool import get_proxy_pool
+from adaptive_control import get_controller
+from memory_monitor import MemoryMonitor, format_snapshot
+
+
+# 页面脚本共用的选择器探测：sel为各名称的备选链，按顺序探测，第一个有结果的备选项生效，
+# 命中的选择器记入matched（未命中为null）随脚本结果回传，由SelectorRegistry.observe()登记统计并调整顺序；
+# 同一次调用中多次探测同一名称时，只要有一次命中即记为命中
+SELECTOR_PROBE_JS = """
+    var matched = {};
+    var mark = function (name, selector) {
+        if (selector ? !matched[name] : !(name in matched)) {
+            matched[name] = selector;
+        }
+    };
+    var probeAll = function (root, name) {
+        var chain = sel[name];
+        for (var i = 0; i < chain.length; i++) {
+            var found = root.querySelectorAll(chain[i]);
+            if (found.length) {
+                mark(name, chain[i]);
+                return found;
+            }
+        }
+        mark(name, null);
+        return [];
+    };
+    var probe = function (root, name) {
+        var chain = sel[name];
+        for (var i = 0; i < chain.length; i++) {
+            var found = root.querySelector(chain[i]);
+            if (found) {
+                mark(name, chain[i]);
+                return found;
+            }
+        }
+        mark(name, null);
+        return null;
+    };
+    // 各备选项匹配不同种类元素的链（如详情信息）合并匹配，逐个记录命中的备选项
+    var probeEach = function (root, name) {
+        var chain = sel[name];
+        var hits = matched[name] = matched[name] || [];
+        chain.forEach(function (selector) {
+            if (hits.indexOf(selector) < 0 && root.querySelector(selector)) {
+                hits.push(selector);
+            }
+        });
+        return root.querySelectorAll(chain.join(', '));
+    };
+"""
+
+# 批量读取结果卡片：名称、评分、评论数、链接和地址片段，元素引用一并返回用于点击
+# 只返回从start开始新追加的卡片，total为列表中的卡片总数
+CARD_BATCH_SCRIPT = """
+    var container = arguments[0];
+    var sel = arguments[1];
+    var start = arguments[2] || 0;
+""" + SELECTOR_PROBE_JS + """
+    var cards = probeAll(container, 'result_card');
+    var located = window.__scraperCards = window.__scraperCards || {};
+    var text = function (root, name) {
+        var el = probe(root, name);
+        return el ? el.textContent.trim() : '';
+    };
+    var results = [];
+    for (var i = start; i < cards.length; i++) {
+        var card = cards[i];
+        var link = probe(card, 'card_link');
+        if (link) {
+            located[link.href] = card;
+        }
+        var lines = [];
+        probeAll(card, 'card_info_row').forEach(function (row) {
+            if (row.querySelector(sel.card_info_row.join(', '))) {
+                return;
+            }
+            var line = row.innerText.trim();
+            if (line && lines.indexOf(line) < 0) {
+                lines.push(line);
+            }
+        });
+        results.push({
+            element: card,
+            index: i,
+            name: text(card, 'card_name'),
+            rating: text(card, 'card_rating'),
+            reviews: text(card, 'card_reviews').replace(/[()]/g, ''),
+            href: link ? link.href : '',
+            address_snippet: lines.length > 1 ? lines[1] : ''
+        });
+    }
+    return {total: cards.length, cards: results, matched: matched};
+"""
+
+# 结果列表预取：定时检查未处理卡片数量，不足lookahead时滚动到底部加载下一页，
+# 连续maxIdle次高度不变或出现列表结束标记时标记为已到底，状态保存在window.__scraperPrefetch，
+# state.matched为最近一次检查的选择器探测结果
+PREFETCH_SCRIPT = """
+    var container = arguments[0];
+    var sel = arguments[1];
+    var lookahead = arguments[2];
+    var interval = arguments[3];
+    var maxIdle = arguments[4];
+    var state = window.__scraperPrefetch;
+    if (state && !state.detached && window.__scraperPrefetchContainer === container) {
+        return;
+    }
+    if (state) {
+        clearInterval(state.timer);
+    }
+    window.__scraperPrefetchContainer = container;
+    state = window.__scraperPrefetch = {consumed: 0, total: 0, ended: false, detached: false, idle: 0, lastHeight: 0, scrolls: 0,
+                                        matched: {}};
+    state.timer = setInterval(function () {
+        if (!document.body.contains(container)) {
+            state.detached = true;
+            clearInterval(state.timer);
+            return;
+        }
+""" + SELECTOR_PROBE_JS + """
+        state.matched = matched;
+        state.total = probeAll(container, 'result_card').length;
+        if (state.ended || state.total - state.consumed >= lookahead) {
+            return;
+        }
+        var height = container.scrollHeight;
+        if (height === state.lastHeight) {
+            state.idle++;
+            if (probe(container, 'list_end') || state.idle >= maxIdle) {
+                state.ended = true;
+                clearInterval(state.timer);
+                return;
+            }
+            var more = probe(document, 'load_more');
+            if (more && more.offsetParent !== null) {
+                more.click();
+            }
+        } else {
+            state.idle = 0;
+            state.lastHeight = height;
+        }
+        container.scrollTo(0, container.scrollHeight);
+        state.scrolls++;
+    }, interval);
+"""
+
+# 根据商户链接定位卡片元素，用于卡片引用失效后的恢复：按批量读取时登记的链接直接查找，
+# 列表重新渲染后登记的元素全部失效，一次遍历重新登记，之后的定位不再遍历列表
+LOCATE_CARD_SCRIPT = """
+    var sel = arguments[0];
+    var href = arguments[1];
+""" + SELECTOR_PROBE_JS + """
+    var located = window.__scraperCards = window.__scraperCards || {};
+    if (!(located[href] && located[href].isConnected)) {
+        probeAll(document, 'card_link').forEach(function (link) {
+            var card = link.closest(sel.result_card.join(', '));
+            if (card) {
+                located[link.href] = card;
+            }
+        });
+    }
+    return {card: located[href] && located[href].isConnected ? located[href] : null, matched: matched};
+"""
+
+# 点击详情面板中所有可见的展开按钮，返回点击数量
+EXPAND_BUTTONS_SCRIPT = """
+    var sel = arguments[0];
+""" + SELECTOR_PROBE_JS + """
+    var buttons = probeEach(document, 'expand_button');
+    var clicked = 0;
+    buttons.forEach(function (button) {
+        if (button.offsetParent !== null && !button.disabled) {
+            try {
+                button.click();
+                clicked++;
+            } catch (e) {}
+        }
+    });
+    return {clicked: clicked, matched: matched};
+"""
+
+# 批量读取详情面板中可见元素的文本和aria-label
+DETAIL_BATCH_SCRIPT = """
+    var panel = arguments[0];
+    var sel = arguments[1];
+""" + SELECTOR_PROBE_JS + """
+    var visible = function (el) {
+        return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    };
+    var texts = [];
+    probeEach(panel, 'detail_info').forEach(function (el) {
+        if (!visible(el)) {
+            return;
+        }
+        var text = (el.innerText || '').trim();
+        if (text) {
+            texts.push(text);
+        }
+        var label = el.getAttribute('aria-label');
+        if (label) {
+            texts.push(label);
+        }
+    });
+    var containerTexts = [];
+    probeEach(panel, 'detail_container').forEach(function (el) {
+        var text = (el.innerText || '').trim();
+        if (text) {
+            containerTexts.push(text);
+        }
+    });
+    return {texts: texts, container_texts: containerTexts, matched: matched};
+"""
+
+PLACE_ID_PATTERN = re.compile(r'!1s(0x[0-9a-fA-F]+:0x[0-9a-fA-F]+)')
+PLACE_COORDS_PATTERN = re.compile(r'!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)')
+# Maps跳转后的链接中包含地图中心和缩放级别：/@纬度,经度,缩放z
+VIEWPORT_PATTERN = re.compile(r'/@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?),(\d+(?:\.\d+)?)z')
+
+
+def card_identity(card):
+    """卡片的稳定标识：优先商户标识，其次链接；都没有时用名称加地址片段，
+    没有地址片段时加列表位置，避免同名的连锁店被当作同一商户
+    """
+    if card.get('place_id') or card.get('href'):
+        return card.get('place_id') or card['href']
+    return f"{card.get('name', '')}|{card.get('address_snippet') or card.get('index', '')}"
+
+
+class ResultCursor:
+    """结果列表游标：记录已交给提取的卡片位置，每次只返回新追加的卡片"""
 
-class GoogleMapsScraper:
     def __init__(self):
+        self.position = 0
+        self.cards = {}
+
+    def reset(self):
+        """结果列表重新加载后从头开始，已见过的卡片仍按标识跳过"""
+        self.position = 0
+
+    def advance(self, total, cards):
+        """登记新一批卡片，返回其中未见过的卡片"""
+        self.position = total
+        new_cards = []
+        for card in cards:
+            identity = card_identity(card)
+            if identity in self.cards:
+                # 更新为最新的元素引用
+                self.cards[identity]['element'] = card['element']
+                continue
+            self.cards[identity] = card
+            new_cards.append(card)
+        return new_cards
+
+
+def build_search_url(query, viewport=None):
+    """构造直接打开搜索结果列表的链接，viewport为(纬度, 经度, 缩放级别)"""
+    url = f"{SCRAPER_CONFIG['MAPS_BASE_URL']}/search/{quote_plus(query)}/"
+    if viewport:
+        lat, lng, zoom = viewport
+        url += f"@{lat},{lng},{zoom}z"
+    return url
+
+
+def parse_place_url(href):
+    """从商户链接中解析稳定的商户标识和坐标"""
+    info = {'place_id': '', 'latitude': '', 'longitude': ''}
+    if not href:
+        return info
+    match = PLACE_ID_PATTERN.search(href)
+    if match:
+        info['place_id'] = match.group(1)
+    match = PLACE_COORDS_PATTERN.search(href)
+    if match:
+        info['latitude'] = match.group(1)
+        info['longitude'] = match.group(2)
+    return info
+
+
+class GoogleMapsScraper:
+    def __init__(self, worker_id=None):
         self.driver = None
         self.is_running = False
         self.is_paused = False
         self.total_results = []
+        self.result_count = 0
+        # 本次查询结果列表中的卡片数，包括已知和缓存命中的商户，地理分块据此判断分块是否饱和
+        self.cards_seen = 0
+        # 本次查询中因已由其他查询获取过而跳过的商户数
+        self.skipped_known = 0
+        self.journal = None
+        # 跨任务商户索引，每次任务在执行线程中打开
+        self.index = None
+        self.cache = None
         self.current_query = None
+        self.current_country = None
+        self.current_viewport = None
+        # 并行模式下的工作进程编号，用于分配独立的调试端口和用户目录
+        self.worker_id = worker_id
+        self.profile_dir = None
+        self.waiter = None
+        self.selectors = None
+        self.capture = None
+        self.blocker = None
+        # 当前浏览器会话加载过的页面数（搜索和详情），浏览器池据此回收
+        self.pages_loaded = 0
+        # tabs模式下用于并发加载详情的标签页
+        self.detail_handles = []
+        # 浏览器启动时分配的代理，页面请求按代理的令牌桶限速
+        self.proxy_pool = None
+        self.proxy = None
+        # 最近一次页面操作的开始时间，用于统计操作耗时
+        self.action_started = None
+        # 结果列表标签页的内存和DOM节点监控，超限时回收标签页或重启浏览器
+        self.memory = MemoryMonitor() if MEMORY_CONFIG['ENABLED'] else None
+
+    def allocate_debug_port(self):
+        """为当前实例分配远程调试端口，避免多个Chrome实例冲突"""
+        if self.worker_id is not None:
+            return WORKER_POOL_CONFIG['DEBUG_PORT_BASE'] + self.worker_id
+        # 单实例模式下由系统分配一个空闲端口
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def create_profile_dir(self):
+        """为当前实例创建独立的Chrome用户数据目录"""
+        base_dir = WORKER_POOL_CONFIG['PROFILE_DIR']
+        if not os.path.exists(base_dir):
+            os.makedirs(base_dir)
+        prefix = f"worker{self.worker_id}_" if self.worker_id is not None else "single_"
+        return tempfile.mkdtemp(prefix=prefix, dir=base_dir)
 
     def initialize(self, log_callback=None):
         try:
@@ -27,32 +361,36 @@ class GoogleMapsScraper:
                 log_callback("正在初始化Chrome浏览器...")
             
             chrome_options = Options()
-            # 配置无头模式
-            chrome_options.add_argument('--headless=new')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            
-            # 设置窗口大小和用户代理
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--start-maximized')
-            chrome_options.add_argument('--hide-scrollbars')
-            chrome_options.add_argument('--enable-javascript')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+            # 无头模式、窗口大小、用户代理等启动参数见config.CHROME_OPTIONS
+            for argument in CHROME_OPTIONS['arguments']:
+                chrome_options.add_argument(argument)
             
-            # 添加用户代理
-            chrome_options.add_argument('user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+            # 拦截图片时同时关闭图片渲染
+            if CHROME_OPTIONS['block_resources'].get('images'):
+                chrome_options.add_experimental_option('prefs', {
+                    'profile.managed_default_content_settings.images': 2
+                })
             
-            # 添加其他性能优化选项
-            chrome_options.add_argument('--disable-extensions')
-            chrome_options.add_argument('--disable-popup-blocking')
-            chrome_options.add_argument('--lang=zh-CN')
-            chrome_options.add_argument('--remote-debugging-port=9222')
+            # 每个实例使用独立的调试端口和用户目录，支持多个浏览器并行运行
+            chrome_options.add_argument(f'--remote-debugging-port={self.allocate_debug_port()}')
+            self.profile_dir = self.create_profile_dir()
+            chrome_options.add_argument(f'--user-data-dir={self.profile_dir}')
+            proxy_server = self.assign_proxy(log_callback)
+            if proxy_server:
+                chrome_options.add_argument(f'--proxy-server={proxy_server}')
             
             # 添加实验性选项
             chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
             chrome_options.add_experimental_option('useAutomationExtension', False)
             
+            # 被拦截的请求数从控制台错误日志统计；捕获模式和实测流量统计需要通过性能日志读取DevTools网络事件
+            blocking = any(CHROME_OPTIONS['block_resources'].values())
+            logging_prefs = {'browser': 'SEVERE'} if blocking else {}
+            if SCRAPER_CONFIG['CAPTURE_MODE'] or (blocking and CHROME_OPTIONS['block_byte_stats']):
+                logging_prefs['performance'] = 'ALL'
+            if logging_prefs:
+                chrome_options.set_capability('goog:loggingPrefs', logging_prefs)
+            
             # 修改 ChromeDriver 路径检测逻辑
             if sys.platform == 'win32':
                 chromedriver_name = 'chromedriver.exe'
@@ -74,17 +412,18 @@ class GoogleMapsScraper:
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
             
             # 设置页面加载超时
-            self.driver.set_page_load_timeout(30)
-            self.driver.implicitly_wait(10)
+            self.driver.set_page_load_timeout(SCRAPER_CONFIG['PAGE_LOAD_TIMEOUT'])
+            # 不使用隐式等待，可选元素未命中时立即返回，需要等待的步骤由PageWaiter显式处理
+            self.driver.implicitly_wait(0)
+            self.waiter = PageWaiter(self.driver)
+            self.selectors = SelectorRegistry(self.driver)
+            if any(CHROME_OPTIONS['block_resources'].values()):
+                self.blocker = ResourceBlocker(self.driver)
+            if SCRAPER_CONFIG['CAPTURE_MODE']:
+                self.capture = NetworkCapture(self.driver, SCRAPER_CONFIG['CAPTURE_SAVE_DIR'])
+                self.capture.enable()
             
-            # 执行一些初始化JavaScript
-            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-                'source': '''
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined
-                    })
-                '''
-            })
+            self.prepare_tab()
             
             if log_callback:
                 log_callback("Chrome浏览器初始化成功")
@@ -94,6 +433,20 @@ class GoogleMapsScraper:
                 log_callback(f"初始化错误: {str(e)}")
             return False
 
+    def prepare_tab(self):
+        """对当前标签页启用资源拦截并执行初始化JavaScript，新建的标签页需要重新设置"""
+        if self.blocker:
+            self.blocker.enable()
+        if self.memory:
+            self.driver.execute_cdp_cmd('Performance.enable', {})
+        self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            'source': '''
+                Object.defineProperty(navigator, 'webdriver', {
+                    get: () => undefined
+                })
+            '''
+        })
+
     def close(self, log_callback=None):
         try:
             if self.driver:
@@ -101,17 +454,175 @@ class GoogleMapsScraper:
                     log_callback("正在关闭浏览器...")
                 self.driver.quit()
                 self.driver = None
+                self.detail_handles = []
                 if log_callback:
                     log_callback("浏览器已关闭")
         except Exception as e:
             if log_callback:
                 log_callback(f"关闭错误: {str(e)}")
+        finally:
+            if self.profile_dir:
+                shutil.rmtree(self.profile_dir, ignore_errors=True)
+                self.profile_dir = None
+            self.release_proxy()
+
+    def healthy(self):
+        """浏览器会话是否仍可用，所用代理已暂停、代理设置已变更或内存监控要求重启时视为不可用"""
+        if not self.proxy_healthy() or (self.memory and self.memory.restart_pending):
+            return False
+        try:
+            return self.driver is not None and self.driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    def assign_proxy(self, log_callback=None):
+        """从当前代理池分配代理，返回代理地址，未配置代理时返回None"""
+        self.release_proxy()
+        self.proxy_pool = get_proxy_pool()
+        if self.proxy_pool is None:
+            return None
+        self.proxy = self.proxy_pool.assign(self.worker_id)
+        if log_callback:
+            log_callback(f"使用代理: {self.proxy.server}")
+        return self.proxy.server
+
+    def release_proxy(self):
+        if self.proxy:
+            self.proxy_pool.release(self.proxy)
+        self.proxy = None
+
+    def proxy_healthy(self):
+        if self.proxy_pool is not get_proxy_pool():
+            return False
+        return self.proxy is None or self.proxy_pool.usable(self.proxy)
+
+    def pace(self):
+        """发出页面请求前等待：并发数被下调时暂停，按自适应间隔和代理的令牌桶限速"""
+        controller = get_controller()
+        if controller:
+            while not controller.active(self.worker_id) and self.is_running:
+                time.sleep(1)
+            time.sleep(controller.current_delay())
+        if self.proxy:
+            self.proxy_pool.acquire(self.proxy)
+        self.action_started = time.time()
+
+    def record_outcome(self, outcome, started=None):
+        """记录一次页面操作的结果（ok/timeout/empty）和耗时，用于自适应控制和代理健康评分"""
+        started = started or self.action_started
+        controller = get_controller()
+        if controller and started:
+            controller.record(self.worker_id, time.time() - started, outcome)
+        if self.proxy:
+            self.proxy_pool.record(self.proxy, outcome == 'ok')
+
+    def check_memory(self, log_callback=None):
+        """采样当前标签页的内存指标，超过阈值时返回需要回收的范围（tab/browser），否则返回None"""
+        try:
+            action, reason = self.memory.check(self.driver.execute_cdp_cmd('Performance.getMetrics', {}))
+        except Exception:
+            return None
+        if action and log_callback:
+            log_callback(f"内存监控: {reason}，{'回收标签页' if action == 'tab' else '重启浏览器'}后从当前查询继续")
+        return action
+
+    def recycle_session(self, action, log_callback=None):
+        """回收结果列表所在的标签页或重启整个浏览器，返回是否成功；调用方随后重新打开当前查询"""
+        try:
+            if action == 'browser':
+                self.close(log_callback)
+                if not self.initialize(log_callback):
+                    return False
+                self.pages_loaded = 0
+            else:
+                # 先打开新标签页再关闭旧的，浏览器不会因没有标签页而退出；详情标签页一并关闭，按需重建
+                old_handles = self.driver.window_handles
+                self.driver.switch_to.new_window('tab')
+                self.prepare_tab()
+                if self.capture:
+                    self.driver.execute_cdp_cmd('Network.enable', {})
+                handle = self.driver.current_window_handle
+                for old_handle in old_handles:
+                    self.driver.switch_to.window(old_handle)
+                    self.driver.close()
+                self.driver.switch_to.window(handle)
+                self.detail_handles = []
+            self.memory.recycled(action)
+            return True
+        except Exception as e:
+            if log_callback:
+                log_callback(f"回收浏览器会话失败: {str(e)}")
+            return False
+
+    def retry_delay(self, attempt):
+        """重试前的等待秒数，由自适应控制按当前间隔退避"""
+        controller = get_controller()
+        return controller.backoff(attempt) if controller else 5
+
+    def load_home(self):
+        """加载Maps首页，用于预热连接和缓存"""
+        self.pace()
+        self.driver.get(SCRAPER_CONFIG['MAPS_BASE_URL'])
+        self.pages_loaded += 1
+
+    def locate_viewport(self, query):
+        """搜索地名，返回Maps跳转到的地图视野(纬度, 经度, 缩放级别)，无法定位时返回None"""
+        self.pace()
+        self.driver.get(build_search_url(query))
+        self.pages_loaded += 1
+        self.waiter.until('search_results', lambda: VIEWPORT_PATTERN.search(self.driver.current_url), baseline=3)
+        match = VIEWPORT_PATTERN.search(self.driver.current_url)
+        return tuple(float(v) for v in match.groups()) if match else None
 
     def create_search_query(self, business_type, country):
         return f"{business_type} in {country}"
 
-    def search_places(self, query, log_callback=None):
-        max_retries = 3
+    def search_places(self, query, log_callback=None, viewport=None):
+        """打开搜索结果列表，优先通过搜索链接直接打开，失败时回退到输入框搜索"""
+        if SCRAPER_CONFIG['SEARCH_MODE'] == 'direct':
+            if self.open_search_url(query, log_callback, viewport):
+                return True
+            if log_callback:
+                log_callback("直接打开搜索链接失败，改用输入框搜索")
+        return self.type_search(query, log_callback)
+
+    def open_search_url(self, query, log_callback=None, viewport=None):
+        """通过编码后的搜索链接直接打开结果列表"""
+        try:
+            url = build_search_url(query, viewport)
+            if log_callback:
+                log_callback(f"直接打开搜索链接: {url}")
+            self.pace()
+            self.driver.get(url)
+            self.pages_loaded += 1
+            return self.wait_for_results(log_callback)
+        except Exception as e:
+            if log_callback:
+                log_callback(f"打开搜索链接失败: {str(e)}")
+            return False
+
+    def wait_for_results(self, log_callback=None):
+        """等待搜索结果列表加载完成，返回是否有结果"""
+        try:
+            results_container = self.waiter.element('search_results', self.selectors.css('results_container'))
+        except TimeoutException:
+            if log_callback:
+                log_callback("等待搜索结果超时")
+            self.record_outcome('timeout')
+            return False
+        
+        # 等待结果卡片出现且列表停止变化
+        self.waiter.element('results_settle', self.selectors.css('result_card'), baseline=0, required=False)
+        self.waiter.dom_stable('results_settle', results_container, baseline=3)
+        
+        # 检查是否有结果，被限流时常表现为空结果
+        found = bool(self.selectors.find_all('result_card', results_container))
+        self.record_outcome('ok' if found else 'empty')
+        return found
+
+    def type_search(self, query, log_callback=None):
+        """在首页搜索框中输入关键词进行搜索"""
+        max_retries = SCRAPER_CONFIG['MAX_RETRIES']
         retry_count = 0
         
         while retry_count < max_retries:
@@ -119,111 +630,98 @@ class GoogleMapsScraper:
                 if log_callback:
                     log_callback(f"尝试第 {retry_count + 1} 次搜索...")
                 
-                # 打开Google Maps
-                self.driver.get("https://www.google.com/maps")
-                time.sleep(3)  # 等待页面加载
-                
-                # 等待搜索框出现
-                search_box = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "input#searchboxinput"))
-                )
+                # 打开Google Maps，搜索框出现即可输入
+                self.pace()
+                self.driver.get(SCRAPER_CONFIG['MAPS_BASE_URL'])
+                self.pages_loaded += 1
+                search_box = self.waiter.element('search_box', self.selectors.css('search_box'), baseline=3)
                 
                 # 清除搜索框内容并输入搜索词
                 search_box.clear()
-                for char in query:
-                    search_box.send_keys(char)
-                    time.sleep(0.1)  # 模拟人工输入
-                time.sleep(1)
+                search_box.send_keys(query)
                 
                 # 点击搜索按钮
-                search_button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "button#searchbox-searchbutton"))
+                search_button = self.waiter.element(
+                    'search_box', self.selectors.css('search_button'),
+                    baseline=0.1 * len(query) + 1, condition=EC.element_to_be_clickable
                 )
                 search_button.click()
                 
                 # 等待搜索结果加载
-                try:
-                    WebDriverWait(self.driver, 20).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, 'div.m6QErb.DxyBCb.kA9KIf.dS8AEf'))
-                    )
-                    
-                    # 等待一段时间，确保结果完全加载
-                    time.sleep(3)
-                    
-                    # 检查是否有结果
-                    results = self.driver.find_elements(By.CSS_SELECTOR, 'div.Nv2PK')
-                    if not results:
-                        results = self.driver.find_elements(By.CSS_SELECTOR, 'div.Nv2PK.THOPZb.CpccDe')
-                    
-                    if not results:
-                        if log_callback:
-                            log_callback("未找到搜索结果，尝试重试...")
-                        retry_count += 1
-                        continue
-                    
-                    return True
-                    
-                except TimeoutException:
+                if not self.wait_for_results(log_callback):
                     if log_callback:
-                        log_callback("等待搜索结果超时")
+                        log_callback("未找到搜索结果，尝试重试...")
                     retry_count += 1
+                    if retry_count < max_retries:
+                        time.sleep(self.retry_delay(retry_count))
                     continue
+                
+                return True
                     
             except Exception as e:
                 retry_count += 1
                 if log_callback:
                     log_callback(f"搜索失败 ({retry_count}/{max_retries}): {str(e)}")
                 if retry_count < max_retries:
-                    time.sleep(5)  # 增加等待时间
+                    time.sleep(self.retry_delay(retry_count))
                 else:
                     return False
         
         return False
 
-    def scroll_results(self, log_callback=None):
-        try:
-            # 滚动结果列表以加载更多内容
-            try:
-                scrollable_section = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'div.m6QErb.DxyBCb.kA9KIf.dS8AEf'))
-                )
-            except TimeoutException:
-                if log_callback:
-                    log_callback("错误：未找到可滚动的结果列表")
-                return
-                
-            if scrollable_section:
-                if log_callback:
-                    log_callback("正在滚动加载更多结果...")
-                prev_height = 0
-                for i in range(3):  # 限制滚动次数
-                    try:
-                        curr_height = self.driver.execute_script("return arguments[0].scrollHeight", scrollable_section)
-                        if curr_height == prev_height:
-                            if log_callback:
-                                log_callback("已到达列表底部")
-                            break
-                        self.driver.execute_script("arguments[0].scrollTo(0, arguments[0].scrollHeight)", scrollable_section)
-                        time.sleep(5)  # 增加等待时间
-                        prev_height = curr_height
-                        if log_callback:
-                            log_callback(f"已完成第 {i+1} 次滚动，高度: {curr_height}")
-                    except Exception as e:
-                        if log_callback:
-                            log_callback(f"滚动操作失败: {str(e)}")
-                        break
-        except Exception as e:
-            if log_callback:
-                log_callback(f"滚动错误: {str(e)}")
+    def start_prefetch(self, results_container):
+        """在页面中启动结果列表预取：始终保持已加载但未处理的卡片不少于预取数量"""
+        self.driver.execute_script(
+            PREFETCH_SCRIPT, results_container, self.selectors.script_selectors(),
+            SCRAPER_CONFIG['PREFETCH_LOOKAHEAD'], SCRAPER_CONFIG['PREFETCH_INTERVAL_MS'],
+            SCRAPER_CONFIG['PREFETCH_MAX_IDLE']
+        )
+
+    def wait_for_prefetch(self, cursor):
+        """等待预取到新的卡片，列表已到底且没有新卡片时返回False"""
+        state = {}
+
+        def ready():
+            state.clear()
+            state.update(self.driver.execute_script("return window.__scraperPrefetch || {detached: true};"))
+            return state.get('total', 0) > cursor.position or state.get('ended') or state.get('detached')
+
+        self.waiter.until('scroll', ready, baseline=2)
+        self.selectors.observe(state.get('matched'))
+        if state.get('detached'):
+            # 列表已重新加载，下一轮重新启动预取
+            return True
+        return state.get('total', 0) > cursor.position or not state.get('ended')
 
-    def scrape(self, business_type, country, target_count, progress_callback=None, log_callback=None):
+    def scrape(self, business_type, country, target_count, progress_callback=None, log_callback=None,
+               result_callback=None, save_results=True, viewport=None, resume=False):
+        """执行一次搜索任务
+
+        result_callback: 每获取一个新商户时调用，返回False表示调用方要求停止（如全局目标已达成）
+        save_results: 是否将结果写入检查点日志并在结束时导出CSV，工作进程池模式下由主进程统一保存
+        viewport: 可选的(纬度, 经度, 缩放级别)，限定搜索的地图视野（地理分块模式）
+        resume: 从该查询的检查点日志继续，跳过已获取的商户
+        """
+        # 从浏览器池租用时浏览器已预热，任务结束后由池回收
+        owns_browser = self.driver is None
+        # 复用的浏览器所用代理已暂停时，换用其他代理重新启动
+        if not owns_browser and not self.proxy_healthy():
+            if log_callback:
+                log_callback("当前代理已暂停使用，更换代理重新启动浏览器")
+            self.close(log_callback)
         try:
             self.is_running = True
             self.total_results = []
-            self.current_query = f"{business_type} in {country}"
+            self.result_count = 0
+            self.cards_seen = 0
+            self.skipped_known = 0
+            # 指定视野时由视野限定搜索范围，查询中不再附带地区
+            self.current_query = business_type if viewport else self.create_search_query(business_type, country)
+            self.current_country = country
+            self.current_viewport = viewport
             
             # 初始化浏览器
-            if not self.initialize(log_callback):
+            if self.driver is None and not self.initialize(log_callback):
                 if log_callback:
                     log_callback("浏览器初始化失败")
                 return
@@ -232,73 +730,105 @@ class GoogleMapsScraper:
                 log_callback(f"开始搜索: {self.current_query}")
                 log_callback(f"目标获取商户数量: {target_count}")
 
-            if not self.search_places(self.current_query, log_callback):
+            # 本次任务已获取商户的去重键（商户标识，或名称+地址指纹）
+            processed = self.open_stores(business_type, country, save_results, resume, log_callback)
+            cursor = ResultCursor()  # 只处理每次滚动后新追加的卡片
+            seen_cards = {}  # 本次搜索读取到的卡片，结束后写入查询缓存
+            list_ended = False
+            
+            # 查询缓存中的结果列表和商户详情均未过期时，无需打开浏览器搜索
+            from_cache = self.cache is not None and self.serve_cached_query(
+                processed, target_count, progress_callback, result_callback, log_callback
+            )
+            if not from_cache and not self.search_places(self.current_query, log_callback, self.current_viewport):
                 if log_callback:
                     log_callback("搜索失败")
                 return
-
-            processed_names = set()  # 用于跟踪已处理的商家名称
             
-            while len(self.total_results) < target_count and self.is_running:
+            while not from_cache and self.result_count < target_count and self.is_running:
                 if self.is_paused:
                     time.sleep(1)
                     continue
 
+                # 结果列表累积的DOM过多时回收会话，重新打开查询后已获取的商户直接跳过
+                action = self.check_memory(log_callback) if self.memory and self.memory.due() else None
+                if action:
+                    if not self.recycle_session(action, log_callback) or \
+                            not self.search_places(self.current_query, log_callback, self.current_viewport):
+                        if log_callback:
+                            log_callback("回收后重新打开搜索失败")
+                        break
+                    cursor.reset()
+                    continue
+
                 try:
                     # 等待搜索结果列表加载
-                    wait = WebDriverWait(self.driver, 10)
-                    results_container = wait.until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, 'div.m6QErb.DxyBCb.kA9KIf.dS8AEf'))
-                    )
+                    results_container = self.waiter.element('search_results', self.selectors.css('results_container'))
                     
-                    # 获取当前可见的所有商家元素
-                    elements = results_container.find_elements(By.CSS_SELECTOR, 'div.Nv2PK.THOPZb.CpccDe')
-                    if not elements:  # 如果找不到，尝试其他选择器
-                        elements = results_container.find_elements(By.CSS_SELECTOR, 'div.Nv2PK')
+                    # 预取在页面内持续滚动加载，与详情提取并行
+                    self.start_prefetch(results_container)
+                    
+                    # 一次调用获取新追加的商家卡片
+                    cards = self.extract_cards(results_container, cursor)
+                    for card in cards:
+                        seen_cards[card_identity(card)] = card
+                    self.cards_seen = len(seen_cards)
                     
                     if log_callback:
-                        log_callback(f"当前页面找到 {len(elements)} 个商户")
+                        log_callback(f"当前页面找到 {len(cards)} 个商户")
                     
-                    for element in elements:
-                        if not self.is_running or len(self.total_results) >= target_count:
-                            break
-                            
-                        if self.is_paused:
-                            continue
-                        
-                        try:
-                            # 获取商家信息
-                            result = self.extract_place_info(element, log_callback)
-                            if result and result['name'] not in processed_names:
-                                self.total_results.append(result)
-                                processed_names.add(result['name'])
-                                
-                                if progress_callback:
-                                    progress_callback(int(len(self.total_results) / target_count * 100))
-                            
-                        except Exception as e:
-                            if log_callback:
-                                log_callback(f"处理商户时出错: {str(e)}")
+                    # 读取网络事件：统计资源拦截，捕获模式下从响应中解析商户，已解析的卡片无需点击
+                    captured = self.poll_network()
+                    if self.capture:
+                        if log_callback and captured:
+                            log_callback(f"从网络响应中解析到 {len(captured)} 个商户")
+                        for result in captured:
+                            if self.cache:
+                                self.cache.put_detail(result)
+                            if not self.accept_result(result, processed, target_count, progress_callback,
+                                                      result_callback):
+                                break
+                        cards = [card for card in cards if not card.get('place_id') or place_key(card) not in processed]
+                    
+                    # 详情缓存未过期的商户直接使用，其余的交给详情提取
+                    to_fetch = []
+                    skipped = self.skipped_known
+                    for card in cards:
+                        # 本次或之前任务已获取的商户无需再提取详情；没有商户标识的卡片提取后再按指纹去重
+                        # 先查缓存：同一查询获取过的商户由缓存返回，其余已知商户按索引跳过
+                        if card.get('place_id') and place_key(card) in processed:
                             continue
+                        result = self.cache.get_detail(card) if self.cache and card.get('place_id') else None
+                        if result is not None:
+                            if not self.accept_result(result, processed, target_count, progress_callback,
+                                                      result_callback):
+                                break
+                        elif not (card.get('place_id') and self.is_known(card)):
+                            to_fetch.append(card)
+                    if self.skipped_known > skipped and log_callback:
+                        log_callback(f"跳过 {self.skipped_known - skipped} 个已由其他查询获取的商户"
+                                     f"（累计 {self.skipped_known} 个）")
+                    
+                    for result in self.fetch_details(to_fetch, target_count, log_callback):
+                        if self.cache:
+                            self.cache.put_detail(result)
+                        if not self.accept_result(result, processed, target_count, progress_callback,
+                                                  result_callback):
+                            break
                     
-                    # 如果还需要更多结果，滚动加载
-                    if len(self.total_results) < target_count:
-                        last_height = self.driver.execute_script("return arguments[0].scrollHeight", results_container)
-                        self.driver.execute_script("arguments[0].scrollTo(0, arguments[0].scrollHeight);", results_container)
-                        time.sleep(2)
-                        
-                        new_height = self.driver.execute_script("return arguments[0].scrollHeight", results_container)
-                        if new_height == last_height:
-                            # 尝试点击"加载更多"按钮（如果存在）
-                            try:
-                                load_more = self.driver.find_element(By.CSS_SELECTOR, "button.HlvSq")
-                                if load_more.is_displayed():
-                                    load_more.click()
-                                    time.sleep(2)
-                                else:
-                                    break  # 没有更多结果了
-                            except:
-                                break  # 没有更多结果了
+                    if not to_fetch or SCRAPER_CONFIG['DETAIL_MODE'] == 'tabs':
+                        # 没有点击卡片时，由游标位置推进预取
+                        self.driver.execute_script(
+                            "if (window.__scraperPrefetch) { window.__scraperPrefetch.consumed = arguments[0]; }",
+                            cursor.position
+                        )
+                    
+                    # 如果还需要更多结果，等待预取的新卡片
+                    if self.result_count < target_count and not self.wait_for_prefetch(cursor):
+                        if log_callback:
+                            log_callback("已到达列表底部")
+                        list_ended = True
+                        break  # 没有更多结果了
                     
                 except Exception as e:
                     if log_callback:
@@ -306,272 +836,400 @@ class GoogleMapsScraper:
                     # 尝试恢复搜索结果页面
                     try:
                         self.driver.refresh()
-                        time.sleep(2)
-                        self.search_places(self.current_query, log_callback)
+                        self.search_places(self.current_query, log_callback, self.current_viewport)
+                        cursor.reset()
                     except:
                         break
 
+            if self.cache and not from_cache and seen_cards:
+                self.cache.put_query(self.current_query, self.current_viewport, list(seen_cards.values()), list_ended)
+
             # 保存结果
-            if self.total_results:
-                try:
-                    df = pd.DataFrame(self.total_results)
-                    # 确保output目录存在
-                    output_dir = "output"
-                    if not os.path.exists(output_dir):
-                        os.makedirs(output_dir)
-                    # 在output目录下保存文件
-                    filename = os.path.join(output_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{country}_{business_type}.csv")
-                    df.to_csv(filename, index=False, encoding='utf-8-sig')
-                    if log_callback:
-                        log_callback(f"数据已保存到文件: {filename}")
-                except Exception as e:
-                    if log_callback:
-                        log_callback(f"保存数据时出错: {str(e)}")
+            if self.result_count:
+                if self.journal:
+                    self.journal.close()
+                    self.journal.export_csv(log_callback)
             else:
-                if log_callback:
-                    log_callback("未获取到任何商户信息")
+                self.log_no_results(log_callback)
 
         except Exception as e:
             if log_callback:
                 log_callback(f"爬虫运行错误: {str(e)}")
         finally:
-            self.close(log_callback)
+            self.close_stores(log_callback)
+            if self.waiter and log_callback:
+                log_callback("等待耗时统计:")
+                for line in self.waiter.report():
+                    log_callback(line)
+            if self.selectors and log_callback:
+                log_callback("选择器命中统计:")
+                for line in self.selectors.report():
+                    log_callback(line)
+            if self.capture and log_callback:
+                log_callback(self.capture.report())
+            if self.memory and log_callback:
+                log_callback(f"浏览器内存: {format_snapshot(self.memory.snapshot())}")
+            if self.proxy_pool and log_callback:
+                for line in self.proxy_pool.report():
+                    log_callback(line)
+            if get_controller() and log_callback:
+                for line in get_controller().report():
+                    log_callback(line)
+            if self.blocker and log_callback:
+                try:
+                    self.poll_network()
+                except Exception:
+                    pass
+                log_callback(self.blocker.report())
+            if owns_browser:
+                self.close(log_callback)
             self.is_running = False
             if progress_callback:
                 progress_callback(100)
             if log_callback:
                 log_callback("爬虫任务结束")
 
-    def extract_place_info(self, element, log_callback=None):
+    def open_stores(self, business_type, country, save_results, resume, log_callback=None):
+        """打开检查点日志、商户索引和缓存，返回续爬时已获取商户的去重键集合"""
+        processed = set()
+        self.index = open_index()
+        if CACHE_CONFIG['ENABLED']:
+            self.cache = ResultCache()
+        # 结果逐条写入检查点日志，内存中只保留去重集合
+        if save_results:
+            self.journal = ResultJournal(f"{country}_{business_type}", resume)
+            if resume:
+                for record in self.journal.load():
+                    processed.add(place_key(record))
+                self.result_count = self.journal.count
+                if log_callback:
+                    log_callback(f"从检查点日志恢复 {self.result_count} 条结果")
+        return processed
+
+    def close_stores(self, log_callback=None):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+        if self.index:
+            if log_callback:
+                log_callback(self.index.report())
+            self.index.close()
+            self.index = None
+        if self.cache:
+            if log_callback:
+                log_callback(self.cache.report())
+            self.cache.close()
+            self.cache = None
+
+    def poll_network(self):
+        """读取一次控制台和性能日志，分发给资源拦截统计和网络捕获，返回捕获到的商户"""
+        places = []
+        if self.blocker:
+            self.blocker.handle_console(self.driver.get_log('browser'))
+        stats = self.blocker is not None and self.blocker.measure_bytes
+        if not (self.capture or stats):
+            return places
+        for method, params in read_performance_events(self.driver):
+            if stats:
+                self.blocker.handle_event(method, params)
+            if self.capture:
+                places.extend(self.capture.handle_event(method, params))
+        return places
+
+    def serve_cached_query(self, processed, target_count, progress_callback=None, result_callback=None,
+                           log_callback=None):
+        """按缓存的结果列表逐个使用缓存的商户详情，返回True表示无需再打开浏览器搜索
+
+        遇到没有详情缓存或已过期的商户时返回False，由浏览器从头搜索，已使用的缓存结果不会重复计入
+        """
+        cached = self.cache.get_query(self.current_query, self.current_viewport)
+        if cached is None:
+            return False
+        served = 0
+        for card in cached['cards']:
+            if not self.is_running or self.result_count >= target_count:
+                break
+            if card.get('place_id') and place_key(card) in processed:
+                continue
+            result = self.cache.get_detail(card) if card.get('place_id') else None
+            if result is None:
+                if log_callback:
+                    log_callback(f"查询缓存中 {served} 个商户可直接使用，其余需要重新获取")
+                return False
+            key = place_key(result)
+            if key in processed:
+                continue
+            processed.add(key)
+            if self.is_known(result):
+                continue
+            served += 1
+            if not self.add_result(result, target_count, progress_callback, result_callback):
+                break
+        if self.result_count < target_count and self.is_running and not cached['complete']:
+            # 缓存的列表不完整，剩余结果仍需浏览器获取
+            return False
+        self.cards_seen = len(cached['cards'])
+        if log_callback:
+            log_callback(f"使用查询缓存，获取 {served} 个商户")
+        return True
+
+    def accept_result(self, result, processed, target_count, progress_callback=None, result_callback=None):
+        """按去重键和商户索引过滤后登记商户，返回False表示应停止"""
+        key = place_key(result)
+        if key in processed:
+            return True
+        processed.add(key)
+        if self.is_known(result):
+            return True
+        if not self.is_running or self.result_count >= target_count:
+            return False
+        return self.add_result(result, target_count, progress_callback, result_callback)
+
+    def fetch_details(self, cards, target_count, log_callback=None):
+        """逐个产出卡片的详情结果：click模式在结果列表中点击卡片，tabs模式在后台标签页中按链接并发加载"""
+        if SCRAPER_CONFIG['DETAIL_MODE'] == 'tabs':
+            return self.fetch_details_in_tabs(cards, target_count, log_callback)
+        return self.fetch_details_by_click(cards, target_count, log_callback)
+
+    def fetch_details_by_click(self, cards, target_count, log_callback=None):
+        for card in cards:
+            if not self.is_running or self.result_count >= target_count:
+                break
+            while self.is_paused and self.is_running:
+                time.sleep(1)
+            try:
+                result = self.extract_place_info(card, log_callback)
+            except Exception as e:
+                if log_callback:
+                    log_callback(f"处理商户时出错: {str(e)}")
+                continue
+            if result:
+                yield result
+
+    def fetch_details_in_tabs(self, cards, target_count, log_callback=None):
+        """在后台标签页中按链接打开详情，每个标签页读取完成后立即加载下一个商户
+
+        WebDriver同一时刻只操作一个标签页，但其余标签页的详情在后台同时加载；
+        结果列表所在的标签页不再点击和返回，滚动位置和预取不受影响
+        """
+        pending = deque(card for card in cards if card.get('href'))
+        list_handle = self.driver.current_window_handle
+        loading = {}
+        try:
+            tabs = self.open_detail_tabs(list_handle)
+            while self.is_running:
+                # 空闲的标签页领取新的商户；去重过滤掉的结果不计入目标，需要继续补充
+                for handle in tabs:
+                    if handle not in loading:
+                        self.load_detail_tab(handle, pending, loading, target_count)
+                if not loading:
+                    break
+                for handle in list(loading):
+                    while self.is_paused and self.is_running:
+                        time.sleep(1)
+                    if not self.is_running or self.result_count >= target_count:
+                        return
+                    card, started = loading.pop(handle)
+                    # 各标签页的操作耗时从该标签页开始加载时计算
+                    self.action_started = started
+                    result = None
+                    try:
+                        self.driver.switch_to.window(handle)
+                        if self.waiter.until('detail_panel', lambda: self.driver.execute_script(
+                                "return !window.__scraperStale && !!document.querySelector(arguments[0]);",
+                                self.selectors.css('detail_panel')), baseline=5):
+                            result = self.build_result(card, self.read_detail_panel(log_callback), log_callback)
+                        else:
+                            self.record_outcome('timeout')
+                            if log_callback:
+                                log_callback(f"等待商户详情超时: {card['name']}")
+                    except Exception as e:
+                        if log_callback:
+                            log_callback(f"处理商户时出错: {str(e)}")
+                    # 读取完成后立即让该标签页加载下一个商户，再交出结果
+                    self.load_detail_tab(handle, pending, loading, target_count)
+                    if result:
+                        yield result
+        finally:
+            try:
+                self.driver.switch_to.window(list_handle)
+            except Exception:
+                pass
+        # 没有详情链接的卡片仍在结果列表中点击
+        for card in cards:
+            if not card.get('href'):
+                yield from self.fetch_details_by_click([card], target_count, log_callback)
+
+    def open_detail_tabs(self, list_handle):
+        """按配置数量准备详情标签页，已创建的标签页在后续批次中复用"""
+        handles = self.driver.window_handles
+        self.detail_handles = [handle for handle in self.detail_handles if handle in handles]
+        while len(self.detail_handles) < SCRAPER_CONFIG['DETAIL_TABS']:
+            self.driver.switch_to.new_window('tab')
+            self.prepare_tab()
+            self.detail_handles.append(self.driver.current_window_handle)
+        self.driver.switch_to.window(list_handle)
+        return self.detail_handles
+
+    def load_detail_tab(self, handle, pending, loading, target_count):
+        """让标签页开始加载下一个商户，不等待页面加载完成"""
+        if not pending or not self.is_running or self.result_count + len(loading) >= target_count:
+            return
+        card = pending.popleft()
+        self.pace()
+        try:
+            self.driver.switch_to.window(handle)
+            # 标记旧页面，新页面加载后标记自然消失，据此区分新旧详情面板
+            self.driver.execute_script("window.__scraperStale = true; location.href = arguments[0];", card['href'])
+            loading[handle] = (card, self.action_started)
+            self.pages_loaded += 1
+        except Exception:
+            # 标签页已失效时放弃该商户，避免反复尝试
+            pass
+
+    def is_known(self, result):
+        """商户是否已由其他查询获取过；同一查询获取过的商户不算已知，重复查询的结果与缓存是否过期无关"""
+        if self.index is None or not self.index.known(result, self.query_key()):
+            return False
+        self.skipped_known += 1
+        return True
+
+    def query_key(self):
+        return query_key(self.current_query, self.current_viewport)
+
+    def log_no_results(self, log_callback=None):
+        if not log_callback:
+            return
+        if self.skipped_known:
+            log_callback(f"未获取到新的商户信息：{self.skipped_known} 个商户已由其他查询获取，按商户索引跳过")
+        else:
+            log_callback("未获取到任何商户信息")
+
+    def add_result(self, result, target_count, progress_callback=None, result_callback=None):
+        """登记一个新商户，返回False表示调用方要求停止"""
+        if self.journal:
+            self.journal.append(result)
+            # 由本爬虫保存的结果写入日志后登记索引；交给回调的结果由调用方确认保存后登记
+            if self.index:
+                self.index.add(result, self.query_key())
+        elif not result_callback:
+            # 交给回调的结果由调用方保存，不在内存中保留
+            self.total_results.append(result)
+        self.result_count += 1
+        
+        if progress_callback:
+            progress_callback(int(self.result_count / target_count * 100))
+        
+        if result_callback and not result_callback(result):
+            self.is_running = False
+            return False
+        return True
+
+    def extract_cards(self, results_container, cursor=None):
+        """一次JavaScript调用批量读取结果列表中商户卡片的基本信息
+
+        传入cursor时只读取上次位置之后新追加的卡片
+        """
+        start = cursor.position if cursor else 0
+        batch = self.driver.execute_script(
+            CARD_BATCH_SCRIPT, results_container, self.selectors.script_selectors(), start
+        ) or {}
+        self.selectors.observe(batch.get('matched'))
+        if start and batch.get('total', 0) < start:
+            # 卡片数量变少说明列表已重新渲染，从头读取
+            cursor.reset()
+            batch = self.driver.execute_script(
+                CARD_BATCH_SCRIPT, results_container, self.selectors.script_selectors(), 0
+            ) or {}
+            self.selectors.observe(batch.get('matched'))
+        cards = batch.get('cards', [])
+        for card in cards:
+            card.update(parse_place_url(card.get('href', '')))
+        if cursor:
+            return cursor.advance(batch.get('total', 0), cards)
+        return cards
+
+    def click_card(self, element, index=0):
+        """滚动到卡片并点击，合并为一次调用，同时告知预取已处理到的位置"""
+        self.driver.execute_script("""
+            if (window.__scraperPrefetch) {
+                window.__scraperPrefetch.consumed = arguments[1];
+            }
+            arguments[0].scrollIntoView({block: 'center'});
+            arguments[0].click();
+            arguments[0].dispatchEvent(new MouseEvent('click', {
+                bubbles: true,
+                cancelable: true,
+                view: window
+            }));
+        """, element, index)
+
+    def locate_card(self, card):
+        """按链接重新定位卡片元素，无需比对名称"""
+        if not card.get('href'):
+            return None
+        located = self.driver.execute_script(LOCATE_CARD_SCRIPT, self.selectors.script_selectors(), card['href']) or {}
+        self.selectors.observe(located.get('matched'))
+        return located.get('card')
+
+    def extract_place_info(self, card, log_callback=None):
         max_retries = 2
         retry_count = 0
+        # 卡片信息已在列表页批量读取，点击前无需再逐个查询元素
+        name = card['name']
         
         while retry_count < max_retries:
             try:
                 if log_callback:
                     log_callback("开始提取商户信息...")
                 
-                # 在点击前获取所有基本信息
-                try:
-                    name = element.find_element(By.CSS_SELECTOR, "div.qBF1Pd.fontHeadlineSmall").text.strip()
-                    try:
-                        rating = element.find_element(By.CSS_SELECTOR, "span.MW4etd").text.strip()
-                    except:
-                        rating = "N/A"
-                except Exception as e:
+                if not name:
                     if log_callback:
-                        log_callback(f"获取基本信息失败: {str(e)}")
-                    retry_count += 1
-                    continue
-                
-                # 记录元素的位置信息并滚动
-                try:
-                    element_location = element.location
-                    self.driver.execute_script("window.scrollTo(0, arguments[0]);", element_location['y'] - 100)
-                    time.sleep(2)  # 增加等待时间
-                except:
-                    pass
+                        log_callback("获取基本信息失败: 卡片缺少名称")
+                    return None
                 
-                # 尝试多种方式点击商户详情
+                # 点击卡片打开详情
+                self.pace()
                 clicked = False
                 try:
-                    # 重新获取元素（避免stale element）
-                    elements = WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div.Nv2PK.THOPZb.CpccDe, div.Nv2PK'))
-                    )
-                    
-                    # 查找匹配的元素
-                    target_element = None
-                    for elem in elements:
-                        try:
-                            current_name = elem.find_element(By.CSS_SELECTOR, "div.qBF1Pd.fontHeadlineSmall").text.strip()
-                            if current_name == name:
-                                target_element = elem
-                                break
-                        except:
-                            continue
-                    
-                    if target_element:
-                        # 确保元素在视图中
-                        self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", target_element)
-                        time.sleep(1)
-                        
-                        # 方式1：使用JavaScript模拟点击
-                        try:
-                            self.driver.execute_script("""
-                                arguments[0].click();
-                                arguments[0].dispatchEvent(new MouseEvent('click', {
-                                    bubbles: true,
-                                    cancelable: true,
-                                    view: window
-                                }));
-                            """, target_element)
+                    self.click_card(card['element'], card.get('index', 0))
+                    clicked = True
+                except Exception:
+                    # 卡片元素失效时按链接重新定位
+                    try:
+                        element = self.locate_card(card)
+                        if element:
+                            card['element'] = element
+                            self.click_card(element, card.get('index', 0))
                             clicked = True
-                            time.sleep(2)  # 增加等待时间
-                        except:
-                            # 方式2：使用Actions链
-                            try:
-                                actions = webdriver.ActionChains(self.driver)
-                                actions.move_to_element(target_element)
-                                actions.click()
-                                actions.perform()
-                                clicked = True
-                                time.sleep(2)
-                            except:
-                                # 方式3：点击名称元素
-                                try:
-                                    name_element = target_element.find_element(By.CSS_SELECTOR, "div.qBF1Pd.fontHeadlineSmall")
-                                    self.driver.execute_script("arguments[0].click();", name_element)
-                                    clicked = True
-                                    time.sleep(2)
-                                except:
-                                    if log_callback:
-                                        log_callback("所有点击方式都失败")
-                except Exception as e:
-                    if log_callback:
-                        log_callback(f"点击过程出错: {str(e)}")
+                    except Exception:
+                        pass
+
+                if not clicked:
+                    # 使用Actions链点击
+                    try:
+                        actions = webdriver.ActionChains(self.driver)
+                        actions.move_to_element(card['element'])
+                        actions.click()
+                        actions.perform()
+                        clicked = True
+                    except Exception as e:
+                        if log_callback:
+                            log_callback(f"点击过程出错: {str(e)}")
                 
                 if not clicked:
                     retry_count += 1
                     if log_callback:
                         log_callback("无法点击商户详情，尝试重试...")
                     continue
+                self.pages_loaded += 1
                 
-                # 等待详情页面加载
-                time.sleep(3)  # 增加等待时间
+                fields = self.read_detail_panel(log_callback)
                 
-                # 获取详细信息
-                address = ""
-                phone = ""
+                # 使用JavaScript关闭详情页面，并等待搜索结果列表可见
+                self.close_detail_panel()
                 
-                try:
-                    # 等待详情面板加载
-                    details_panel = WebDriverWait(self.driver, 10).until(  # 增加等待时间
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.m6QErb.tLjsW.eKbjU"))
-                    )
-                    
-                    # 点击所有展开按钮
-                    expand_buttons = self.driver.find_elements(By.CSS_SELECTOR, 
-                        "button.w8nwRe.kyuRq, button[aria-label*='展开'], button[aria-label*='更多']"
-                    )
-                    for button in expand_buttons:
-                        if button.is_displayed() and button.is_enabled():
-                            try:
-                                self.driver.execute_script("arguments[0].click();", button)
-                                time.sleep(1)  # 增加等待时间
-                            except:
-                                continue
-                    
-                    # 等待信息加载完成
-                    time.sleep(2)
-                    
-                    # 获取所有可能包含信息的元素
-                    info_elements = details_panel.find_elements(By.CSS_SELECTOR, 
-                        "button.CsEnBe, div[role='button'], div.rogA2c, div.Io6YTe, div.kR99db, span.fontBodyMedium, div.cXHGnc"
-                    )
-                    
-                    # 记录所有文本内容
-                    all_texts = []
-                    for elem in info_elements:
-                        if elem.is_displayed():
-                            try:
-                                text = elem.text.strip()
-                                if text:
-                                    all_texts.append(text)
-                                aria_label = elem.get_attribute("aria-label")
-                                if aria_label:
-                                    all_texts.append(aria_label)
-                            except:
-                                continue
-                    
-                    if log_callback:
-                        log_callback(f"找到的所有文本: {all_texts}")
-                    
-                    # 从文本中识别地址和电话
-                    for text in all_texts:
-                        # 检查电话
-                        if not phone:
-                            # 尝试匹配电话号码模式
-                            phone_matches = re.findall(r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', text)
-                            if phone_matches:
-                                phone = phone_matches[0]
-                            # 如果文本中包含"电话"或"Phone"关键词
-                            elif '电话' in text or 'Phone' in text:
-                                # 提取数字和特殊字符
-                                phone_text = re.sub(r'[^\d+\-() ]', '', text)
-                                if phone_text:
-                                    phone = phone_text
-                        
-                        # 检查地址
-                        if not address:
-                            # 如果文本包含地址相关关键词
-                            if ('地址' in text or 'Address' in text or
-                                any(char in text for char in [',', '路', '街', 'Road', 'Street', 'Ave', 'Boulevard', 'Lane'])):
-                                # 如果文本长度合适且不是电话号码
-                                if len(text) > 10 and not re.match(r'^[+\d\s-]+$', text):
-                                    address = text.replace('地址：', '').replace('Address:', '').strip()
-                    
-                    # 如果还没找到，尝试从更大的容器中获取
-                    if not (phone and address):
-                        containers = details_panel.find_elements(By.CSS_SELECTOR, "div.RcCsl, div.Qe6Vdb, div.dbg0pd")
-                        for container in containers:
-                            try:
-                                text = container.text.strip()
-                                if text:
-                                    lines = text.split('\n')
-                                    for line in lines:
-                                        if not phone:
-                                            phone_matches = re.findall(r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', line)
-                                            if phone_matches:
-                                                phone = phone_matches[0]
-                                        if not address and len(line) > 10 and not re.match(r'^[+\d\s-]+$', line):
-                                            if any(char in line for char in [',', '路', '街', 'Road', 'Street', 'Ave', 'Boulevard', 'Lane']):
-                                                address = line
-                            except:
-                                continue
-                    
-                except Exception as e:
-                    if log_callback:
-                        log_callback(f"获取详细信息失败: {str(e)}")
-                
-                # 使用JavaScript关闭详情页面
-                try:
-                    self.driver.execute_script("""
-                        var button = document.querySelector("button[aria-label='返回搜索结果']");
-                        if (button) {
-                            button.click();
-                        } else {
-                            document.dispatchEvent(new KeyboardEvent('keydown', {
-                                key: 'Escape',
-                                code: 'Escape',
-                                keyCode: 27,
-                                which: 27,
-                                bubbles: true
-                            }));
-                        }
-                    """)
-                    time.sleep(2)  # 增加等待时间
-                except:
-                    webdriver.ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                    time.sleep(2)
-                
-                # 等待搜索结果列表可见
-                try:
-                    WebDriverWait(self.driver, 5).until(  # 增加等待时间
-                        EC.presence_of_element_located((By.CSS_SELECTOR, 'div.m6QErb.DxyBCb.kA9KIf.dS8AEf'))
-                    )
-                except:
-                    pass
-                
-                if log_callback:
-                    log_callback(f"获取到商户信息 - 名称: {name}, 地址: {address}, 电话: {phone}, 评分: {rating}")
-                
-                return {
-                    "name": name,
-                    "address": address,
-                    "phone": phone,
-                    "rating": rating
-                }
+                return self.build_result(card, fields, log_callback)
                 
             except Exception as e:
                 retry_count += 1
@@ -579,25 +1237,112 @@ class GoogleMapsScraper:
                     log_callback(f"提取信息失败 ({retry_count}/{max_retries}): {str(e)}")
                 
                 if retry_count < max_retries:
-                    time.sleep(2)  # 增加等待时间
-                    try:
-                        self.driver.execute_script("""
-                            var button = document.querySelector("button[aria-label='返回搜索结果']");
-                            if (button) {
-                                button.click();
-                            } else {
-                                document.dispatchEvent(new KeyboardEvent('keydown', {
-                                    key: 'Escape',
-                                    code: 'Escape',
-                                    keyCode: 27,
-                                    which: 27,
-                                    bubbles: true
-                                }));
-                            }
-                        """)
-                        time.sleep(2)
-                    except:
-                        webdriver.ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                        time.sleep(2)
+                    self.close_detail_panel()
+                    time.sleep(self.retry_delay(retry_count))
                 else:
-                    return None 
\ No newline at end of file
+                    return None
+
+    def read_detail_panel(self, log_callback=None):
+        """读取当前页面中已打开的详情面板，返回电话、地址及置信度"""
+        fields = {'phone': '', 'phone_confidence': 0.0, 'address': '', 'address_confidence': 0.0}
+        try:
+            # 等待详情面板出现并停止变化
+            details_panel = self.waiter.element('detail_panel', self.selectors.css('detail_panel'), baseline=5)
+            self.waiter.dom_stable('detail_settle', details_panel, baseline=0)
+            
+            # 一次调用点击所有展开按钮
+            expand = self.driver.execute_script(EXPAND_BUTTONS_SCRIPT, self.selectors.script_selectors()) or {}
+            self.selectors.observe(expand.get('matched'))
+            expanded = expand.get('clicked', 0)
+            if expanded:
+                # 等待展开的信息渲染完成
+                self.waiter.dom_stable('detail_settle', details_panel, baseline=expanded + 2)
+            
+            # 一次调用获取详情面板中所有文本和aria-label
+            panel_data = self.driver.execute_script(
+                DETAIL_BATCH_SCRIPT, details_panel, self.selectors.script_selectors()
+            ) or {}
+            self.selectors.observe(panel_data.get('matched'))
+            all_texts = panel_data.get('texts', [])
+            container_texts = panel_data.get('container_texts', [])
+            
+            if log_callback:
+                log_callback(f"找到的所有文本: {all_texts}")
+            
+            # 按国家规则一次遍历识别电话和地址
+            fields = get_extractor(self.current_country).extract(all_texts, container_texts)
+            self.record_outcome('ok')
+            
+        except Exception as e:
+            self.record_outcome('timeout')
+            if log_callback:
+                log_callback(f"获取详细信息失败: {str(e)}")
+        return fields
+
+    def build_result(self, card, fields, log_callback=None):
+        """由卡片基本信息和详情字段组成结果"""
+        # 卡片上的地址片段作为兜底
+        if not fields['address'] and card.get('address_snippet'):
+            fields['address'] = card['address_snippet']
+            fields['address_confidence'] = 0.5
+        rating = card.get('rating') or "N/A"
+        if log_callback:
+            log_callback(f"获取到商户信息 - 名称: {card['name']}, 地址: {fields['address']}, "
+                         f"电话: {fields['phone']}, 评分: {rating}")
+        return {
+            "name": card['name'],
+            "address": fields['address'],
+            "phone": fields['phone'],
+            "rating": rating,
+            "reviews": card.get('reviews', ''),
+            "place_id": card.get('place_id', ''),
+            "latitude": card.get('latitude', ''),
+            "longitude": card.get('longitude', ''),
+            "url": card.get('href', ''),
+            "phone_confidence": fields['phone_confidence'],
+            "address_confidence": fields['address_confidence']
+        }
+
+    def close_detail_panel(self):
+        """关闭商户详情面板，返回搜索结果列表"""
+        try:
+            self.driver.execute_script("""
+                var button = document.querySelector(arguments[0]);
+                if (button) {
+                    button.click();
+                } else {
+                    document.dispatchEvent(new KeyboardEvent('keydown', {
+                        key: 'Escape',
+                        code: 'Escape',
+                        keyCode: 27,
+                        which: 27,
+                        bubbles: true
+                    }));
+                }
+            """, self.selectors.css('back_button'))
+        except:
+            webdriver.ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
+        # 详情面板消失、结果列表重新出现即可继续
+        self.waiter.until(
+            'panel_close',
+            lambda: self.driver.execute_script(
+                "return !document.querySelector(arguments[0]) && !!document.querySelector(arguments[1]);",
+                self.selectors.css('detail_panel'), self.selectors.css('results_container')
+            ),
+            baseline=2
+        )
+
+
+def check_backend():
+    """校验浏览器后端配置，不支持的组合在创建任务和爬虫前报错"""
+    if SCRAPER_CONFIG['BACKEND'] == 'cdp' and SCRAPER_CONFIG['CAPTURE_MODE']:
+        raise ValueError("CDP后端不支持捕获模式，请关闭SCRAPER_CONFIG['CAPTURE_MODE']或使用selenium后端")
+
+
+def create_scraper(worker_id=None):
+    """按配置的浏览器后端创建爬虫实例"""
+    check_backend()
+    if SCRAPER_CONFIG['BACKEND'] == 'cdp':
+        from cdp_backend import CDPScraper
+        return CDPScraper(worker_id=worker_id)
+    return GoogleMapsScraper(worker_id=worker_id)
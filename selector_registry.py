@@ -0,0 +1,86 @@
+from selenium.webdriver.common.by import By
+from config import SELECTORS
+
+
+class SelectorRegistry:
+    """具名选择器备选链
+
+    页面脚本和find_all()按顺序逐个探测备选项，回传命中的选择器，由observe()/record()登记命中统计，
+    命中的备选项移到链首；等待条件使用css()合并的选择器列表，由浏览器在一次查询中匹配任一备选项
+    """
+
+    def __init__(self, driver, selectors=None):
+        self.driver = driver
+        # 复制一份，命中后的排序调整只影响当前会话
+        self.chains = {name: list(chain) for name, chain in (selectors or SELECTORS).items()}
+        self.stats = {}
+
+    def css(self, name):
+        """将备选链合并为一个CSS选择器列表，供等待条件使用"""
+        return ', '.join(self.chains[name])
+
+    def script_selectors(self):
+        """页面脚本使用的全部备选链，按当前顺序探测"""
+        return {name: list(chain) for name, chain in self.chains.items()}
+
+    def record(self, name, selector):
+        """登记一次探测，selector为命中的备选项，None表示全部未命中"""
+        stat = self.stats.setdefault(name, {'probes': 0, 'misses': 0, 'matched': {}})
+        stat['probes'] += 1
+        if selector is None:
+            stat['misses'] += 1
+        else:
+            stat['matched'][selector] = stat['matched'].get(selector, 0) + 1
+
+    def promote(self, name, index):
+        """将命中的备选项移到链首"""
+        if index:
+            chain = self.chains[name]
+            chain.insert(0, chain.pop(index))
+
+    def observe(self, matched):
+        """登记页面脚本回传的探测结果
+
+        matched: {名称: 命中的选择器，None表示未命中}；各备选项匹配不同元素、需要合并匹配的链
+        （如详情信息）为命中的选择器列表，只登记统计，不调整顺序
+        """
+        for name, hit in (matched or {}).items():
+            chain = self.chains.get(name)
+            if chain is None:
+                continue
+            if isinstance(hit, list):
+                stat = self.stats.setdefault(name, {'probes': 0, 'misses': 0, 'matched': {}})
+                stat['probes'] += 1
+                if not hit:
+                    stat['misses'] += 1
+                for selector in hit:
+                    stat['matched'][selector] = stat['matched'].get(selector, 0) + 1
+                continue
+            self.record(name, hit)
+            # 脚本执行期间链的顺序可能已调整，按选择器查找位置
+            if hit in chain:
+                self.promote(name, chain.index(hit))
+
+    def find_all(self, name, root=None):
+        """按顺序尝试备选链，返回第一个有结果的选择器匹配到的全部元素"""
+        root = root or self.driver
+        for index, selector in enumerate(self.chains[name]):
+            elements = root.find_elements(By.CSS_SELECTOR, selector)
+            if elements:
+                self.promote(name, index)
+                self.record(name, selector)
+                return elements
+        self.record(name, None)
+        return []
+
+    def report(self):
+        """生成各选择器的探测次数、未命中率和各备选项的命中次数"""
+        lines = []
+        for name, stat in sorted(self.stats.items()):
+            miss_rate = stat['misses'] / stat['probes'] * 100
+            line = f"{name}: 探测 {stat['probes']} 次, 未命中率 {miss_rate:.0f}%, 当前首选 {self.chains[name][0]}"
+            if stat['matched']:
+                line += ", 命中 " + ", ".join(f"{selector} {count} 次"
+                                             for selector, count in stat['matched'].items())
+            lines.append(line)
+        return lines
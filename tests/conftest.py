@@ -0,0 +1,30 @@
+import os
+import sys
+import pytest
+
+# 项目模块位于仓库根目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """索引、缓存、检查点日志和队列文件写入临时目录"""
+    monkeypatch.setitem(config.PLACE_INDEX_CONFIG, 'PATH', str(tmp_path / 'place_index.db'))
+    monkeypatch.setitem(config.CACHE_CONFIG, 'PATH', str(tmp_path / 'cache.db'))
+    monkeypatch.setitem(config.JOURNAL_CONFIG, 'DIR', str(tmp_path / 'journals'))
+    monkeypatch.setitem(config.CAMPAIGN_CONFIG, 'DIR', str(tmp_path / 'campaigns'))
+    monkeypatch.setitem(config.WORK_QUEUE_CONFIG, 'PATH', str(tmp_path / 'work_queue.db'))
+    return tmp_path
+
+
+@pytest.fixture
+def no_controls(monkeypatch):
+    """关闭自适应控制和内存监控，测试中的页面操作不等待"""
+    import adaptive_control
+    monkeypatch.setitem(config.ADAPTIVE_CONFIG, 'ENABLED', False)
+    monkeypatch.setitem(config.MEMORY_CONFIG, 'ENABLED', False)
+    adaptive_control.set_controller(None)
+    yield
+    adaptive_control.set_controller(None)
@@ -0,0 +1,82 @@
+import queue
+import pytest
+
+import config
+from adaptive_control import AdaptiveController, ControllerClient, backoff_delay
+
+
+class Value:
+    """代替multiprocessing.Value的共享变量"""
+
+    def __init__(self, value):
+        self.value = value
+
+
+@pytest.fixture
+def window(monkeypatch):
+    monkeypatch.setitem(config.ADAPTIVE_CONFIG, 'WINDOW', 4)
+    monkeypatch.setitem(config.ADAPTIVE_CONFIG, 'INITIAL_DELAY', 0.5)
+    monkeypatch.setitem(config.ADAPTIVE_CONFIG, 'DELAY_STEP', 0.2)
+    return 4
+
+
+def feed(controller, outcomes, latency=1.0):
+    messages = [controller.record(n % 2, latency, outcome) for n, outcome in enumerate(outcomes)]
+    return [message for message in messages if message]
+
+
+def test_failures_decrease_then_recover(window):
+    shared = (Value(0.0), Value(0))
+    controller = AdaptiveController(4, shared)
+    assert shared[0].value == 0.5 and shared[1].value == 4
+
+    # 窗口内超时过多时并发减半、间隔加倍
+    assert len(feed(controller, ['ok', 'timeout', 'empty', 'ok'])) == 1
+    assert controller.limit == 2 and controller.delay == 1.0
+    assert shared[0].value == 1.0 and shared[1].value == 2
+    assert controller.active(1) and not controller.active(2)
+
+    # 窗口未满时不调整，正常窗口后并发加一、间隔减少一个步长
+    assert feed(controller, ['ok'] * (window - 1)) == []
+    assert len(feed(controller, ['ok'])) == 1
+    assert controller.limit == 3 and controller.delay == pytest.approx(0.8)
+    assert controller.adjustments == {'increase': 1, 'decrease': 1}
+
+
+def test_slow_pages_decrease(window, monkeypatch):
+    monkeypatch.setitem(config.ADAPTIVE_CONFIG, 'LATENCY_LIMIT', 2.0)
+    controller = AdaptiveController(2)
+    feed(controller, ['ok'] * window, latency=3.0)
+    assert controller.limit == 1
+
+
+def test_retired_worker_frees_slot(window):
+    controller = AdaptiveController(4)
+    controller.limit = 2
+    assert controller.allowed() == 2
+    controller.retire(0)
+    # 0号退出后由2号补上名额
+    assert controller.allowed() == 3 and controller.active(2) and not controller.active(3)
+    controller.retire(1)
+    controller.retire(2)
+    assert controller.allowed() == 4
+
+
+def test_backoff_delay(monkeypatch):
+    monkeypatch.setitem(config.ADAPTIVE_CONFIG, 'MIN_BACKOFF', 1.0)
+    monkeypatch.setitem(config.ADAPTIVE_CONFIG, 'BACKOFF', 2.0)
+    monkeypatch.setitem(config.ADAPTIVE_CONFIG, 'MAX_DELAY', 5.0)
+    assert backoff_delay(0.2, 0) == 1.0
+    assert backoff_delay(1.5, 1) == 3.0
+    assert backoff_delay(1.5, 3) == 5.0
+
+
+def test_client_reads_shared_values():
+    shared = (Value(1.5), Value(2))
+    results = queue.Queue()
+    client = ControllerClient(2, results, shared)
+    client.record(None, 0.8, 'timeout')
+    assert results.get_nowait() == ('sample', 2, (0.8, 'timeout'))
+    assert not client.active() and client.current_delay() == 1.5
+    shared[1].value = 3
+    assert client.active()
@@ -0,0 +1,203 @@
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip('selenium')
+
+import config
+from cdp_backend import CDPScraper, CLICK_CARD_SCRIPT
+from scraper import CARD_BATCH_SCRIPT, DETAIL_BATCH_SCRIPT, create_scraper
+from selector_registry import SelectorRegistry
+from place_index import PlaceIndex, task_query_key
+from result_cache import ResultCache
+
+
+def make_card(n):
+    place_id = f"0x{n:x}:0x{n + 100:x}"
+    return {
+        'name': f"Cafe {n}",
+        'rating': '4.5',
+        'reviews': '12',
+        'href': f"https://www.google.com/maps/place/Cafe+{n}/data=!1s{place_id}!3d40.{n}!4d-73.{n}",
+        'address_snippet': f"{n} Main St",
+    }
+
+
+class FakeTab:
+    """按脚本返回固定结果的标签页，列表一次返回全部卡片，panel_ready为False时所有等待超时"""
+
+    def __init__(self, cards, panel_ready=True):
+        self.cards = cards
+        self.panel_ready = panel_ready
+        self.clicked = []
+
+    async def navigate(self, url):
+        pass
+
+    async def wait_for(self, expression, timeout, poll=0.2):
+        return self.panel_ready
+
+    async def call(self, script, *args):
+        if script == CARD_BATCH_SCRIPT:
+            position = args[2]
+            return {'cards': [dict(card, index=i) for i, card in enumerate(self.cards) if i >= position],
+                    'total': len(self.cards),
+                    'matched': {'result_card': args[1]['result_card'][-1]}}
+        if script == DETAIL_BATCH_SCRIPT:
+            return {'texts': ['+1 212-555-0100'], 'container_texts': [], 'matched': {'detail_info': []}}
+        if script == CLICK_CARD_SCRIPT:
+            self.clicked.append(self.cards[args[2]])
+            return {'clicked': True, 'matched': {}}
+        return None
+
+    async def evaluate(self, expression):
+        if expression == "window.__scraperPrefetch || {detached: true}":
+            return {'ended': True, 'total': len(self.cards)}
+        if expression == "location.href":
+            # 点击卡片后页面链接指向该商户
+            return make_card(self.cards.index(self.clicked[-1]) + 1)['href']
+        return None
+
+    async def send(self, method, params=None):
+        return {}
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self, cards, panel_ready=True):
+        self.cards = cards
+        self.panel_ready = panel_ready
+
+    async def new_tab(self):
+        return FakeTab(self.cards, self.panel_ready)
+
+    async def version(self):
+        return {'product': 'fake'}
+
+    async def close(self):
+        pass
+
+
+def start_scraper(cards, panel_ready=True):
+    scraper = CDPScraper()
+    scraper.loop = asyncio.new_event_loop()
+    scraper.loop_thread = threading.Thread(target=scraper.loop.run_forever, daemon=True)
+    scraper.loop_thread.start()
+    scraper.driver = FakeBrowser(cards, panel_ready)
+    scraper.main_tab = FakeTab(cards, panel_ready)
+    scraper.selectors = SelectorRegistry(None)
+    return scraper
+
+
+def test_scrape_with_index_and_cache(data_dir, no_controls, monkeypatch):
+    monkeypatch.setitem(config.PLACE_INDEX_CONFIG, 'ENABLED', True)
+    monkeypatch.setitem(config.CACHE_CONFIG, 'ENABLED', True)
+    monkeypatch.setitem(config.SCRAPER_CONFIG, 'DETAIL_TABS', 2)
+    scraper = start_scraper([make_card(n) for n in range(1, 6)])
+    logs, results = [], []
+    try:
+        scraper.scrape('cafe', 'US', 3, log_callback=logs.append,
+                       result_callback=lambda result: results.append(result) or True, save_results=False)
+    finally:
+        scraper.close()
+
+    assert not [line for line in logs if '错误' in line]
+    assert len(results) == 3
+    # 页面脚本回传的命中结果登记到选择器统计，命中的备选项移到链首
+    assert scraper.selectors.chains['result_card'][0] == config.SELECTORS['result_card'][-1]
+    assert scraper.selectors.stats['detail_info']['misses'] == scraper.selectors.stats['detail_info']['probes']
+    assert all(result['phone'] for result in results)
+    index, cache = PlaceIndex(), ResultCache()
+    try:
+        # 交给回调的结果由调用方保存后登记索引
+        assert not any(index.known(result) for result in results)
+        assert all(cache.get_detail(result) for result in results)
+    finally:
+        index.close()
+        cache.close()
+
+
+def test_repeated_query_served_from_cache_with_index(data_dir, no_controls, monkeypatch):
+    monkeypatch.setitem(config.PLACE_INDEX_CONFIG, 'ENABLED', True)
+    monkeypatch.setitem(config.CACHE_CONFIG, 'ENABLED', True)
+    cards = [make_card(n) for n in range(1, 4)]
+    collected = []
+    for panel_ready in (True, False):
+        # 第二次运行时详情全部超时，结果只能来自缓存
+        scraper = start_scraper(cards, panel_ready)
+        results = []
+        try:
+            scraper.scrape('cafe', 'US', 3, result_callback=lambda result: results.append(result) or True,
+                           save_results=False)
+        finally:
+            scraper.close()
+        collected.append(results)
+
+    assert len(collected[0]) == 3
+    assert sorted(r['place_id'] for r in collected[1]) == sorted(r['place_id'] for r in collected[0])
+
+
+def run_indexed(queries, cards, cache_enabled, monkeypatch):
+    """依次执行查询，每个查询结束后像调用方一样登记保存的结果，返回各查询的结果数和跳过的已知商户数"""
+    monkeypatch.setitem(config.PLACE_INDEX_CONFIG, 'ENABLED', True)
+    monkeypatch.setitem(config.CACHE_CONFIG, 'ENABLED', cache_enabled)
+    counts = []
+    for business_type in queries:
+        scraper = start_scraper(cards)
+        results = []
+        try:
+            scraper.scrape(business_type, 'US', 3, result_callback=lambda result: results.append(result) or True,
+                           save_results=False)
+        finally:
+            scraper.close()
+        index = PlaceIndex()
+        for result in results:
+            index.add(result, task_query_key(business_type, 'US'))
+        index.close()
+        counts.append((len(results), scraper.skipped_known))
+    return counts
+
+
+def test_other_query_skips_known_cached_places(data_dir, no_controls, monkeypatch):
+    cards = [make_card(n) for n in range(1, 4)]
+    assert run_indexed(('cafe', 'coffee'), cards, True, monkeypatch) == [(3, 0), (0, 3)]
+
+
+def test_repeated_query_not_skipped_without_cache(data_dir, no_controls, monkeypatch):
+    # 缓存关闭或过期时，重复同一查询重新提取，不因索引中已有上次的结果而跳过
+    cards = [make_card(n) for n in range(1, 4)]
+    assert run_indexed(('cafe', 'cafe', 'coffee'), cards, False, monkeypatch) == [(3, 0), (3, 0), (0, 3)]
+
+
+def test_detail_timeout_returns_none(data_dir, no_controls):
+    scraper = start_scraper([make_card(1)], panel_ready=False)
+    try:
+        tab = scraper.run(scraper.driver.new_tab())
+        assert scraper.run(scraper.extract_detail(tab, make_card(1))) is None
+    finally:
+        scraper.close()
+
+
+def test_cards_without_link_extracted_by_click(data_dir, no_controls):
+    cards = [make_card(1), dict(make_card(2), href='')]
+    scraper = start_scraper(cards)
+    results = []
+    try:
+        scraper.scrape('cafe', 'US', 2, result_callback=lambda result: results.append(result) or True,
+                       save_results=False)
+        assert scraper.main_tab.clicked == [cards[1]]
+    finally:
+        scraper.close()
+
+    assert sorted(r['name'] for r in results) == ['Cafe 1', 'Cafe 2']
+    # 点击打开的商户从页面链接解析商户标识
+    assert [r['place_id'] for r in results if r['name'] == 'Cafe 2'] == ['0x2:0x66']
+
+
+def test_capture_mode_rejected(monkeypatch):
+    monkeypatch.setitem(config.SCRAPER_CONFIG, 'BACKEND', 'cdp')
+    monkeypatch.setitem(config.SCRAPER_CONFIG, 'CAPTURE_MODE', True)
+    with pytest.raises(ValueError):
+        create_scraper()
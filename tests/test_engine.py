@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip('selenium')
+
+from engine import SearchJob
+
+
+class RecordingScraper:
+    """每次搜索返回固定数量的结果，并记录收到的查询"""
+
+    def __init__(self, per_query):
+        self.per_query = per_query
+        self.queries = []
+        self.result_count = 0
+        self.driver = None
+
+    def scrape(self, business_type, country, target_count, progress_callback=None, log_callback=None,
+               result_callback=None, resume=False):
+        self.queries.append((business_type, country, target_count))
+        self.result_count = min(self.per_query, target_count)
+        for n in range(self.result_count):
+            result_callback({'name': f"{business_type} {country} {n}"})
+        if progress_callback:
+            progress_callback(100)
+
+
+class SingleBrowserPool:
+    def __init__(self, scraper):
+        self.scraper = scraper
+
+    def lease(self, log_callback=None):
+        return self.scraper
+
+
+def test_single_browser_splits_comma_separated_queries():
+    scraper = RecordingScraper(3)
+    progress, results = [], []
+    job = SearchJob('USA, Canada', 'cafe,bakery', 10)
+    total = job.run(1, progress.append, browser_pool=SingleBrowserPool(scraper), result_callback=results.append)
+
+    # 每个组合单独搜索，剩余目标数量逐次递减，达到全局目标后不再搜索
+    assert scraper.queries == [('cafe', 'USA', 10), ('bakery', 'USA', 7), ('cafe', 'Canada', 4),
+                               ('bakery', 'Canada', 1)]
+    assert total == 10 and len(results) == 10
+    assert progress == [30, 60, 90, 99, 100]
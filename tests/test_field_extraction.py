@@ -0,0 +1,38 @@
+import json
+from field_extraction import get_extractor
+from extraction_benchmark import FIXTURES_PATH, HELDOUT_PATH, same_phone, score
+
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def extract(case):
+    return get_extractor(case.get('country')).extract(case['texts'], case['container_texts'])
+
+
+def test_labeled_fixtures():
+    phone_accuracy, address_accuracy, failures = score(load(FIXTURES_PATH), extract)
+    assert failures == []
+
+
+def test_heldout_fixtures():
+    phone_accuracy, address_accuracy, failures = score(load(HELDOUT_PATH), extract)
+    assert phone_accuracy >= 0.9
+    assert address_accuracy >= 0.9
+
+
+def test_same_phone_national_and_international():
+    assert same_phone('010-8580 1234', '+861085801234')
+    assert same_phone('+861085801234', '010-8580 1234')
+    assert same_phone('(217) 555-0134', '+12175550134')
+    assert not same_phone('(217) 555-0199', '+12175550134')
+    assert not same_phone('', '+12175550134')
+
+
+def test_lowercase_keywords_and_labels():
+    fields = get_extractor('USA').extract(['PHONE: (217) 555-0134', '123 MAIN STREET SPRINGFIELD'])
+    assert fields['phone'] == '+12175550134'
+    assert fields['phone_confidence'] == 1.0
+    assert fields['address'] == '123 MAIN STREET SPRINGFIELD'
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import queue
+import threading
+import urllib.request
+import urllib.error
+from http.server import ThreadingHTTPServer
+import pytest
+
+import config
+from job_server import JobServer, JobRecord, JobRequestHandler
+
+
+class StubEngine:
+    """代替引擎进程：每个任务立即输出两个结果，然后等待取消"""
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.next_id = 0
+        self.stopped = set()
+
+    def start(self):
+        pass
+
+    def alive(self):
+        return True
+
+    def submit(self, spec):
+        self.next_id += 1
+        job_id = self.next_id
+        self.events.put(('started', job_id, spec))
+        for n in range(2):
+            self.events.put(('result', job_id, {'name': f"Cafe {n}"}))
+        return job_id
+
+    def stop_job(self, job_id):
+        if job_id not in self.stopped:
+            self.stopped.add(job_id)
+            self.events.put(('done', job_id, {'status': 'cancelled', 'result_count': 2}))
+
+    def pause_job(self, job_id):
+        pass
+
+    def resume_job(self, job_id):
+        pass
+
+    def get(self, timeout=None):
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def shutdown(self, timeout=None):
+        pass
+
+
+@pytest.fixture
+def server(data_dir):
+    jobs = JobServer(engine_count=1)
+    jobs.engines = [StubEngine()]
+    jobs.start()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), JobRequestHandler)
+    httpd.daemon_threads = True
+    httpd.job_server = jobs
+    httpd.verbose = False
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    jobs.shutdown()
+
+
+def request(url, method='GET', body=None, headers=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as response:
+            return response.status, response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode('utf-8')
+
+
+def wait_until(url, check):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        state = json.loads(request(url)[1])
+        if check(state):
+            return state
+        time.sleep(0.05)
+    raise AssertionError(f"等待超时: {state}")
+
+
+def test_submit_stream_and_cancel(server):
+    status, body = request(server + '/jobs', 'POST', {'country': 'USA', 'business_type': 'cafe', 'target_count': 2})
+    assert status == 201
+    job_url = f"{server}/jobs/{json.loads(body)['id']}"
+    assert request(server + '/jobs', 'POST', {'country': 'USA'})[0] == 400
+    wait_until(job_url, lambda state: state['result_count'] == 2)
+
+    # 任务运行中打开的流在任务结束后关闭
+    live = []
+    reader = threading.Thread(target=lambda: live.append(request(job_url + '/events?from=1')))
+    reader.start()
+    time.sleep(0.2)
+    assert request(job_url + '/cancel', 'POST')[0] == 202
+    reader.join(10)
+    assert not reader.is_alive()
+    assert [json.loads(line)['event'] for line in live[0][1].splitlines() if line] == ['result', 'result', 'done']
+
+    wait_until(job_url, lambda state: state['status'] == 'cancelled')
+    assert request(job_url + '/cancel', 'POST')[0] == 409
+
+    status, body = request(job_url + '/events?types=result', headers={'Accept': 'text/event-stream'})
+    assert body.count('event: result') == 2 and 'event: done' not in body
+    status, body = request(job_url + '/events', headers={'Accept': 'text/event-stream', 'Last-Event-ID': '2'})
+    assert [line for line in body.splitlines() if line.startswith('id: ')] == ['id: 3', 'id: 4']
+
+    status, body = request(job_url + '/results')
+    assert [record['name'] for record in json.loads(body)] == ['Cafe 0', 'Cafe 1']
+    assert request(server + '/jobs/unknown')[0] == 404
+
+
+def test_job_events_capped_results_kept(data_dir, monkeypatch):
+    monkeypatch.setitem(config.SERVER_CONFIG, 'MAX_EVENTS', 3)
+    job = JobRecord({})
+    for n in range(4):
+        job.add('result', {'name': f"Cafe {n}"})
+    # 运行中的任务也可读取已写入日志的结果
+    assert len(job.results()) == 4
+    job.add('done', {'status': 'done', 'result_count': 4})
+    start, events, finished = job.wait(0, 0)
+    assert start == 2 and finished
+    assert [event['event'] for event in events] == ['result', 'result', 'done']
+    assert job.wait(4, 0)[:2] == (4, [events[-1]])
+    assert [record['name'] for record in job.results()] == ['Cafe 0', 'Cafe 1', 'Cafe 2', 'Cafe 3']
+
+
+def test_pruned_job_results_removed(data_dir, monkeypatch):
+    monkeypatch.setitem(config.SERVER_CONFIG, 'KEEP_JOBS', 1)
+    jobs = JobServer(engine_count=1)
+    jobs.engines = [StubEngine()]
+    submitted = [jobs.submit({'type': 'search'}) for _ in range(3)]
+    for job in submitted:
+        job.add('result', {'name': 'Cafe'})
+        job.add('done', {'status': 'done', 'result_count': 1})
+    jobs.prune()
+    assert list(jobs.jobs) == [submitted[-1].id]
+    assert [os.path.exists(job.journal.path) for job in submitted] == [False, False, True]
+    jobs.shutdown()
+    assert not os.path.exists(submitted[-1].journal.path)
@@ -0,0 +1,70 @@
+import os
+import csv
+import pytest
+
+import config
+import journal
+from journal import ResultJournal, read_journal, journal_path
+
+
+@pytest.fixture
+def journal_dir(tmp_path, monkeypatch):
+    """检查点日志写入临时目录"""
+    monkeypatch.setitem(config.JOURNAL_CONFIG, 'DIR', str(tmp_path / 'journals'))
+    return tmp_path
+
+
+def test_resume_after_partial_line(journal_dir):
+    first = ResultJournal('USA_cafe')
+    first.append({'name': 'A', 'phone': '1'})
+    first.append({'name': 'B', 'phone': '2'})
+    first.close()
+    # 模拟崩溃时写了一半的最后一行
+    with open(first.path, 'a', encoding='utf-8') as f:
+        f.write('{"name": "C", "ph')
+
+    resumed = ResultJournal('USA_cafe', resume=True)
+    assert [record['name'] for record in resumed.load()] == ['A', 'B']
+    assert resumed.count == 2
+    resumed.append({'name': 'D', 'phone': '4'})
+    resumed.close()
+    assert [record['name'] for record in read_journal(resumed.path)] == ['A', 'B', 'D']
+
+
+def test_new_run_archives_old_journal(journal_dir):
+    old = ResultJournal('USA_cafe')
+    old.append({'name': 'A'})
+    old.close()
+    new = ResultJournal('USA_cafe')
+    new.close()
+    assert list(read_journal(new.path)) == []
+    assert len(os.listdir(config.JOURNAL_CONFIG['DIR'])) == 2
+
+
+def test_fsync_batches(journal_dir, monkeypatch):
+    monkeypatch.setitem(config.JOURNAL_CONFIG, 'FSYNC_EVERY', 3)
+    monkeypatch.setitem(config.JOURNAL_CONFIG, 'FSYNC_INTERVAL', 3600)
+    j = ResultJournal('batch')
+    for n in range(4):
+        j.append({'n': n})
+    assert j.unsynced == 1
+    j.close()
+    assert j.unsynced == 0
+
+
+def test_journal_path_sanitizes_label(journal_dir):
+    assert os.path.basename(journal_path('a/b:c')) == 'a_b_c.jsonl'
+
+
+def test_export_keeps_first_chunk_columns(journal_dir, tmp_path, monkeypatch):
+    pytest.importorskip('pandas')
+    monkeypatch.setattr(journal, 'OUTPUT_DIR', str(tmp_path / 'output'))
+    monkeypatch.setitem(config.JOURNAL_CONFIG, 'EXPORT_CHUNK_SIZE', 2)
+    j = ResultJournal('export')
+    for record in ({'name': 'A', 'phone': '1'}, {'name': 'B', 'phone': '2'}, {'phone': '3', 'name': 'C'}):
+        j.append(record)
+    filename = j.export_csv()
+    j.close()
+    with open(filename, 'r', encoding='utf-8-sig') as f:
+        rows = list(csv.reader(f))
+    assert rows == [['name', 'phone'], ['A', '1'], ['B', '2'], ['C', '3']]
@@ -0,0 +1,64 @@
+import pytest
+
+import config
+from memory_monitor import MB, MemoryMonitor, parse_metrics, format_snapshot
+
+
+def metrics(heap_mb, nodes):
+    return {'metrics': [{'name': 'JSHeapUsedSize', 'value': heap_mb * MB}, {'name': 'Nodes', 'value': nodes},
+                        {'name': 'Documents', 'value': 2}]}
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setitem(config.MEMORY_CONFIG, 'ENABLED', True)
+    monkeypatch.setitem(config.MEMORY_CONFIG, 'INTERVAL', 20)
+    monkeypatch.setitem(config.MEMORY_CONFIG, 'MAX_JS_HEAP_MB', 500)
+    monkeypatch.setitem(config.MEMORY_CONFIG, 'MAX_DOM_NODES', 1000)
+    monkeypatch.setitem(config.MEMORY_CONFIG, 'TAB_RECYCLES_PER_BROWSER', 2)
+
+
+def test_parse_metrics():
+    assert parse_metrics(metrics(1, 10))['Nodes'] == 10
+    assert parse_metrics(None) == {}
+
+
+def test_tab_recycles_escalate_to_browser_restart(limits):
+    monitor = MemoryMonitor()
+    assert monitor.due()
+    assert monitor.check(metrics(100, 500)) == (None, None)
+    assert not monitor.due()
+
+    action, reason = monitor.check(metrics(600, 500))
+    assert action == 'tab' and 'JS堆' in reason
+    monitor.recycled(action)
+    action, reason = monitor.check(metrics(100, 5000))
+    assert action == 'tab' and 'DOM节点' in reason
+    monitor.recycled(action)
+
+    # 同一浏览器回收标签页达到上限后改为重启浏览器，重启后重新计数
+    assert monitor.check(metrics(600, 5000))[0] == 'browser'
+    monitor.recycled('browser')
+    assert monitor.check(metrics(600, 500))[0] == 'tab'
+
+
+def test_empty_response_not_counted(limits):
+    monitor = MemoryMonitor()
+    assert monitor.check({}) == (None, None)
+    assert monitor.samples == 0
+
+
+def test_snapshot_tracks_peak(limits):
+    monitor = MemoryMonitor()
+    monitor.check(metrics(300, 800))
+    monitor.check(metrics(100, 200))
+    monitor.recycled('tab')
+    snapshot = monitor.snapshot()
+    assert snapshot == {'samples': 2, 'js_heap_mb': 100.0, 'peak_js_heap_mb': 300.0, 'dom_nodes': 200,
+                        'peak_dom_nodes': 800, 'tab_recycles': 1, 'browser_restarts': 0}
+    assert '峰值 300.0MB' in format_snapshot(snapshot)
+
+
+def test_disabled_never_due(limits, monkeypatch):
+    monkeypatch.setitem(config.MEMORY_CONFIG, 'ENABLED', False)
+    assert not MemoryMonitor().due()
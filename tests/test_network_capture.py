@@ -0,0 +1,87 @@
+import os
+import json
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+
+from network_capture import NetworkCapture, read_performance_events, read_saved_response, parse_places
+
+RECORDED_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'fixtures', 'capture_search_response.txt')
+
+
+@pytest.fixture
+def maps_server():
+    """代替Maps的本地服务器，按录制的链接路径返回录制的响应正文"""
+    url, body = read_saved_response(RECORDED_PATH)
+    path = url[url.index('/search'):]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            data = body.encode('utf-8') if self.path == path else b'<html></html>'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", path
+    server.shutdown()
+    server.server_close()
+
+
+class FakeDriver:
+    """模拟Chrome：请求本地服务器，以性能日志的格式产生网络事件，getResponseBody返回缓存的正文"""
+
+    def __init__(self):
+        self.log = []
+        self.bodies = {}
+
+    def load(self, url):
+        request_id = str(len(self.bodies) + 1)
+        with urllib.request.urlopen(url, timeout=5) as response:
+            self.bodies[request_id] = response.read().decode('utf-8')
+        for method, params in (('Network.responseReceived', {'requestId': request_id, 'response': {'url': url}}),
+                               ('Network.loadingFinished', {'requestId': request_id})):
+            self.log.append({'message': json.dumps({'message': {'method': method, 'params': params}})})
+
+    def get_log(self, kind):
+        entries, self.log = self.log, []
+        return entries
+
+    def execute_cdp_cmd(self, command, params):
+        if command == 'Network.getResponseBody':
+            return {'body': self.bodies[params['requestId']]}
+        return {}
+
+
+def test_capture_recorded_search_response(maps_server, tmp_path):
+    base, path = maps_server
+    driver = FakeDriver()
+    capture = NetworkCapture(driver, save_dir=str(tmp_path))
+    capture.enable()
+    driver.load(base + '/maps/@40.7,-74.0,14z')
+    driver.load(base + path)
+
+    places = []
+    for method, params in read_performance_events(driver):
+        places.extend(capture.handle_event(method, params))
+
+    # 重复出现的商户只解析一次
+    assert [p['name'] for p in places] == ["Joe's Pizza", 'Prince Street Pizza', "Scarr's Pizza"]
+    assert places[0]['phone'] == '(212) 366-1182'
+    assert places[0]['address'] == '7 Carmine St, New York, NY 10014'
+    assert places[0]['place_id'] == '0x89c259a61c75684f:0x79d31adb123ac0a2'
+    assert places[2]['phone'] == '' and places[2]['phone_confidence'] == 0.0
+    assert capture.stats['responses'] == 1 and capture.stats['places'] == 3
+
+    # 保存的响应可以离线回放
+    saved = [os.path.join(tmp_path, name) for name in os.listdir(tmp_path)]
+    assert len(saved) == 1
+    assert parse_places(read_saved_response(saved[0])[1]) == places
@@ -0,0 +1,17 @@
+from place_index import PlaceIndex, query_key
+
+
+def test_known_scoped_to_other_queries(data_dir):
+    index = PlaceIndex()
+    place = {'place_id': '0x1:0x2', 'name': 'Cafe', 'address': '1 Main St'}
+    index.add(place, query_key('cafe in US'))
+    assert index.known(place)
+    assert not index.known(place, query_key('cafe in US'))
+    assert index.known(place, query_key('cafe in US', (40.7, -74.0, 14)))
+    assert not index.known({'place_id': '0x3:0x4'})
+    index.close()
+
+
+def test_query_key_includes_viewport():
+    assert query_key('cafe') == 'cafe'
+    assert query_key('cafe', (40.7, -74.0, 14)) == 'cafe|40.7,-74.0,14'
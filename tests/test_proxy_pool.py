@@ -0,0 +1,94 @@
+import multiprocessing as mp
+import pytest
+
+import config
+import proxy_pool
+from proxy_pool import ProxyPool, TokenBucket, parse_proxy, load_proxy_file, set_proxies
+
+
+@pytest.fixture
+def reset_pool(monkeypatch):
+    """测试结束后恢复进程级的代理池"""
+    monkeypatch.setattr(proxy_pool, '_pool', None)
+    monkeypatch.setattr(proxy_pool, '_configured', False)
+
+
+def test_parse_and_load(tmp_path):
+    assert parse_proxy(' 10.0.0.1:8080 ') == 'http://10.0.0.1:8080'
+    assert parse_proxy('socks5://10.0.0.2:1080') == 'socks5://10.0.0.2:1080'
+    assert parse_proxy('# 注释') is None and parse_proxy('') is None
+    path = tmp_path / 'proxies.txt'
+    path.write_text('# 代理\n10.0.0.1:8080\n\nsocks5://10.0.0.2:1080\n', encoding='utf-8')
+    assert load_proxy_file(str(path)) == ['http://10.0.0.1:8080', 'socks5://10.0.0.2:1080']
+
+
+def test_token_bucket_borrows_after_burst():
+    bucket = TokenBucket(rate=2.0, burst=2)
+    assert bucket.reserve() == 0.0 and bucket.reserve() == 0.0
+    # 令牌用完后预支，等待时间依次顺延
+    assert bucket.reserve() == pytest.approx(0.5, abs=0.05)
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+
+
+def _fail_proxy(shared, servers, settings):
+    """子进程：使用主进程的共享状态记录代理失败"""
+    config.PROXY_CONFIG.update(settings)
+    pool = ProxyPool(servers, shared, initialize=False)
+    for _ in range(2):
+        pool.record(pool.proxies[0], False)
+    pool.reserve(pool.proxies[1])
+
+
+def test_shared_state_across_processes(monkeypatch):
+    monkeypatch.setitem(config.PROXY_CONFIG, 'SCORE_ALPHA', 0.5)
+    monkeypatch.setitem(config.PROXY_CONFIG, 'MIN_SCORE', 0.4)
+    monkeypatch.setitem(config.PROXY_CONFIG, 'RATE', 1.0)
+    monkeypatch.setitem(config.PROXY_CONFIG, 'BURST', 1)
+    ctx = mp.get_context('spawn')
+    local = ProxyPool(['http://a:1', 'http://a:1', 'http://b:1'])
+    local.proxies[1].score = 0.9
+    pool = local.share(ctx)
+    assert pool.servers() == ['http://a:1', 'http://b:1'] and pool.proxies[1].score == 0.9
+
+    process = ctx.Process(target=_fail_proxy, args=(pool.shared, pool.servers(), dict(config.PROXY_CONFIG)))
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+    # 其他进程的失败使代理在本进程也暂停，其他进程的请求占用同一个令牌桶
+    assert not pool.usable(pool.proxies[0]) and pool.proxies[0].failures == 2
+    assert pool.assign().server == 'http://b:1'
+    assert pool.reserve(pool.proxies[1]) > 0.5
+
+
+def test_assign_spreads_and_offsets_by_worker():
+    pool = ProxyPool(['http://a:1', 'http://b:1', 'http://c:1'])
+    first, second = pool.assign(), pool.assign()
+    assert first.server != second.server
+    pool.release(first)
+    pool.release(second)
+    assert ProxyPool(pool.servers()).assign(worker_id=1).server == 'http://b:1'
+
+
+def test_failures_cool_down_then_retry(monkeypatch):
+    monkeypatch.setitem(config.PROXY_CONFIG, 'SCORE_ALPHA', 0.5)
+    monkeypatch.setitem(config.PROXY_CONFIG, 'MIN_SCORE', 0.4)
+    pool = ProxyPool(['http://a:1', 'http://b:1'])
+    bad = pool.proxies[0]
+    assert pool.record(bad, False)
+    assert not pool.record(bad, False)
+    assert pool.healthy_count() == 1
+    assert pool.assign().server == 'http://b:1'
+
+    # 全部冷却时使用最早恢复的代理，并以阈值评分重新试用
+    monkeypatch.setattr(pool, 'usable', lambda proxy: False)
+    bad.cooldown_until = 1.0
+    pool.proxies[1].cooldown_until = 2.0
+    retried = pool.assign()
+    assert retried is bad and bad.cooldown_until == 0.0 and bad.score == 0.4
+
+
+def test_set_proxies_keeps_scores_when_unchanged(reset_pool):
+    pool = set_proxies(['10.0.0.1:8080'])
+    pool.proxies[0].score = 0.7
+    assert set_proxies(['http://10.0.0.1:8080']) is pool
+    assert set_proxies([]) is None and proxy_pool.get_proxy_pool() is None
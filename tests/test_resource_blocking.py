@@ -0,0 +1,43 @@
+import config
+from resource_blocking import ResourceBlocker, wildcard_pattern
+
+
+def console_entry(url, error='net::ERR_BLOCKED_BY_CLIENT'):
+    return {'level': 'SEVERE', 'source': 'network', 'message': f"{url} - Failed to load resource: {error}"}
+
+
+def test_wildcard_matches_like_chrome():
+    # 只有*是通配符，?和[]按原样匹配
+    assert wildcard_pattern('*/log?*').match('https://www.google.com/log?format=json')
+    assert not wildcard_pattern('*/log?*').match('https://www.google.com/logo.png')
+    assert wildcard_pattern('*/a[1]*').match('https://x.com/a[1]/b')
+    assert not wildcard_pattern('*/a[1]*').match('https://x.com/a1/b')
+    assert not wildcard_pattern('*.png').match('https://x.com/a.png?size=1')
+
+
+def test_blocked_counts_from_console_by_default():
+    blocker = ResourceBlocker(None, {'images': True, 'telemetry': True, 'fonts': False})
+    assert not blocker.measure_bytes
+    blocker.handle_console([
+        console_entry('https://lh5.ggpht.com/p/photo.jpg'),
+        console_entry('https://www.google.com/log?format=json'),
+        console_entry('https://www.google.com/logo'),
+        console_entry('https://www.google.com/maps/photo.jpg', 'net::ERR_CONNECTION_RESET'),
+        {'level': 'SEVERE', 'message': 'Uncaught TypeError'},
+    ])
+    assert blocker.blocked == {'images': 1, 'telemetry': 1}
+    report = blocker.report()
+    assert '拦截请求 2 个' in report and '估算' in report and '实测' not in report
+
+
+def test_measured_bytes_when_enabled(monkeypatch):
+    monkeypatch.setitem(config.CHROME_OPTIONS, 'block_byte_stats', True)
+    blocker = ResourceBlocker(None, {'images': True})
+    for method, params in [
+        ('Network.requestWillBeSent', {'requestId': '2', 'request': {'url': 'https://fonts.gstatic.com/a.woff2'}}),
+        ('Network.loadingFinished', {'requestId': '2', 'encodedDataLength': 2048}),
+        ('Network.loadingFinished', {'requestId': '3', 'encodedDataLength': 1024}),
+    ]:
+        blocker.handle_event(method, params)
+    assert blocker.loaded_requests == 2 and blocker.loaded_bytes == 3072
+    assert '实测' in blocker.report()
@@ -0,0 +1,66 @@
+import time
+import pytest
+
+import config
+import result_cache
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    """缓存数据库写入临时目录"""
+    monkeypatch.setitem(config.CACHE_CONFIG, 'PATH', str(tmp_path / 'cache.db'))
+    return tmp_path
+
+
+PLACE = {'place_id': '0x1:0x2', 'name': 'Cafe', 'phone': '+1 212-555-0100'}
+
+
+def test_detail_and_query_round_trip(cache_path):
+    cache = ResultCache()
+    assert cache.get_detail(PLACE) is None
+    cache.put_detail(PLACE)
+    assert cache.get_detail({'place_id': '0x1:0x2', 'name': 'Cafe'}) == PLACE
+
+    # 元素引用不写入缓存，不同视野的同一查询分开缓存
+    cache.put_query('cafe in US', None, [{'name': 'Cafe', 'element': object()}], True)
+    assert cache.get_query('cafe in US') == {'cards': [{'name': 'Cafe'}], 'complete': True}
+    assert cache.get_query('cafe in US', (40.7, -74.0, 14)) is None
+    assert cache.stats['details'] == {'hits': 1, 'misses': 1, 'stale': 0}
+    assert cache.stats['queries'] == {'hits': 1, 'misses': 1, 'stale': 0}
+    cache.close()
+
+
+def test_expired_entries_removed(cache_path, monkeypatch):
+    monkeypatch.setitem(config.CACHE_CONFIG, 'DETAIL_TTL', 60)
+    cache = ResultCache()
+    cache.put_detail(PLACE)
+    now = time.time()
+    monkeypatch.setattr(result_cache.time, 'time', lambda: now + 120)
+    assert cache.get_detail(PLACE) is None
+    assert cache.stats['details']['stale'] == 1
+    assert cache.conn.execute("SELECT COUNT(*) FROM details").fetchone()[0] == 0
+    cache.close()
+
+
+def test_evict_oldest_over_limit(cache_path, monkeypatch):
+    monkeypatch.setattr(result_cache, 'EVICT_CHECK_EVERY', 5)
+    monkeypatch.setitem(config.CACHE_CONFIG, 'MAX_DETAILS', 3)
+    # 写入时间逐条递增，避免时钟精度导致顺序不确定
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(result_cache.time, 'time', lambda: next(clock))
+    cache = ResultCache()
+    for n in range(5):
+        cache.put_detail({'place_id': f"0x{n}:0x0", 'name': str(n)})
+    assert [row[0] for row in cache.conn.execute("SELECT data FROM details ORDER BY updated")] == [
+        f'{{"place_id": "0x{n}:0x0", "name": "{n}"}}' for n in (2, 3, 4)]
+    cache.close()
+
+
+def test_shared_across_connections(cache_path):
+    writer, reader = ResultCache(), ResultCache()
+    writer.put_detail(PLACE)
+    assert reader.get_detail(PLACE) == PLACE
+    assert '详情缓存 命中 1' in reader.report()
+    writer.close()
+    reader.close()
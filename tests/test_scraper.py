@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip('selenium')
+
+from scraper import ResultCursor, card_identity, parse_place_url
+
+
+def test_card_identity_fallback_keeps_chain_stores_apart():
+    first = {'name': 'Starbucks', 'address_snippet': '1 Main St', 'index': 0}
+    second = {'name': 'Starbucks', 'address_snippet': '9 Elm St', 'index': 4}
+    assert card_identity(first) != card_identity(second)
+    assert card_identity({'name': 'Starbucks', 'index': 0}) != card_identity({'name': 'Starbucks', 'index': 4})
+    assert card_identity({'name': 'Starbucks', 'href': 'https://maps/place/1'}) == 'https://maps/place/1'
+
+
+def test_cursor_returns_only_new_cards():
+    cursor = ResultCursor()
+    cards = [{'name': 'Starbucks', 'address_snippet': f"{n} Main St", 'index': n, 'element': n} for n in range(3)]
+    assert cursor.advance(3, cards) == cards
+    rerendered = [dict(card, element='new') for card in cards]
+    cursor.reset()
+    assert cursor.advance(3, rerendered) == []
+    assert cursor.cards[card_identity(cards[0])]['element'] == 'new'
+
+
+def test_parse_place_url():
+    info = parse_place_url('https://www.google.com/maps/place/Cafe/data=!1s0x1a:0x2b!3d40.7!4d-74.0')
+    assert info == {'place_id': '0x1a:0x2b', 'latitude': '40.7', 'longitude': '-74.0'}
+    assert parse_place_url('') == {'place_id': '', 'latitude': '', 'longitude': ''}
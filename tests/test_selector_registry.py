@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip('selenium')
+
+from selector_registry import SelectorRegistry
+
+
+class FakeRoot:
+    def __init__(self, present):
+        self.present = present
+
+    def find_elements(self, by, selector):
+        return ['element'] if selector in self.present else []
+
+
+def test_find_all_promotes_hit_and_reorders_css():
+    registry = SelectorRegistry(None, {'result_card': ['div.new', 'div.old']})
+    assert registry.find_all('result_card', FakeRoot({'div.old'})) == ['element']
+    assert registry.css('result_card') == 'div.old, div.new'
+    assert registry.find_all('result_card', FakeRoot(set())) == []
+    assert registry.stats['result_card'] == {'probes': 2, 'misses': 1, 'matched': {'div.old': 1}}
+
+
+def test_observe_script_matches():
+    registry = SelectorRegistry(None, {'card_name': ['div.a', 'div.b'], 'detail_info': ['button.x', 'div.y']})
+    # 脚本回传命中的备选项：按选择器调整顺序，不受脚本执行期间顺序变化影响
+    registry.observe({'card_name': 'div.b', 'detail_info': ['div.y']})
+    registry.observe({'card_name': 'div.b', 'detail_info': [], 'unknown': 'div.z'})
+    registry.observe({'card_name': None})
+    assert registry.script_selectors()['card_name'] == ['div.b', 'div.a']
+    # 合并匹配的链只登记统计，不调整顺序
+    assert registry.chains['detail_info'] == ['button.x', 'div.y']
+    assert registry.stats['card_name'] == {'probes': 3, 'misses': 1, 'matched': {'div.b': 2}}
+    assert registry.stats['detail_info'] == {'probes': 2, 'misses': 1, 'matched': {'div.y': 1}}
+    assert 'unknown' not in registry.stats
+    assert registry.report()[0] == "card_name: 探测 3 次, 未命中率 33%, 当前首选 div.b, 命中 div.b 2 次"
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip('selenium')
+
+import config
+from tiling import TiledSearch, make_tile, grid, split, tile_viewport
+from work_queue import QueueRunner, tile_items
+
+
+class KnownPlacesScraper:
+    """结果列表中的商户都已在索引中，不产生新结果"""
+
+    def __init__(self, cards):
+        self.cards = cards
+        self.cards_seen = 0
+        self.skipped_known = 0
+
+    def scrape(self, business_type, country, target_count, log_callback=None, result_callback=None,
+               save_results=True, viewport=None):
+        self.cards_seen = self.cards
+        self.skipped_known = self.cards
+
+
+def test_grid_split_and_viewport():
+    tiles = grid((40.0, -74.0, 41.0, -73.0), 2)
+    assert len(tiles) == 4 and tiles[0]['south'] == 40.0 and tiles[-1]['east'] == -73.0
+    children = split(tiles[0])
+    assert len(children) == 4 and all(child['depth'] == 1 for child in children)
+    lat, lng, zoom = tile_viewport(tiles[0])
+    assert (lat, lng) == (40.25, -73.75) and 3 <= zoom <= 21
+
+
+def test_saturation_counts_known_places(monkeypatch):
+    monkeypatch.setitem(config.TILING_CONFIG, 'SATURATION', 100)
+    search = TiledSearch('cafe', 'test', 1000)
+    search.is_running = True
+    search.scraper = KnownPlacesScraper(120)
+    tiles = [make_tile(40.0, -74.0, 41.0, -73.0)]
+    search.run_sequential(tiles, None, None)
+    assert tiles[0]['seen'] == 120 and search.stats['known'] == 120
+    assert len(search.next_round(tiles)) == 4
+
+
+def test_queue_splits_saturated_tile(data_dir, monkeypatch):
+    monkeypatch.setitem(config.TILING_CONFIG, 'SATURATION', 100)
+    runner = QueueRunner('tiles')
+    try:
+        runner.queue.add('tiles', tile_items('cafe', (40.0, -74.0, 41.0, -73.0))[:1])
+        runner.is_running = True
+        task = runner.next_task()
+        runner.seen[task['id']] = 120
+        runner.finish_item(task['id'])
+        assert runner.stats['split'] == 1
+        assert runner.queue.stats('tiles')['pending'] == 4
+    finally:
+        runner.queue.close()
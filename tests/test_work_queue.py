@@ -0,0 +1,145 @@
+import time
+import pytest
+
+import config
+from work_queue import WorkQueue, QueueRunner, item_key
+from place_index import PlaceIndex, task_query_key
+
+TASKS = [{'country': 'USA', 'business_type': 'cafe', 'target_count': 10},
+         {'country': 'USA', 'business_type': 'bakery', 'target_count': 10, 'priority': 5}]
+
+
+@pytest.fixture
+def queues(data_dir, monkeypatch):
+    """两台机器的工作进程共用同一个队列文件"""
+    monkeypatch.setitem(config.WORK_QUEUE_CONFIG, 'LEASE', 0.2)
+    monkeypatch.setitem(config.WORK_QUEUE_CONFIG, 'MAX_ATTEMPTS', 2)
+    first, second = WorkQueue(), WorkQueue()
+    yield first, second
+    first.close()
+    second.close()
+
+
+def expire_leases():
+    time.sleep(config.WORK_QUEUE_CONFIG['LEASE'] + 0.05)
+
+
+def test_claim_by_priority_without_duplicates(queues):
+    first, second = queues
+    assert first.add('q', TASKS) == 2
+    assert second.add('q', TASKS) == 0
+    a = first.claim('q', 'host-a')
+    b = second.claim('q', 'host-b')
+    assert a['business_type'] == 'bakery' and b['business_type'] == 'cafe'
+    assert first.claim('q', 'host-a') is None
+    assert second.owners('q') == {'host-a': 1, 'host-b': 1}
+    assert first.finish(a['id'], 'host-a') and second.finish(b['id'], 'host-b')
+    assert first.remaining('q') == 0
+    assert second.stats('q')['done'] == 2
+
+
+def test_expired_lease_requeued_to_other_owner(queues):
+    first, second = queues
+    first.add('q', TASKS[:1])
+    task = first.claim('q', 'host-a')
+    assert first.heartbeat([task['id']], 'host-a') == []
+    expire_leases()
+
+    # 租约到期后由另一台机器重新领取，原持有者续约和完成均失败
+    again = second.claim('q', 'host-b')
+    assert again['id'] == task['id']
+    assert first.heartbeat([task['id']], 'host-a') == [task['id']]
+    assert not first.finish(task['id'], 'host-a')
+
+    # 两台机器的结果按商户键合并
+    place = {'place_id': '0x1:0x2', 'name': 'Cafe'}
+    assert first.add_results('q', [(task['id'], place)]) == [place]
+    assert second.add_results('q', [(task['id'], place)]) == []
+    assert second.finish(task['id'], 'host-b')
+    assert list(first.results('q')) == [place]
+
+
+def test_max_attempts_marks_failed_and_retry(queues):
+    first, second = queues
+    first.add('q', TASKS[:1])
+    for owner, queue in (('host-a', first), ('host-b', second)):
+        assert queue.claim('q', owner) is not None
+        expire_leases()
+    assert first.claim('q', 'host-a') is None
+    assert first.stats('q')['failed'] == 1
+    assert first.remaining('q') == 0
+    assert second.retry('q') == 1
+    assert first.claim('q', 'host-a') is not None
+
+
+def test_finish_pending_does_not_count_attempt(queues):
+    first, second = queues
+    first.add('q', TASKS[:1])
+    for _ in range(3):
+        task = first.claim('q', 'host-a')
+        assert first.finish(task['id'], 'host-a', 'pending')
+    assert second.claim('q', 'host-b')['id'] == task['id']
+
+
+def test_item_key_includes_viewport():
+    assert item_key({'country': 'USA', 'business_type': 'cafe'}) == 'USA|cafe|'
+    assert item_key({'country': 'x', 'business_type': 'cafe', 'viewport': (1.0, 2.0, 14)}) == 'x|cafe|1.0,2.0,14'
+
+
+class FakePool:
+    def __init__(self):
+        self.workers = []
+        self.cancelled = []
+
+    def cancel(self, item_id):
+        self.cancelled.append(item_id)
+        return True
+
+
+def test_lost_lease_stops_worker(data_dir, monkeypatch):
+    monkeypatch.setitem(config.WORK_QUEUE_CONFIG, 'LEASE', 0.2)
+    runner = QueueRunner('q')
+    other = WorkQueue()
+    try:
+        runner.queue.add('q', TASKS[:1])
+        runner.is_running = True
+        runner.pool = FakePool()
+        task = runner.next_task()
+        runner.renew()
+        assert runner.pool.cancelled == []
+        expire_leases()
+        assert other.claim('q', 'host-b')['id'] == task['id']
+
+        # 续约时发现租约已被其他机器领取，通知执行该条目的工作进程停止
+        runner.renew()
+        assert runner.pool.cancelled == [task['id']]
+        assert runner.stats['lost'] == 1 and not runner.held
+        # 停止前已在途的结果仍合并，并再次要求停止
+        assert not runner.add_result(task['id'], {'place_id': '0x1:0x2', 'name': 'Cafe'})
+        assert runner.pool.cancelled == [task['id'], task['id']]
+        runner.flush()
+        assert runner.queue.stats('q')['results'] == 1
+    finally:
+        runner.queue.close()
+        other.close()
+
+
+def test_results_indexed_after_merge(data_dir, monkeypatch):
+    monkeypatch.setitem(config.PLACE_INDEX_CONFIG, 'ENABLED', True)
+    runner = QueueRunner('q')
+    try:
+        runner.queue.add('q', TASKS[:1])
+        runner.is_running = True
+        runner.index = PlaceIndex()
+        task = runner.next_task()
+        place = {'place_id': '0x1:0x2', 'name': 'Cafe'}
+        runner.add_result(task['id'], place)
+        assert not runner.index.known(place)
+        # 写入队列后才登记索引，登记的查询与执行该条目的爬虫一致
+        runner.finish_item(task['id'])
+        assert runner.queue.stats('q')['results'] == 1
+        assert runner.index.known(place)
+        assert not runner.index.known(place, task_query_key(task['business_type'], task['country']))
+    finally:
+        runner.index.close()
+        runner.queue.close()
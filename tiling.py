@@ -0,0 +1,245 @@
+import re
+import math
+from config import TILING_CONFIG
+from scraper import create_scraper
+from worker_pool import ScraperWorkerPool
+from journal import ResultJournal
+from place_index import place_key, task_query_key, open_index
+
+BOUNDS_PATTERN = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*,'
+                            r'\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def make_tile(south, west, north, east, depth=0):
+    # seen: 分块结果列表中的卡片数，包括之前已获取过的商户
+    return {'south': south, 'west': west, 'north': north, 'east': east, 'depth': depth, 'seen': 0}
+
+
+def bounds_from_viewport(lat, lng, zoom):
+    """由地图中心和缩放级别估算可见范围"""
+    lng_span = 360 * TILING_CONFIG['MAP_WIDTH_PX'] / (256 * 2 ** zoom)
+    lat_span = lng_span * TILING_CONFIG['MAP_HEIGHT_PX'] / TILING_CONFIG['MAP_WIDTH_PX'] * math.cos(math.radians(lat))
+    return (max(lat - lat_span / 2, -85), lng - lng_span / 2, min(lat + lat_span / 2, 85), lng + lng_span / 2)
+
+
+def tile_viewport(tile):
+    """分块对应的搜索视野(纬度, 经度, 缩放级别)，缩放级别保证整个分块可见"""
+    lat = (tile['south'] + tile['north']) / 2
+    lng = (tile['west'] + tile['east']) / 2
+    lng_span = max(tile['east'] - tile['west'], 1e-6)
+    lat_span = max((tile['north'] - tile['south']) / max(math.cos(math.radians(lat)), 0.01), 1e-6)
+    zoom_lng = math.log2(360 * TILING_CONFIG['MAP_WIDTH_PX'] / (256 * lng_span))
+    zoom_lat = math.log2(360 * TILING_CONFIG['MAP_HEIGHT_PX'] / (256 * lat_span))
+    zoom = min(max(int(min(zoom_lng, zoom_lat)), 3), 21)
+    return (round(lat, 6), round(lng, 6), zoom)
+
+
+def grid(bounds, size):
+    """将范围划分为 size × size 的网格"""
+    south, west, north, east = bounds
+    lat_step = (north - south) / size
+    lng_step = (east - west) / size
+    return [make_tile(south + r * lat_step, west + c * lng_step,
+                      south + (r + 1) * lat_step, west + (c + 1) * lng_step)
+            for r in range(size) for c in range(size)]
+
+
+def split(tile):
+    """四等分一个结果过密的分块"""
+    children = grid((tile['south'], tile['west'], tile['north'], tile['east']), 2)
+    for child in children:
+        child['depth'] = tile['depth'] + 1
+    return children
+
+
+def resolve_bounds(scraper, region, log_callback=None):
+    """获取区域的经纬度范围：可直接传入 "south,west,north,east"，或在配置中指定，否则通过Maps定位"""
+    match = BOUNDS_PATTERN.match(region)
+    if match:
+        return tuple(float(v) for v in match.groups())
+    if region in TILING_CONFIG['REGIONS']:
+        return tuple(TILING_CONFIG['REGIONS'][region])
+
+    viewport = scraper.locate_viewport(region)
+    if not viewport:
+        raise RuntimeError(f"无法定位区域: {region}")
+    lat, lng, zoom = viewport
+    if log_callback:
+        log_callback(f"区域 {region} 定位到 ({lat}, {lng}) 缩放 {zoom}")
+    return bounds_from_viewport(lat, lng, zoom)
+
+
+class TiledSearch:
+    """地理分块搜索：将区域划分为多个视野分块分别搜索，结果过密的分块继续细分，跨分块去重后合并保存"""
+
+    def __init__(self, business_type, region, target_count, resume=False):
+        self.business_type = business_type
+        self.region = region
+        self.target_count = target_count
+        self.resume = resume
+        self.is_running = False
+        self.pool = None
+        self.scraper = None
+        self.journal = None
+        self.index = None
+        # 已写入日志、待在主线程登记索引的结果；CDP后端在事件循环线程中回调
+        self.unindexed = []
+        self.seen = set()
+        self.result_count = 0
+        self.stats = {'tiles': 0, 'split': 0, 'duplicates': 0, 'known': 0}
+
+    def tile_query(self, tile):
+        return task_query_key(self.business_type, self.region, tile_viewport(tile))
+
+    def add_result(self, result, query, progress_callback=None, result_callback=None):
+        """合并一个分块结果，写入日志后等待登记商户索引，返回False表示已达到目标数量"""
+        key = place_key(result)
+        if key in self.seen:
+            self.stats['duplicates'] += 1
+            return self.result_count < self.target_count
+        if self.result_count >= self.target_count:
+            return False
+        self.seen.add(key)
+        self.journal.append(result)
+        if self.index:
+            self.unindexed.append((result, query))
+        self.result_count += 1
+        if progress_callback:
+            progress_callback(int(self.result_count / self.target_count * 100))
+        if result_callback:
+            result_callback(result)
+        return self.result_count < self.target_count
+
+    def index_results(self):
+        """在主线程按各分块的查询登记已写入日志的结果"""
+        records, self.unindexed = self.unindexed, []
+        for result, query in records:
+            self.index.add(result, query)
+
+    def next_round(self, tiles, log_callback=None):
+        """结果列表达到饱和阈值的分块继续细分；按列表中的全部卡片计算，已知商户也说明列表被截断"""
+        children = []
+        for tile in tiles:
+            if tile['seen'] >= TILING_CONFIG['SATURATION'] and tile['depth'] < TILING_CONFIG['MAX_DEPTH']:
+                self.stats['split'] += 1
+                children.extend(split(tile))
+        if children and log_callback:
+            log_callback(f"{len(children) // 4} 个分块结果过密，细分为 {len(children)} 个分块")
+        return children
+
+    def run(self, worker_count=1, progress_callback=None, log_callback=None, browser_pool=None,
+            result_callback=None):
+        self.is_running = True
+        self.journal = ResultJournal(f"{self.region}_{self.business_type}_tiles", self.resume)
+        if self.resume:
+            for record in self.journal.load():
+                self.seen.add(place_key(record))
+            if log_callback:
+                log_callback(f"从检查点日志恢复 {self.journal.count} 条结果")
+        self.result_count = self.journal.count
+        self.index = open_index()
+
+        if browser_pool:
+            self.scraper = browser_pool.lease(log_callback)
+        else:
+            self.scraper = create_scraper()
+            if not self.scraper.initialize(log_callback):
+                if log_callback:
+                    log_callback("浏览器初始化失败")
+                self.journal.close()
+                if self.index:
+                    self.index.close()
+                return self.result_count
+
+        try:
+            bounds = resolve_bounds(self.scraper, self.region, log_callback)
+            tiles = grid(bounds, TILING_CONFIG['GRID'])
+            if log_callback:
+                log_callback(f"地理分块: 范围 {tuple(round(v, 4) for v in bounds)}，初始 {len(tiles)} 个分块")
+            while tiles and self.is_running and self.result_count < self.target_count:
+                if worker_count > 1 and len(tiles) > 1:
+                    self.run_parallel(tiles, worker_count, progress_callback, log_callback, result_callback)
+                else:
+                    self.run_sequential(tiles, progress_callback, log_callback, result_callback)
+                tiles = self.next_round(tiles, log_callback)
+        except Exception as e:
+            if log_callback:
+                log_callback(f"地理分块搜索错误: {str(e)}")
+        finally:
+            if browser_pool:
+                if self.scraper.driver:
+                    browser_pool.release(self.scraper)
+            else:
+                self.scraper.close()
+            self.journal.close()
+            if self.index:
+                self.index_results()
+                self.index.close()
+            self.is_running = False
+
+        if log_callback:
+            log_callback(self.report())
+        if self.result_count:
+            self.journal.export_csv(log_callback)
+        elif log_callback:
+            log_callback(f"未获取到新的商户信息：{self.stats['known']} 个商户已由其他查询获取，按商户索引跳过"
+                         if self.stats['known'] else "未获取到任何商户信息")
+        return self.result_count
+
+    def run_sequential(self, tiles, progress_callback, log_callback, result_callback=None):
+        for tile in tiles:
+            if not self.is_running or self.result_count >= self.target_count:
+                break
+
+            self.stats['tiles'] += 1
+            self.scraper.scrape(
+                self.business_type,
+                self.region,
+                TILING_CONFIG['TILE_TARGET'],
+                log_callback=log_callback,
+                result_callback=lambda result, query=self.tile_query(tile): (
+                    self.add_result(result, query, progress_callback, result_callback) and self.is_running),
+                save_results=False,
+                viewport=tile_viewport(tile)
+            )
+            tile['seen'] = self.scraper.cards_seen
+            self.stats['known'] += self.scraper.skipped_known
+            if self.index:
+                self.index_results()
+
+    def run_parallel(self, tiles, worker_count, progress_callback, log_callback, result_callback=None):
+        self.pool = ScraperWorkerPool(worker_count)
+        tasks = [{
+            'id': index,
+            'business_type': self.business_type,
+            'country': self.region,
+            'target_count': TILING_CONFIG['TILE_TARGET'],
+            'viewport': tile_viewport(tile)
+        } for index, tile in enumerate(tiles)]
+
+        def handle_message(kind, worker_id, payload):
+            if kind == 'task_started':
+                self.stats['tiles'] += 1
+            elif kind == 'result':
+                tile_id, result = payload
+                if not self.add_result(result, self.tile_query(tiles[tile_id]), progress_callback, result_callback):
+                    self.pool.stop_event.set()
+            elif kind == 'task_done':
+                tiles[payload['id']]['seen'] = payload.get('cards_seen', 0)
+                self.stats['known'] += payload.get('skipped_known', 0)
+                if self.index:
+                    self.index_results()
+
+        self.pool.execute(tasks, handle_message, log_callback)
+
+    def report(self):
+        return (f"地理分块: 搜索分块 {self.stats['tiles']} 个, 细分 {self.stats['split']} 次, "
+                f"合并商户 {self.result_count} 个, 跨分块重复 {self.stats['duplicates']} 个, "
+                f"跳过已知商户 {self.stats['known']} 个")
+
+    def stop(self):
+        self.is_running = False
+        if self.pool:
+            self.pool.stop()
+        if self.scraper:
+            self.scraper.is_running = False
@@ -0,0 +1,457 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from config import WORK_QUEUE_CONFIG, TILING_CONFIG
+from place_index import place_key, task_query_key, open_index
+
+# 条目状态：pending 待领取，leased 已被某台机器领取，done 已完成，failed 多次租约到期仍未完成
+STATUSES = ('pending', 'leased', 'done', 'failed')
+
+
+def item_key(task):
+    """条目去重键，同一队列中相同的查询或分块只加入一次"""
+    viewport = ','.join(str(v) for v in task.get('viewport') or ())
+    return f"{task['country']}|{task['business_type']}|{viewport}"
+
+
+class WorkQueue:
+    """基于SQLite文件的租约式工作队列：多台机器的工作进程领取条目并定时续约，租约到期的条目重新排队
+
+    所有机器的结果写入同一个文件的结果表，按商户键去重合并
+    """
+
+    def __init__(self, path=None):
+        self.path = path or WORK_QUEUE_CONFIG['PATH']
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        # 手动管理事务；续约线程和主线程共用连接，由锁串行化
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute(f"PRAGMA journal_mode={WORK_QUEUE_CONFIG['JOURNAL_MODE']}")
+        self.lock = threading.RLock()
+        with self.transaction():
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, queue TEXT NOT NULL, key TEXT NOT NULL, task TEXT NOT NULL, "
+                "priority INTEGER DEFAULT 0, status TEXT DEFAULT 'pending', owner TEXT, lease_until REAL, "
+                "attempts INTEGER DEFAULT 0, found INTEGER DEFAULT 0, collected INTEGER DEFAULT 0, updated REAL, "
+                "UNIQUE (queue, key))"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS items_claim ON items (queue, status, priority)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "queue TEXT, key TEXT, item_id INTEGER, data TEXT, added REAL, PRIMARY KEY (queue, key)"
+                ") WITHOUT ROWID"
+            )
+
+    @contextmanager
+    def transaction(self):
+        """写事务：BEGIN IMMEDIATE立即获取写锁，多台机器同时领取时不会领到同一条目"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def add(self, queue, tasks):
+        """加入条目，已存在的条目保留原有状态，返回新加入的数量"""
+        added = 0
+        with self.transaction():
+            for task in tasks:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO items (queue, key, task, priority, updated) VALUES (?, ?, ?, ?, ?)",
+                    (queue, item_key(task), json.dumps(task, ensure_ascii=False), int(task.get('priority') or 0),
+                     time.time())
+                )
+                added += cursor.rowcount
+        return added
+
+    def expire(self, queue):
+        """租约到期的条目重新排队，领取次数达到上限的标记为失败"""
+        return self.conn.execute(
+            "UPDATE items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, owner = NULL, "
+            "updated = ? WHERE queue = ? AND status = 'leased' AND lease_until < ?",
+            (WORK_QUEUE_CONFIG['MAX_ATTEMPTS'], time.time(), queue, time.time())
+        ).rowcount
+
+    def claim(self, queue, owner):
+        """领取优先级最高的待处理条目，返回任务（含条目编号id），暂无条目时返回None"""
+        with self.transaction():
+            self.expire(queue)
+            row = self.conn.execute(
+                "SELECT id, task FROM items WHERE queue = ? AND status = 'pending' ORDER BY priority DESC, id LIMIT 1",
+                (queue,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self.conn.execute(
+                "UPDATE items SET status = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated = ? WHERE id = ?",
+                (owner, now + WORK_QUEUE_CONFIG['LEASE'], now, row[0])
+            )
+        task = json.loads(row[1])
+        task['id'] = row[0]
+        return task
+
+    def heartbeat(self, item_ids, owner):
+        """为仍持有的条目续约，返回租约已失效（到期后被其他机器领取）的条目编号"""
+        lost = []
+        with self.transaction():
+            now = time.time()
+            for item_id in item_ids:
+                cursor = self.conn.execute(
+                    "UPDATE items SET lease_until = ?, updated = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+                    (now + WORK_QUEUE_CONFIG['LEASE'], now, item_id, owner)
+                )
+                if not cursor.rowcount:
+                    lost.append(item_id)
+        return lost
+
+    def add_results(self, queue, records):
+        """合并一批 (条目编号, 结果)，返回首次出现的结果"""
+        merged = []
+        with self.transaction():
+            now = time.time()
+            for item_id, result in records:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO results (queue, key, item_id, data, added) VALUES (?, ?, ?, ?, ?)",
+                    (queue, place_key(result), item_id, json.dumps(result, ensure_ascii=False), now)
+                )
+                self.conn.execute("UPDATE items SET found = found + 1, collected = collected + ? WHERE id = ?",
+                                  (cursor.rowcount, item_id))
+                if cursor.rowcount:
+                    merged.append(result)
+        return merged
+
+    def finish(self, item_id, owner, status='done'):
+        """结束持有的条目：done 已完成，pending 未完成（本机停止）重新排队且不计领取次数"""
+        with self.transaction():
+            attempts = 'attempts - 1' if status == 'pending' else 'attempts'
+            return self.conn.execute(
+                f"UPDATE items SET status = ?, owner = NULL, attempts = {attempts}, updated = ? "
+                f"WHERE id = ? AND owner = ? AND status = 'leased'",
+                (status, time.time(), item_id, owner)
+            ).rowcount > 0
+
+    def retry(self, queue):
+        """失败的条目重新排队"""
+        with self.transaction():
+            return self.conn.execute(
+                "UPDATE items SET status = 'pending', attempts = 0, updated = ? WHERE queue = ? AND status = 'failed'",
+                (time.time(), queue)
+            ).rowcount
+
+    def remaining(self, queue):
+        """待领取和已领取未完成的条目数"""
+        with self.lock:
+            with self.transaction():
+                self.expire(queue)
+            return self.conn.execute("SELECT COUNT(*) FROM items WHERE queue = ? AND status IN ('pending', 'leased')",
+                                     (queue,)).fetchone()[0]
+
+    def stats(self, queue):
+        with self.lock:
+            counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM items WHERE queue = ? GROUP BY status",
+                                            (queue,)).fetchall())
+            results = self.conn.execute("SELECT COUNT(*) FROM results WHERE queue = ?", (queue,)).fetchone()[0]
+        stats = {status: counts.get(status, 0) for status in STATUSES}
+        stats['results'] = results
+        return stats
+
+    def owners(self, queue):
+        """各机器当前持有的条目数"""
+        with self.lock:
+            return dict(self.conn.execute("SELECT owner, COUNT(*) FROM items WHERE queue = ? AND status = 'leased' "
+                                          "GROUP BY owner", (queue,)).fetchall())
+
+    def results(self, queue):
+        """按加入顺序逐条读取合并后的结果，使用单独的连接，不阻塞续约"""
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            for row in conn.execute("SELECT data FROM results WHERE queue = ? ORDER BY added", (queue,)):
+                yield json.loads(row[0])
+        finally:
+            conn.close()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def tile_items(business_type, bounds, target_count=None):
+    """将范围划分为初始网格，每个分块作为一个条目"""
+    from tiling import grid
+    return [tile_item(business_type, tile, target_count) for tile in grid(bounds, TILING_CONFIG['GRID'])]
+
+
+def tile_item(business_type, tile, target_count=None):
+    from tiling import tile_viewport
+    return {
+        'country': f"{tile['south']:.5f},{tile['west']:.5f},{tile['north']:.5f},{tile['east']:.5f}",
+        'business_type': business_type,
+        'target_count': target_count or TILING_CONFIG['TILE_TARGET'],
+        'viewport': list(tile_viewport(tile)),
+        'tile': tile
+    }
+
+
+class QueueRunner:
+    """共享队列的工作端：本机的浏览器从队列领取条目，持有期间定时续约，结果写入队列文件与其他机器的结果合并
+
+    在每台机器上对同一个队列文件运行即可扩展吞吐量；本机停止时未完成的条目退回队列
+    """
+
+    def __init__(self, name, path=None):
+        self.name = name
+        self.queue = WorkQueue(path)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.held = {}
+        self.item_workers = {}
+        # 单浏览器模式下正在处理的条目
+        self.current_item = None
+        # 各条目结果列表中的卡片数，用于判断分块是否需要细分
+        self.seen = {}
+        self.buffer = []
+        self.buffer_lock = threading.Lock()
+        # 商户索引：各条目的查询标识，以及已写入队列、待在主线程登记索引的结果
+        self.index = None
+        self.queries = {}
+        self.unindexed = []
+        self.next_poll = 0.0
+        self.is_running = False
+        self.pool = None
+        self.scraper = None
+        self.log_callback = None
+        self.progress_callback = None
+        self.result_callback = None
+        self.stats = {'items': 0, 'merged': 0, 'lost': 0, 'split': 0, 'known': 0}
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def next_task(self):
+        """领取下一个条目：None表示暂无可领取的条目（其他机器仍在处理），False表示队列已全部完成"""
+        if not self.is_running:
+            return False
+        if time.time() < self.next_poll:
+            return None
+        task = self.queue.claim(self.name, self.owner)
+        if task:
+            self.held[task['id']] = task
+            if task.get('viewport'):
+                task['viewport'] = tuple(task['viewport'])
+            self.queries[task['id']] = task_query_key(task['business_type'], task['country'], task.get('viewport'))
+            task['save_results'] = False
+            return task
+        if not self.queue.remaining(self.name):
+            return False
+        self.next_poll = time.time() + WORK_QUEUE_CONFIG['POLL']
+        return None
+
+    def add_result(self, item_id, result):
+        """缓存一条结果，返回False表示条目租约已失效应停止"""
+        with self.buffer_lock:
+            self.buffer.append((item_id, result))
+            full = len(self.buffer) >= WORK_QUEUE_CONFIG['BATCH']
+        if full:
+            self.flush()
+        if item_id in self.held:
+            return True
+        self.stop_item(item_id)
+        return False
+
+    def stop_item(self, item_id):
+        """租约失效后停止处理该条目：通知执行它的工作进程，或中断本机浏览器当前的查询"""
+        if self.pool:
+            self.pool.cancel(item_id)
+        elif self.scraper and self.current_item == item_id:
+            self.scraper.is_running = False
+
+    def flush(self):
+        with self.buffer_lock:
+            records, self.buffer = self.buffer, []
+        if not records:
+            return
+        merged = self.queue.add_results(self.name, records)
+        self.stats['merged'] += len(merged)
+        if self.index:
+            with self.buffer_lock:
+                self.unindexed.extend(records)
+        if self.result_callback:
+            for result in merged:
+                self.result_callback(result)
+
+    def index_results(self):
+        """在主线程登记已写入队列的结果；心跳线程只写队列，不使用主线程打开的索引连接"""
+        with self.buffer_lock:
+            records, self.unindexed = self.unindexed, []
+        for item_id, result in records:
+            self.index.add(result, self.queries.get(item_id, ''))
+
+    def finish_item(self, item_id):
+        """条目结束：写入剩余结果，完成或退回队列；结果过密的分块细分为新的条目"""
+        self.flush()
+        if self.index:
+            self.index_results()
+        self.queries.pop(item_id, None)
+        task = self.held.pop(item_id, None)
+        self.item_workers.pop(item_id, None)
+        seen = self.seen.pop(item_id, 0)
+        if task is None:
+            return
+        if not self.is_running:
+            self.queue.finish(item_id, self.owner, 'pending')
+            return
+        if not self.queue.finish(item_id, self.owner):
+            self.log(f"条目 {item_id} 的租约已失效，结果已合并，状态以重新领取的机器为准")
+            return
+        self.stats['items'] += 1
+        tile = task.get('tile')
+        if tile and seen >= TILING_CONFIG['SATURATION'] \
+                and tile['depth'] < TILING_CONFIG['MAX_DEPTH']:
+            from tiling import split
+            added = self.queue.add(self.name, [tile_item(task['business_type'], child, task['target_count'])
+                                               for child in split(tile)])
+            self.stats['split'] += 1
+            self.log(f"分块 {task['country']} 结果过密，细分为 {added} 个新条目")
+        self.update_progress()
+
+    def update_progress(self):
+        if not self.progress_callback:
+            return
+        stats = self.queue.stats(self.name)
+        total = sum(stats[status] for status in STATUSES) or 1
+        self.progress_callback(int((stats['done'] + stats['failed']) / total * 100))
+
+    def heartbeat_loop(self, stop):
+        while not stop.wait(WORK_QUEUE_CONFIG['HEARTBEAT']):
+            try:
+                self.renew()
+            except sqlite3.Error as e:
+                self.log(f"队列续约失败: {str(e)}")
+
+    def renew(self):
+        """写入缓存的结果并续约；工作进程已退出的条目不再续约，到期后由其他机器重新领取，租约已失效的条目停止处理"""
+        self.flush()
+        alive = [item_id for item_id in list(self.held) if self.worker_alive(item_id)]
+        for item_id in self.queue.heartbeat(alive, self.owner):
+            self.held.pop(item_id, None)
+            self.stats['lost'] += 1
+            self.log(f"条目 {item_id} 的租约已失效，停止处理")
+            self.stop_item(item_id)
+
+    def worker_alive(self, item_id):
+        worker_id = self.item_workers.get(item_id)
+        if worker_id is None or not self.pool or worker_id >= len(self.pool.workers):
+            return True
+        return self.pool.workers[worker_id].is_alive()
+
+    def run(self, worker_count=1, progress_callback=None, log_callback=None, browser_pool=None,
+            result_callback=None):
+        self.is_running = True
+        self.log_callback = log_callback
+        self.progress_callback = progress_callback
+        self.result_callback = result_callback
+        stats = self.queue.stats(self.name)
+        self.log(f"共享队列 {self.name}（{self.queue.path}）: 待领取 {stats['pending']}, 处理中 {stats['leased']}, "
+                 f"已完成 {stats['done']}, 已合并商户 {stats['results']} 个；本机标识 {self.owner}")
+        self.index = open_index()
+        stop = threading.Event()
+        threading.Thread(target=self.heartbeat_loop, args=(stop,), daemon=True).start()
+        try:
+            if worker_count > 1:
+                self.run_parallel(worker_count)
+            else:
+                self.run_sequential(browser_pool)
+        finally:
+            stop.set()
+            self.flush()
+            if self.index:
+                self.index_results()
+                self.index.close()
+                self.index = None
+            for item_id in list(self.held):
+                self.queue.finish(item_id, self.owner, 'pending')
+            self.held.clear()
+            self.is_running = False
+            self.log(self.report())
+        return self.stats['merged']
+
+    def run_sequential(self, browser_pool):
+        if browser_pool:
+            self.scraper = browser_pool.lease(self.log_callback)
+        else:
+            from scraper import create_scraper
+            self.scraper = create_scraper()
+            if not self.scraper.initialize(self.log_callback):
+                self.log("浏览器初始化失败")
+                return
+        try:
+            while self.is_running:
+                task = self.next_task()
+                if task is False:
+                    break
+                if task is None:
+                    time.sleep(1)
+                    continue
+                self.log(f"领取条目 {task['id']}: {task['business_type']} in {task['country']}")
+                self.current_item = task['id']
+                self.scraper.scrape(
+                    task['business_type'],
+                    task['country'],
+                    task['target_count'],
+                    log_callback=self.log_callback,
+                    result_callback=lambda result, item_id=task['id']: (self.add_result(item_id, result)
+                                                                        and self.is_running),
+                    save_results=False,
+                    viewport=task.get('viewport')
+                )
+                self.current_item = None
+                self.seen[task['id']] = self.scraper.cards_seen
+                self.stats['known'] += self.scraper.skipped_known
+                self.finish_item(task['id'])
+        finally:
+            if browser_pool:
+                if self.scraper.driver:
+                    browser_pool.release(self.scraper)
+            else:
+                self.scraper.close()
+
+    def run_parallel(self, worker_count):
+        from worker_pool import ScraperWorkerPool
+        self.pool = ScraperWorkerPool(worker_count)
+
+        def handle_message(kind, worker_id, payload):
+            if kind == 'task_started':
+                self.item_workers[payload['id']] = worker_id
+            elif kind == 'result':
+                item_id, result = payload
+                self.add_result(item_id, result)
+            elif kind == 'task_done':
+                self.seen[payload['id']] = payload.get('cards_seen', 0)
+                self.stats['known'] += payload.get('skipped_known', 0)
+                self.finish_item(payload['id'])
+
+        self.pool.execute([], handle_message, self.log_callback, feed=self.next_task)
+
+    def report(self):
+        stats = self.queue.stats(self.name)
+        return (f"共享队列 {self.name}: 本机完成 {self.stats['items']} 个条目, 合并新商户 {self.stats['merged']} 个, "
+                f"跳过已知商户 {self.stats['known']} 个, 细分 {self.stats['split']} 次, 租约失效 {self.stats['lost']} 次；队列 待领取 {stats['pending']}, "
+                f"处理中 {stats['leased']}, 已完成 {stats['done']}, 失败 {stats['failed']}, 商户 {stats['results']} 个")
+
+    def stop(self):
+        self.is_running = False
+        if self.pool:
+            self.pool.stop()
+        if self.scraper:
+            self.scraper.is_running = False
@@ -0,0 +1,334 @@
+import time
+import queue
+import threading
+import multiprocessing as mp
+from config import WORKER_POOL_CONFIG, ADAPTIVE_CONFIG
+from scraper import create_scraper
+from journal import ResultJournal
+from place_index import place_key, task_query_key, open_index, index_enabled, set_index_enabled
+from proxy_pool import get_proxy_pool, set_proxies
+from adaptive_control import AdaptiveController, ControllerClient, set_controller
+from memory_monitor import format_snapshot
+
+
+def _worker_main(worker_id, task_queue, result_queue, stop_event, cancel_queue, proxies=(), proxy_state=None,
+                 control=None, skip_known=None):
+    """工作进程入口：持有独立的浏览器，循环领取搜索任务并回传结果
+
+    proxies: 主进程的代理列表，各工作进程按编号错开使用
+    proxy_state: 主进程创建的共享代理状态，评分、冷却和令牌桶由所有工作进程共用
+    control: 主进程自适应控制器的(间隔, 并发数)共享变量，页面操作样本回传主进程
+    cancel_queue: 主进程要求停止的任务id，只中断当前正在执行的同一任务，已结束任务的id忽略
+    skip_known: 主进程的商户索引开关；任务不保存结果时，商户由主进程在确认保存后登记索引
+    """
+    set_proxies(proxies, proxy_state)
+    set_index_enabled(skip_known)
+    client = ControllerClient(worker_id, result_queue, control) if control else None
+    set_controller(client)
+    scraper = create_scraper(worker_id=worker_id)
+    current = {'id': None}
+    cancelled = set()
+
+    def log(message):
+        result_queue.put(('log', worker_id, message))
+
+    def on_result(result):
+        result_queue.put(('result', worker_id, (current['id'], result)))
+        return not stop_event.is_set() and current['id'] not in cancelled
+
+    # 监听全局停止信号和单个任务的停止请求，及时中断正在进行的任务
+    def watch_stop():
+        while not stop_event.is_set():
+            try:
+                item_id = cancel_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            cancelled.add(item_id)
+            if item_id == current['id']:
+                log(f"任务 {item_id} 已被取消，停止处理")
+                scraper.is_running = False
+        scraper.is_running = False
+
+    threading.Thread(target=watch_stop, daemon=True).start()
+
+    while not stop_event.is_set():
+        # 并发数被下调时暂不领取新任务
+        if client and not client.active():
+            time.sleep(1)
+            continue
+        try:
+            item = task_queue.get(timeout=1)
+        except queue.Empty:
+            continue
+        if item is None:
+            break
+        current['id'] = item.get('id')
+        log(f"领取任务: {item['business_type']} in {item['country']}")
+        result_queue.put(('task_started', worker_id, item))
+        # 任务在开始前已被取消
+        if current['id'] is not None and current['id'] in cancelled:
+            result_queue.put(('task_done', worker_id, item))
+            continue
+        try:
+            scraper.scrape(
+                item['business_type'],
+                item['country'],
+                item['target_count'],
+                log_callback=log,
+                result_callback=on_result,
+                save_results=item.get('save_results', False),
+                viewport=item.get('viewport'),
+                resume=item.get('resume', False)
+            )
+        except Exception as e:
+            log(f"任务执行错误: {str(e)}")
+        if scraper.memory:
+            result_queue.put(('metrics', worker_id, scraper.memory.snapshot()))
+        item['cards_seen'] = scraper.cards_seen
+        item['skipped_known'] = scraper.skipped_known
+        result_queue.put(('task_done', worker_id, item))
+
+    result_queue.put(('exit', worker_id, None))
+
+
+class ScraperWorkerPool:
+    """多浏览器并行工作池：每个工作进程驱动一个独立的Chrome，结果在主进程汇总去重"""
+
+    def __init__(self, worker_count=None):
+        self.worker_count = worker_count or WORKER_POOL_CONFIG['WORKER_COUNT']
+        self.ctx = mp.get_context('spawn')
+        self.stop_event = self.ctx.Event()
+        self.is_running = False
+        self.result_count = 0
+        self.workers = []
+        # 各工作进程的单任务停止通道，以及正在执行的任务id到工作进程编号的映射
+        self.cancel_queues = []
+        self.running = {}
+        # 各工作进程最近一次回传的浏览器内存指标
+        self.metrics = {}
+
+    def stop(self):
+        self.is_running = False
+        self.stop_event.set()
+
+    def cancel(self, item_id):
+        """通知正在执行该任务的工作进程停止这一个任务，任务不在执行中时返回False"""
+        worker_id = self.running.get(item_id)
+        if worker_id is None:
+            return False
+        self.cancel_queues[worker_id].put(item_id)
+        return True
+
+    def execute(self, tasks, handle_message, log_callback=None, feed=None):
+        """启动工作进程处理任务队列，逐条处理回传的消息直至所有工作进程退出
+
+        handle_message(kind, worker_id, payload) 处理 result/task_started/task_done 消息，
+            task_done的任务中附带cards_seen（该查询结果列表中的卡片数）和skipped_known（按商户索引跳过的商户数）
+        feed: 可选，动态提供任务的函数（如共享工作队列），有空闲工作进程时调用；
+              返回任务，None表示暂无任务稍后再试，False表示已全部完成
+        """
+        self.is_running = True
+        self.stop_event.clear()
+
+        task_queue = self.ctx.Queue()
+        result_queue = self.ctx.Queue()
+        for task in tasks:
+            task_queue.put(task)
+
+        worker_count = self.worker_count if feed else min(self.worker_count, len(tasks)) or 1
+        feeding = {'idle': max(worker_count - len(tasks), 0), 'closed': feed is None}
+
+        def close_feed():
+            feeding['closed'] = True
+            for _ in range(worker_count):
+                task_queue.put(None)
+
+        def refill():
+            # 每个空闲工作进程最多预领一个任务，避免占用其他机器可领取的条目
+            while feeding['idle'] and not feeding['closed'] and not self.stop_event.is_set():
+                task = feed()
+                if task is None:
+                    break
+                if task is False:
+                    close_feed()
+                    break
+                task_queue.put(task)
+                feeding['idle'] -= 1
+
+        if feed is None:
+            close_feed()
+
+        if log_callback:
+            log_callback(f"启动 {worker_count} 个浏览器工作进程，" +
+                         ("从共享队列领取任务" if feed else f"共 {len(tasks)} 个任务"))
+
+        # 工作进程使用spawn启动，代理列表和共享的代理状态需显式传入
+        proxy_pool = get_proxy_pool()
+        proxy_pool = proxy_pool.share(self.ctx) if proxy_pool else None
+        proxies = proxy_pool.servers() if proxy_pool else []
+        if proxies and log_callback:
+            log_callback(f"{worker_count} 个工作进程共用 {len(proxies)} 个代理，健康评分和请求速率合并计算")
+
+        # 主进程按各工作进程回传的操作样本调整并发数和操作间隔
+        controller = None
+        control = None
+        if ADAPTIVE_CONFIG['ENABLED']:
+            control = (self.ctx.Value('d', 0.0, lock=False), self.ctx.Value('i', worker_count, lock=False))
+            controller = AdaptiveController(worker_count, control)
+
+        workers = self.workers = []
+        self.cancel_queues = [self.ctx.Queue() for _ in range(worker_count)]
+        self.running = {}
+        for worker_id in range(worker_count):
+            process = self.ctx.Process(
+                target=_worker_main,
+                args=(worker_id, task_queue, result_queue, self.stop_event, self.cancel_queues[worker_id], proxies,
+                      proxy_pool.shared if proxy_pool else None, control, index_enabled()),
+                daemon=True
+            )
+            process.start()
+            workers.append(process)
+
+        exited = set()
+        metrics = self.metrics = {}
+        try:
+            refill()
+            while len(exited) < worker_count:
+                try:
+                    kind, worker_id, payload = result_queue.get(timeout=1)
+                except queue.Empty:
+                    # 工作进程全部异常退出时不再等待其消息
+                    if not any(p.is_alive() for p in workers):
+                        break
+                    refill()
+                    if controller:
+                        for index, process in enumerate(workers):
+                            if not process.is_alive() and index not in controller.retired:
+                                controller.retire(index)
+                    continue
+
+                if kind == 'log':
+                    if log_callback:
+                        log_callback(f"[worker {worker_id}] {payload}")
+                elif kind == 'metrics':
+                    metrics[worker_id] = payload
+                elif kind == 'sample':
+                    if controller:
+                        message = controller.record(worker_id, *payload)
+                        if message and log_callback:
+                            log_callback(message)
+                elif kind == 'exit':
+                    exited.add(worker_id)
+                    if controller:
+                        controller.retire(worker_id)
+                else:
+                    if kind == 'task_started':
+                        self.running[payload.get('id')] = worker_id
+                    elif kind == 'task_done':
+                        self.running.pop(payload.get('id'), None)
+                    handle_message(kind, worker_id, payload)
+                    if kind == 'task_done':
+                        feeding['idle'] += 1
+                        refill()
+        finally:
+            self.stop_event.set()
+            for process in workers:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+            self.is_running = False
+            if controller and log_callback:
+                for line in controller.report():
+                    log_callback(line)
+            if proxy_pool and log_callback:
+                for line in proxy_pool.report():
+                    log_callback(line)
+            if metrics and log_callback:
+                log_callback("浏览器内存:")
+                for worker_id, snapshot in sorted(metrics.items()):
+                    log_callback(f"  worker {worker_id}: {format_snapshot(snapshot)}")
+
+    def run(self, work_items, target_count, progress_callback=None, log_callback=None, label='pool', resume=False,
+            result_callback=None):
+        """执行一组搜索任务，结果汇总去重到同一个文件
+
+        work_items: [{'business_type': ..., 'country': ..., 'target_count': 可选}, ...]
+        target_count: 全局目标数量，达到后通知所有工作进程停止
+        resume: 从检查点日志继续，已获取的商户不再计入
+        result_callback(result): 每汇总一个新商户时调用
+        """
+        seen = set()
+        # 各查询按商户索引跳过的商户数
+        skipped = {'known': 0}
+
+        # 汇总后的结果逐条写入检查点日志，写入后登记商户索引
+        journal = ResultJournal(label, resume)
+        index = open_index()
+        if resume:
+            for record in journal.load():
+                seen.add(place_key(record))
+            if log_callback:
+                log_callback(f"从检查点日志恢复 {journal.count} 条结果")
+        self.result_count = journal.count
+
+        tasks = []
+        for task_id, item in enumerate(work_items):
+            task = dict(item)
+            task.setdefault('id', task_id)
+            task.setdefault('target_count', target_count)
+            tasks.append(task)
+        queries = {task['id']: task_query_key(task['business_type'], task['country'], task.get('viewport'))
+                   for task in tasks}
+
+        def handle_message(kind, worker_id, payload):
+            if kind == 'task_done':
+                skipped['known'] += payload.get('skipped_known', 0)
+            if kind != 'result':
+                return
+            task_id, result = payload
+            key = place_key(result)
+            if key in seen or self.result_count >= target_count:
+                return
+            seen.add(key)
+            journal.append(result)
+            if index:
+                index.add(result, queries[task_id])
+            self.result_count += 1
+            if progress_callback:
+                progress_callback(int(self.result_count / target_count * 100))
+            if result_callback:
+                result_callback(result)
+            if self.result_count >= target_count:
+                if log_callback:
+                    log_callback("已达到全局目标数量，通知所有工作进程停止")
+                self.stop_event.set()
+
+        try:
+            self.execute(tasks, handle_message, log_callback)
+        finally:
+            journal.close()
+            if index:
+                index.close()
+
+        if self.result_count:
+            journal.export_csv(log_callback)
+        elif log_callback:
+            log_callback(f"未获取到新的商户信息：{skipped['known']} 个商户已由其他查询获取，按商户索引跳过"
+                         if skipped['known'] else "未获取到任何商户信息")
+        return self.result_count
+
+    def run_tasks(self, tasks, on_started=None, on_result=None, on_done=None, log_callback=None):
+        """执行一组由调用方跟踪结果的任务（批量任务的查询、地理分块等），按传入顺序分发
+
+        每个任务需带唯一的 id，回调参数为 (任务id, 工作进程编号[, 结果])
+        """
+        def handle_message(kind, worker_id, payload):
+            if kind == 'task_started' and on_started:
+                on_started(payload['id'], worker_id)
+            elif kind == 'result' and on_result:
+                item_id, result = payload
+                on_result(item_id, worker_id, result)
+            elif kind == 'task_done' and on_done:
+                on_done(payload['id'], worker_id)
+
+        self.execute(tasks, handle_message, log_callback)